@@ -10,6 +10,9 @@ from .fallback import FallbackSignalGenerator
 from .timeout import TimeoutManager
 from .proxy import ProxyManager, create_proxy_session, get_proxy_recommendations
 from .rate_limiter import MultiProviderRateLimiter, rate_limit, get_rate_limit_stats
+from .signal_index import MarketStateIndex
+from .circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+from .response_parser import AIResponseParser
 
 # 创建全局AI客户端实例（延迟初始化）
 ai_client = AIClient()
@@ -37,6 +40,10 @@ __all__ = [
     'MultiProviderRateLimiter',
     'rate_limit',
     'get_rate_limit_stats',
+    'MarketStateIndex',
+    'CircuitBreaker',
+    'CircuitBreakerRegistry',
+    'AIResponseParser',
     'ai_client',
     'providers',
     'get_ai_signal',
@@ -16,7 +16,18 @@ import concurrent.futures
 from dataclasses import dataclass
 
 from config import config
+from .session_pool import ProviderSessionPool
+from .dns_manager import dns_manager, PreferredIPResolver, url_endpoint
+from .hedging import LatencyTracker, HedgeBudget, hedged_call
+from .streaming import read_signal_stream
+from .response_parser import response_parser, confidence_value, loads
+from .prompts import PromptCompiler
+from .prompt_cache import PromptCacheStats
+from .cache import ai_request_cache
+from .rate_limiter import rate_limiter, parse_retry_after, RateLimited, RateLimitWaitExceeded, ProviderRateLimited
+from .circuit_breaker import CircuitBreakerRegistry
 from utils.utils import log_info, log_warning, log_error
+from utils.retry_budget import retry_budget
 
 # 使用自定义导入器导入strategies，避免包和文件同名冲突
 import sys
@@ -49,15 +60,29 @@ class AISignal:
     reason: str
     timestamp: str
     raw_response: Dict[str, Any]
+    response_time: Optional[float] = None  # 请求发出到拿到信号的耗时（秒），缓存信号为None
 
 class AIClient:
     """AI客户端 - 支持多AI提供商"""
 
+    # 融合时BUY/SELL的多数门槛（fuse_signals 的弱共识，提前返回判断同样使用）
+    WEAK_CONSENSUS_THRESHOLD = 0.6
+
     def __init__(self):
         # 始终初始化，确保providers属性存在
         self.providers = {}
         self.provider_configs = {}
         self.initialized = False  # 标记是否已初始化
+        self.session_pool = ProviderSessionPool(
+            resolver_factory=lambda: PreferredIPResolver(dns_manager)
+        )  # 各提供商的持久HTTP会话，优先连接测速最快的IP
+        self.last_fanout: Dict[str, Any] = {}  # 最近一次多AI请求的计入/未返回提供商
+        self._background_tasks: set = set()  # 后台继续完成的提供商请求 / 熔断探测
+        self.circuit_breakers = CircuitBreakerRegistry()  # 各提供商熔断器（跨周期共享）
+        self.latency_tracker = LatencyTracker()  # 各提供商近期响应延迟（用于对冲）
+        self.hedge_budget = HedgeBudget()  # 全局对冲预算
+        self.prompts = PromptCompiler()  # 预编译的提示词模板
+        self.prompt_cache_stats = PromptCacheStats()  # 提供商侧提示词缓存命中统计
 
         # 增强超时配置 - 基于实际连接问题优化
         self.timeout_config = {
@@ -153,6 +178,15 @@ class AIClient:
                 ('openai', 'https://api.openai.com/v1/chat/completions', 'gpt-3.5-turbo')
             ]
 
+            # 本地模拟AI服务（benchmarks/mock_llm.py）：按提供商路径区分各自的延迟/错误配置
+            mock_url = (config.get('ai', 'mock_url', '') or '').rstrip('/')
+            if mock_url:
+                log_warning(f"🧪 AI请求发往本地模拟服务: {mock_url}")
+                provider_configs = [
+                    (provider_name, f"{mock_url}/{provider_name}/v1/chat/completions", model)
+                    for provider_name, _, model in provider_configs
+                ]
+
             for provider_name, url, model in provider_configs:
                 api_key = ai_models.get(provider_name) if ai_models else None
                 log_info(f"检查 {provider_name} API密钥: {'已配置' if api_key and api_key.strip() else '未配置'}")
@@ -183,6 +217,24 @@ class AIClient:
             if not self.providers:
                 log_warning("⚠️ 没有任何AI提供商被配置，将使用回退信号模式")
 
+            self.session_pool.keepalive_timeout = float(config.get('ai', 'session_keepalive', 60))
+            self.hedge_budget.ratio = float(config.get('ai', 'hedge_budget', 0.1))
+            self.circuit_breakers.enabled = bool(config.get('ai', 'breaker_enabled', True))
+            slow_seconds = float(config.get('ai', 'breaker_slow_seconds', 20) or 0)
+            self.circuit_breakers.configure(
+                failure_rate=float(config.get('ai', 'breaker_failure_rate', 0.5)),
+                min_requests=int(config.get('ai', 'breaker_min_requests', 4)),
+                slow_seconds=slow_seconds if slow_seconds > 0 else None,
+                open_seconds=float(config.get('ai', 'breaker_open_seconds', 120))
+            )
+            # 全局重试预算（AI提供商请求、RetryHandler与错误恢复共用）
+            retry_budget.configure(
+                enabled=bool(config.get('system', 'retry_budget_enabled', True)),
+                ratio=float(config.get('system', 'retry_budget_ratio', 0.2)),
+                min_per_second=float(config.get('system', 'retry_budget_min_per_minute', 0.2)) / 60,
+                max_tokens=float(config.get('system', 'retry_budget_burst', 5))
+            )
+
             # 初始化超时统计
             for provider in self.providers.keys():
                 self.timeout_stats['provider'][provider] = {
@@ -208,6 +260,30 @@ class AIClient:
             log_error(f"初始化堆栈:\n{traceback.format_exc()}")
             self.providers = {}
         
+    async def warmup_sessions(self) -> Dict[str, bool]:
+        """并发预热所有已配置提供商的连接，首次信号请求无需等待握手"""
+        providers = list(self.providers.keys())
+        results = await asyncio.gather(
+            *[self.session_pool.warmup(provider, self.providers[provider]['url']) for provider in providers]
+        )
+        warmed = dict(zip(providers, results))
+        ready = [p for p, ok in warmed.items() if ok]
+        log_info(f"🔌 AI连接预热完成: {len(ready)}/{len(providers)} ({', '.join(ready) or '无'})")
+        return warmed
+
+    def provider_endpoints(self) -> Dict[str, int]:
+        """所有已配置提供商的API主机名及端口"""
+        endpoints = (url_endpoint(settings.get('url', '')) for settings in self.providers.values())
+        return dict(endpoint for endpoint in endpoints if endpoint)
+
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """获取各提供商的连接复用统计"""
+        return self.session_pool.get_stats()
+
+    async def cleanup(self) -> None:
+        """关闭所有提供商的持久会话"""
+        await self.session_pool.close()
+
     async def get_signal_from_provider(self, provider: str, market_data: Dict[str, Any]) -> Optional[AISignal]:
         """从指定AI提供商获取信号（优化版）"""
         try:
@@ -243,63 +319,9 @@ class AIClient:
                 'Content-Type': 'application/json'
             }
             
-            # 为不同提供商设置不同的温度参数 - 大幅提高多样性
-            provider_temperatures = {
-                'deepseek': 0.95,   # 极高温度，非常创造性
-                'kimi': 0.85,       # 高温度，增加多样性
-                'qwen': 0.90,       # 很高温度，基于数据创造性
-                'openai': 0.92      # 很高温度，平衡创造性和合理性
-            }
-            temperature = provider_temperatures.get(provider, 0.7)
-            
-            # 为不同提供商定制系统提示 - 融合之前项目的成功经验
-            system_prompts = {
-                'deepseek': """你是专业的BTC波段交易大师，专注精准抄底和趋势跟踪。你必须积极寻找交易机会，避免保守的HOLD建议。
-
-你的特点：
-- 技术派激进交易者，专注突破交易
-- 不喜欢保守观望，倾向于果断行动
-- 基于技术面给出BUY/SELL建议，尽量避免HOLD
-- 必须与其他分析师持不同观点，即使市场稳定也要寻找交易机会
-
-记住：你是DEEPSEEK，要以技术分析为主导，积极交易为风格。""",
-                
-                'kimi': """你是一位专业的BTC短线交易员，专注于15分钟周期的精准交易。你注重风险控制和交易效率。
-
-你的特点：
-- 稳健型交易者，注重风险控制
-- 专注短线交易，基于RSI和趋势判断
-- 基于市场波动率动态设置止盈止损
-- RSI交易规则：超卖买入，超买卖出，中性结合趋势
-- 震荡市区间交易，趋势市顺势交易
-
-记住：你是KIMI，要以稳健高效为风格，简洁专业为特点。""",
-                
-                'qwen': """你是一位专业的量化交易员，专注于BTC/USDT永续合约的15分钟周期交易。你完全基于数据和统计模型做决策。
-
-你的特点：
-- 数据驱动的量化交易者，完全基于统计模型
-- 运用统计学、概率论和量化模型分析市场
-- 决策必须基于具体数据指标，不依赖主观判断
-- 信心等级要反映统计显著性和数学概率
-- 确保分析角度与其他分析师完全不同，用数字说话
-
-记住：你是QWEN，要以数据量化为主导，统计模型为基础。""",
-                
-                'openai': """你是一个平衡型交易者，但今天必须扮演"逆向投资者"角色。你要刻意寻找与市场共识相反的观点。
-
-你的特点：
-- 平衡考虑技术面、基本面、风险管理和市场情绪
-- 刻意寻找与市场共识相反的观点和机会
-- 如果技术指标显示BUY，你要考虑SELL的可能性
-- 如果大家都看HOLD，你要寻找突破机会
-- 确保你的判断与其他三位分析师显著不同
-
-记住：你是OPENAI，要以逆向思维为特色，与众不同为目标。""",
-                
-                'default': '你是一个独立思考的交易分析师，必须给出与其他分析师不同的观点，不要跟随市场共识。'
-            }
-            system_content = system_prompts.get(provider, system_prompts['default'])
+            # 提供商温度参数与系统提示在启动时已编译
+            temperature = self.prompts.temperature(provider)
+            system_content = self.prompts.system_prompt(provider)
             
             payload = {
                 'model': model,
@@ -319,6 +341,24 @@ class AIClient:
                 'frequency_penalty': 0.3,  # 加强惩罚重复内容
                 'presence_penalty': 0.4     # 强力鼓励新话题
             }
+
+            # 相同的提示词+模型+生成参数直接复用缓存的信号（内存，可选持久化到磁盘）
+            cache_key = None
+            if config.get('ai', 'request_cache_enabled', True):
+                cache_key = ai_request_cache.make_key(
+                    provider, prompt, model, system=system_content,
+                    **{k: v for k, v in payload.items() if k not in ('model', 'messages')}
+                )
+                cached = ai_request_cache.lookup(cache_key)
+                if cached:
+                    log_info(f"🎯 {provider} 使用缓存的AI响应")
+                    return self._signal_from_cache(provider, cached)
+
+            # 流式模式：signal/confidence 一到即可决策，不必等完整理由
+            streaming = bool(config.get('ai', 'streaming', False))
+            if streaming:
+                payload['stream'] = True
+                payload['stream_options'] = {'include_usage': True}  # 流结束时返回usage
             
             # 获取提供商特定的超时配置
             provider_timeout = self.timeout_config.get(provider, self.timeout_config['openai'])
@@ -326,107 +366,129 @@ class AIClient:
             # 动态调整超时时间
             adjusted_timeout = self._calculate_dynamic_timeout(provider, provider_timeout)
             
+            # 按提供商限流（GCRA），排队时间不计入响应延迟
+            if config.get('ai', 'rate_limit_enabled', True):
+                max_wait = float(config.get('ai', 'rate_limit_max_wait', 5.0))
+                if not await rate_limiter.wait_for_permission(provider, timeout=max_wait):
+                    raise RateLimitWaitExceeded(f"{provider} 本地限流排队超过{max_wait:.0f}秒")
+
             # 记录请求开始时间
             request_start_time = time.time()
             
-            # 创建持久化会话，提高连接稳定性
-            connector = aiohttp.TCPConnector(
-                limit=30,  # 连接池限制
-                limit_per_host=10,  # 每个主机最大连接数
-                ttl_dns_cache=300,  # DNS缓存时间5分钟
-                use_dns_cache=True,  # 启用DNS缓存
-                keepalive_timeout=30,  # 保持连接超时
-                enable_cleanup_closed=True  # 清理已关闭的连接
-            )
-            
-            async with aiohttp.ClientSession(
-                connector=connector,
-                timeout=aiohttp.ClientTimeout(
-                    total=adjusted_timeout['total_timeout'],
-                    connect=adjusted_timeout['connection_timeout'],
-                    sock_read=adjusted_timeout['response_timeout']
-                )
-            ) as session:
-                try:
-                    async with session.post(
-                        url,
-                        headers=headers,
-                        json=payload,
-                        ssl=True,  # 启用SSL验证
-                        allow_redirects=True,  # 允许重定向
-                        max_redirects=5  # 最大重定向次数
-                    ) as response:
-                        
-                        # 记录响应时间
-                        response_time = time.time() - request_start_time
+            # 复用提供商的持久会话（keep-alive），避免每次请求重新握手
+            session = self.session_pool.get_session(provider)
+            try:
+                async with session.post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    ssl=True,  # 启用SSL验证
+                    allow_redirects=True,  # 允许重定向
+                    max_redirects=5,  # 最大重定向次数
+                    timeout=aiohttp.ClientTimeout(
+                        total=adjusted_timeout['total_timeout'],
+                        connect=adjusted_timeout['connection_timeout'],
+                        sock_read=adjusted_timeout['response_timeout']
+                    )
+                ) as response:
+                    
+                    # 记录响应时间（流式响应在决策字段到达时记录）；
+                    # 只有200响应计入延迟样本，故障期间快速返回的4xx/5xx/429不会拉低对冲分位数
+                    is_stream = streaming and response.content_type == 'text/event-stream'
+                    response_time = time.time() - request_start_time
+                    if response.status != 200:
+                        self._update_timeout_stats(provider, 0, False, timeout_type='http_error')
+                    elif not is_stream:
                         self._update_timeout_stats(provider, response_time, True)
-                        
-                        if response.status == 200:
-                            try:
-                                # 先读取响应文本，再解析JSON，避免连接关闭问题
-                                response_text = await response.text()
-                                if not response_text:
-                                    log_error(f"{provider} 响应文本为空")
-                                    return None
-                                
-                                data = json.loads(response_text)
-                                if data is None:
-                                    log_error(f"{provider} 响应数据为None")
-                                    return None
-                                return self._parse_ai_response(provider, data)
-                            except json.JSONDecodeError as e:
-                                log_error(f"{provider} JSON解析失败: {e}")
-                                log_error(f"{provider} 响应文本: {response_text[:200]}...")
-                                return None
-                            except aiohttp.SocketTimeoutError as e:
-                                # 专门的socket超时错误处理
-                                self._update_timeout_stats(provider, 0, False, timeout_type='socket_timeout')
-                                log_error(f"{provider} Socket超时，服务器响应过慢: {e}")
-                                log_info(f"建议检查网络连接或稍后再试")
+
+                    # 429时按 Retry-After 暂停该提供商并降低速率
+                    if response.status == 429:
+                        rate_limiter.on_rate_limited(provider, parse_retry_after(response.headers.get('Retry-After')))
+                    rate_limiter.record_request_result(provider, response.status == 200, response_time)
+                    if response.status == 429:
+                        raise ProviderRateLimited(f"{provider} 返回429，已按Retry-After暂停并降低速率")
+
+                    if response.status == 200 and is_stream:
+                        signal = await self._read_streaming_signal(provider, response, request_start_time)
+                        return self._cache_signal(cache_key, signal)
+
+                    if response.status == 200:
+                        try:
+                            # 先读取响应文本，再解析JSON，避免连接关闭问题
+                            response_text = await response.text()
+                            if not response_text:
+                                log_error(f"{provider} 响应文本为空")
                                 return None
-                            except Exception as e:
-                                log_error(f"{provider} 响应处理失败: {type(e).__name__}: {e}")
-                                import traceback
-                                log_error(f"响应处理堆栈:\n{traceback.format_exc()}")
+                            
+                            data = loads(response_text)
+                            if data is None:
+                                log_error(f"{provider} 响应数据为None")
                                 return None
-                        else:
-                            error_text = await response.text()
-                            log_error(f"{provider} API调用失败: {response.status} - {error_text[:200]}")
+                            if isinstance(data, dict):
+                                self.prompt_cache_stats.record(provider, data.get('usage'), response_time)
+                            signal = self._parse_ai_response(provider, data)
+                            if signal is not None:
+                                signal.response_time = response_time
+                            return self._cache_signal(cache_key, signal)
+                        except json.JSONDecodeError as e:
+                            log_error(f"{provider} JSON解析失败: {e}")
+                            log_error(f"{provider} 响应文本: {response_text[:200]}...")
                             return None
-                        
-                except asyncio.TimeoutError:
-                    # 记录超时统计
-                    self._update_timeout_stats(provider, 0, False, timeout_type='timeout')
-                    log_error(f"{provider} 请求超时（{adjusted_timeout['total_timeout']}秒）")
-                    raise  # 重新抛出异常供上层处理
-                    
-                except aiohttp.ClientConnectionError as e:
-                    # 专门的连接错误处理
-                    self._update_timeout_stats(provider, 0, False, timeout_type='connection_error')
-                    log_error(f"{provider} 连接错误: {type(e).__name__}: {e}")
-                    raise  # 重新抛出异常供上层处理
-                    
-                except aiohttp.ClientPayloadError as e:
-                    # 专门的载荷错误处理
-                    self._update_timeout_stats(provider, 0, False, timeout_type='payload_error')
-                    log_error(f"{provider} 载荷错误: {type(e).__name__}: {e}")
-                    raise  # 重新抛出异常供上层处理
-
-                except aiohttp.SocketTimeoutError as e:
-                    # 专门的socket超时错误处理
-                    self._update_timeout_stats(provider, 0, False, timeout_type='socket_timeout')
-                    log_error(f"{provider} Socket超时，服务器响应过慢: {e}")
-                    log_info(f"建议：1) 检查网络连接 2) 稍后再试 3) 考虑切换其他AI提供商")
-                    raise  # 重新抛出异常供上层处理
-                    
-                except Exception as e:
-                    # 记录异常统计
-                    self._update_timeout_stats(provider, 0, False, timeout_type='error')
-                    log_error(f"{provider} API调用异常: {type(e).__name__}: {e}")
-                    import traceback
-                    log_error(f"{provider} 完整堆栈:\n{traceback.format_exc()}")
-                    raise  # 重新抛出异常供上层处理
-                        
+                        except aiohttp.SocketTimeoutError as e:
+                            # 专门的socket超时错误处理
+                            self._update_timeout_stats(provider, 0, False, timeout_type='socket_timeout')
+                            log_error(f"{provider} Socket超时，服务器响应过慢: {e}")
+                            log_info(f"建议检查网络连接或稍后再试")
+                            return None
+                        except Exception as e:
+                            log_error(f"{provider} 响应处理失败: {type(e).__name__}: {e}")
+                            import traceback
+                            log_error(f"响应处理堆栈:\n{traceback.format_exc()}")
+                            return None
+                    else:
+                        error_text = await response.text()
+                        log_error(f"{provider} API调用失败: {response.status} - {error_text[:200]}")
+                        return None
+
+            except RateLimited:
+                raise
+
+            except asyncio.TimeoutError:
+                # 记录超时统计
+                self._update_timeout_stats(provider, 0, False, timeout_type='timeout')
+                log_error(f"{provider} 请求超时（{adjusted_timeout['total_timeout']}秒）")
+                raise  # 重新抛出异常供上层处理
+                
+            except aiohttp.ClientConnectionError as e:
+                # 专门的连接错误处理
+                self._update_timeout_stats(provider, 0, False, timeout_type='connection_error')
+                log_error(f"{provider} 连接错误: {type(e).__name__}: {e}")
+                raise  # 重新抛出异常供上层处理
+                
+            except aiohttp.ClientPayloadError as e:
+                # 专门的载荷错误处理
+                self._update_timeout_stats(provider, 0, False, timeout_type='payload_error')
+                log_error(f"{provider} 载荷错误: {type(e).__name__}: {e}")
+                raise  # 重新抛出异常供上层处理
+
+            except aiohttp.SocketTimeoutError as e:
+                # 专门的socket超时错误处理
+                self._update_timeout_stats(provider, 0, False, timeout_type='socket_timeout')
+                log_error(f"{provider} Socket超时，服务器响应过慢: {e}")
+                log_info(f"建议：1) 检查网络连接 2) 稍后再试 3) 考虑切换其他AI提供商")
+                raise  # 重新抛出异常供上层处理
+                
+            except Exception as e:
+                # 记录异常统计
+                self._update_timeout_stats(provider, 0, False, timeout_type='error')
+                log_error(f"{provider} API调用异常: {type(e).__name__}: {e}")
+                import traceback
+                log_error(f"{provider} 完整堆栈:\n{traceback.format_exc()}")
+                raise  # 重新抛出异常供上层处理
+
+        except RateLimited:
+            raise  # 限流由限流器处理，调用方区别于提供商故障
+
         except Exception as e:
             log_error(f"{provider} API调用异常: {type(e).__name__}: {e}")
             import traceback
@@ -564,10 +626,12 @@ class AIClient:
             
             await asyncio.sleep(delay)
             
-            # 检查重试成本限制
+            # 检查重试成本限制与全局重试预算
             if not self._check_retry_cost_limit(provider):
                 log_warning(f"⚠️ {provider} 重试成本超出限制，停止重试")
                 break
+            if not retry_budget.try_acquire(f"ai:{provider}"):
+                break
                 
             # 更新重试成本
             self._update_retry_cost(provider)
@@ -610,7 +674,7 @@ class AIClient:
                                 log_warning(f"{provider} 重试响应为空")
                                 continue
                                 
-                            data = json.loads(response_text)
+                            data = loads(response_text)
                             log_info(f"✅ {provider} 重试成功")
                             return data
                         except json.JSONDecodeError as e:
@@ -627,6 +691,7 @@ class AIClient:
                         # 针对特定状态码的特殊处理
                         if response.status == 429:  # 速率限制
                             log_warning(f"{provider} 遇到速率限制，增加延迟")
+                            rate_limiter.on_rate_limited(provider, parse_retry_after(response.headers.get('Retry-After')))
                             await asyncio.sleep(delay * 2)  # 额外延迟
                         elif response.status >= 500:  # 服务器错误
                             log_warning(f"{provider} 服务器错误，继续重试")
@@ -665,473 +730,204 @@ class AIClient:
         return self._build_enhanced_prompt('default', market_data)
     
     def _build_enhanced_prompt(self, provider: str, market_data: Dict[str, Any]) -> str:
-        """构建增强的AI提示词 - 融合之前项目的成功经验"""
-        
-        # 安全获取基础数据
-        price = float(market_data.get('price', 0))
-        trend = str(market_data.get('trend_strength', '震荡'))
-        volatility = str(market_data.get('volatility', 'normal'))
-        atr_pct = float(market_data.get('atr_pct', 0))
-        
-        # 安全获取持仓信息
-        position = market_data.get('position') or {}
-        position_size = float(position.get('size', 0))
-        entry_price = float(position.get('entry_price', 0))
-        unrealized_pnl = float(position.get('unrealized_pnl', 0))
-        
-        # 获取技术指标数据
-        technical_data = market_data.get('technical_data', {})
-        rsi = float(technical_data.get('rsi', 50))
-        macd = technical_data.get('macd', 'N/A')
-        ma_status = technical_data.get('ma_status', 'N/A')
-        
-        # 获取趋势分析数据
-        trend_analysis = market_data.get('trend_analysis', {})
-        overall_trend = trend_analysis.get('overall', 'N/A')
-        
-        # 计算价格位置（相对高低位置）
-        price_history = market_data.get('price_history', [])
-        price_position = 50  # 默认中位
-        if price_history and len(price_history) >= 20:
-            recent_prices = price_history[-20:]
-            min_price = min(recent_prices)
-            max_price = max(recent_prices)
-            if max_price > min_price:
-                price_position = ((price - min_price) / (max_price - min_price)) * 100
-        
-        # 计算价格变化
-        price_change_pct = float(market_data.get('price_change_pct', 0))
-        
-        # 构建持仓状态描述
-        if position_size <= 0:
-            position_desc = "空仓"
-            position_text = "💰 当前无持仓，可灵活操作"
-        else:
-            position_desc = f"多仓 {position_size}张, 入场价 ${entry_price:.2f}, 未实现盈亏 ${unrealized_pnl:.2f}"
-            pnl_pct = ((price - entry_price) / entry_price * 100) if entry_price > 0 else 0
-            position_text = f"📊 持仓状态: {position_size}BTC @ ${entry_price:.2f} (盈亏: {pnl_pct:+.2f}%)"
-        
-        # 获取AI信号历史
-        last_signal_info = ""
-        signal_history = market_data.get('signal_history', [])
-        if signal_history:
-            last_signal = signal_history[-1]
-            last_signal_info = f"🔄 上次信号: {last_signal.get('signal', 'N/A')} (信心: {last_signal.get('confidence', 0):.1f})"
-        
-        # 构建技术指标状态
-        rsi_status = "超卖" if rsi < 35 else "超买" if rsi > 70 else "正常"
-        
-        # 构建博弈策略权重
-        buy_weight_multiplier = 1.0
-        if price_position < 25:  # 价格低位
-            buy_weight_multiplier = 1.5
-        elif price_position > 75:  # 价格高位
-            buy_weight_multiplier = 0.7
-        
-        # 检测震荡市条件
-        is_consolidation = (
-            atr_pct < 1.5 and
-            abs(price_change_pct) < 4 and
-            price_position > 25 and
-            price_position < 75
-        )
-        
-        # 构建风控提示
-        tp_sl_hint = ""
-        if is_consolidation:
-            tp_sl_hint = "⚠️ 震荡市: 止盈0.8%，止损0.5%，仓位降低至60%"
-        elif atr_pct > 3.0:
-            tp_sl_hint = "⚠️ 高波动: 扩大止损范围，谨慎操作"
-        else:
-            tp_sl_hint = "✅ 正常波动: 标准止盈止损设置"
-        
-        # 构建市场情绪
-        sentiment_text = ""
-        if rsi < 30:
-            sentiment_text = "📉 市场情绪: 极度恐慌，可能反弹"
-        elif rsi > 70:
-            sentiment_text = "📈 市场情绪: 极度贪婪，可能回调"
-        elif is_consolidation:
-            sentiment_text = "➡️ 市场情绪: 震荡观望，等待方向"
-        else:
-            sentiment_text = "😐 市场情绪: 相对平衡"
-        
-        # 为不同提供商定制分析框架 - 基于之前项目的成功经验
-        provider_frameworks = {
-            'deepseek': f"""
-【🎯 DEEPSEEK核心价格分析】
-当前价格: ${price:,.2f}
-相对位置: {price_position:.1f}% (0%=底部,100%=顶部)
-价格变化: {price_change_pct:+.2f}%
-波动率: {atr_pct:.2f}%
-
-【📊 技术状态】
-RSI: {rsi:.1f} ({rsi_status})
-MACD: {macd}
-均线状态: {ma_status}
-
-【💰 博弈策略】
-价格低位权重: {buy_weight_multiplier:.1f}x
-超卖信号: {'✅' if rsi < 35 else '❌'}
-低波动机会: {'✅' if atr_pct < 1.5 else '❌'}
-
-【🎯 震荡市专用策略】
-震荡市识别：价格波动<4%，ATR<1.5%，趋势强度<0.5%
-🔄 区间交易策略：
-1. 靠近支撑位（<25%）+ 反转信号 → HIGH信心BUY
-2. 靠近阻力位（>75%）+ 反转信号 → HIGH信心SELL
-3. 区间中点（40-60%）+ 明确信号 → MEDIUM信心交易
-4. 区间突破立即止损（0.3%）
-
-⚠️ 震荡市风控：
-- 每日最多2次交易
-- 盈利0.8%立即止盈
-- 亏损0.5%立即止损
-- 仓位降低至60%
-- 最长持仓2小时
-
-🚫 禁止交易：
-- 波动率<1.5%（无行情）
-- 无明确区间形成
-- 区间太窄（<0.5%）或太宽（>4%）
-""",
-            'kimi': f"""
-【KIMI当前市场分析】
-价格: ${price:,.2f}
-变化: {price_change_pct:+.2f}%
-RSI: {rsi:.1f}
-趋势: {overall_trend}
-
-【K线数据】
-基于{len(price_history) if price_history else 0}根K线的技术分析
-
-【持仓状态】
-{position_text}
-{last_signal_info}
-
-【KIMI策略要求】
-1. 专注15分钟周期交易
-2. 基于市场波动率动态设置止盈止损
-3. RSI交易规则：
-   - RSI<35：超卖区域，优先买入
-   - RSI>70：超买区域，优先卖出
-   - 35≤RSI≤70：中性区域，结合趋势判断
-4. 震荡市区间交易，趋势市顺势交易
-5. 动态止盈止损：系统会自动基于市场波动率和持仓状态计算最优TP/SL
-""",
-            'qwen': f"""
-【QWEN量化市场分析】
-当前价格: ${price:,.2f}
-价格变化: {price_change_pct:+.2f}%
-RSI(14): {rsi:.1f}
-ATR: {atr_pct:.2f}%
-趋势强度: {trend}
-
-【K线量化分析】
-基于{len(price_history) if price_history else 0}根K线的统计模型
-
-【持仓量化状态】
-{position_text}
-
-【QWEN动态风控参数】
-- 基于ATR波动率动态调整止损止盈
-- 系统会自动计算最优TP/SL
-- 最大仓位: 90%
-- 低波动时降低仓位
-
-【QWEN量化决策要求】
-完全基于统计模型和概率计算
-信心等级要反映统计显著性
-用数据说话，避免主观判断
-""",
-            'openai': f"""
-【OPENAI综合分析框架】
-技术面: RSI={rsi:.1f}, 趋势={overall_trend}
-基本面: {sentiment_text}
-风险管理: {tp_sl_hint}
-市场结构: {"震荡" if is_consolidation else "趋势"}
-
-【当前市场数据】
-价格: ${price:,.2f} (位置: {price_position:.1f}%)
-波动: {atr_pct:.2f}%
-持仓: {position_text}
-
-【OPENAI决策矩阵】
-多重确认: 技术+情绪+风险综合评分
-独立判断: 避免羊群效应，刻意寻找不同观点
-动态调整: 根据市场状态实时修正
-逆向思维: 与主流观点保持适当差异
-""",
-            'default': f"""
-【市场分析】
-价格: ${price:.2f} (位置: {price_position:.1f}%)
-波动: {atr_pct:.2f}% ({volatility})
-技术: RSI={rsi:.1f} ({rsi_status})
-持仓: {position_text}
-"""
-        }
-        
-        analysis_framework = provider_frameworks.get(provider, provider_frameworks['default'])
-        
-        # 添加更强的随机性因素，确保不同AI有不同视角
-        import random
-        random_seed = f"{provider}_{int(time.time() / 180)}"  # 每3分钟变化一次
-        random.seed(hash(random_seed))
-        
-        # 为不同提供商添加强制性偏见
-        provider_bias = {
-            'deepseek': random.choice(['偏好做多', '偏好做空', '偏好突破']),
-            'kimi': random.choice(['极度保守', '偏向观望', '等待确认']),
-            'qwen': random.choice(['数据支持', '统计显著', '概率优势']),
-            'openai': random.choice(['逆向思维', '与众不同', '挑战共识']),
-            'default': random.choice(['独立思考', '客观分析', '理性判断'])
-        }
-        
-        bias_instruction = provider_bias.get(provider, provider_bias['default'])
-        
-        # 震荡市专用策略 - 为不同提供商定制不同策略
-        consolidation_strategies = {
-            'deepseek': f"""
-【🎯 {provider}震荡市突破策略】
-🔄 技术突破交易规则：
-1. 价格突破区间上轨 → AGGRESSIVE BUY (HIGH信心)
-2. 价格突破区间下轨 → AGGRESSIVE SELL (HIGH信心)
-3. 区间内反弹 → 快速交易，MEDIUM信心
-4. 假突破立即反向操作
-
-⚡ 激进风控：
-- 突破确认后立即重仓
-- 止损设置在突破点外0.2%
-- 盈利1.2%快速止盈
-- 不设置持仓时间限制
-""",
-            'kimi': f"""
-【🎯 {provider}震荡市保守策略】
-🔄 区间观望规则：
-1. 区间内部 → 坚决HOLD，不参与震荡
-2. 突破区间 → 等待回踩确认
-3. 明确趋势形成 → 小仓位试探
-4. 任何不确定 → 保持空仓
-
-⚠️ 保守风控：
-- 80%时间保持HOLD
-- 即使突破也只用20%仓位
-- 止损0.3%非常严格
-- 优先考虑资金安全
-""",
-            'qwen': f"""
-【🎯 {provider}震荡市量化策略】
-📊 数据统计规则：
-1. 突破概率 > 65% → BUY/SELL (基于历史回测)
-2. 震荡概率 > 70% → HOLD (统计显著)
-3. 收益风险比 > 2:1 → 执行交易
-4. 胜率 < 55% → 放弃交易
-
-📈 量化的风控：
-- 基于凯利公式计算仓位
-- 止损=2×ATR，止盈=3×ATR
-- 期望值为正才交易
-- 严格遵循统计规律
-""",
-            'openai': f"""
-【🎯 {provider}震荡市逆向策略】
-🔄 反向交易规则：
-1. 区间顶部 → 反向SELL (别人贪婪我恐惧)
-2. 区间底部 → 反向BUY (别人恐惧我贪婪)
-3. 突破初期 → 等待假突破机会
-4. 共识形成 → 反向操作
-
-🎯 逆向风控：
-- 与主流观点相反操作
-- 提前布局，提前退出
-- 小止损，大止盈
-- 利用市场情绪获利
-""",
-            'default': f"""
-【🎯 震荡市通用策略】
-🔄 标准区间规则：
-1. 区间交易，高抛低吸
-2. 突破跟进，趋势跟随
-3. 严格止损，保护资金
-4. 灵活应对，随机应变
-
-⚠️ 标准风控：
-- 合理控制仓位
-- 设置止损止盈
-- 保持理性判断
-"""
-        }
-        
-        consolidation_strategy = consolidation_strategies.get(provider, consolidation_strategies['default'])
-        
-        prompt = f"""
-你是专业的BTC波段交易大师，专注精准抄底和趋势跟踪。
-
-{analysis_framework}
-
-【📊 核心市场数据】
-当前价格: ${price:,.2f} (相对位置: {price_position:.1f}%)
-价格变化: {price_change_pct:+.2f}%
-ATR波动率: {atr_pct:.2f}%
-市场趋势: {trend}
-整体技术: {overall_trend}
-
-【💰 持仓状态】
-{position_text}
-{last_signal_info}
-
-【🔧 技术分析】
-RSI: {rsi:.1f} ({rsi_status})
-MACD: {macd}
-均线状态: {ma_status}
-
-{consolidation_strategy}
-
-【⚠️ 风险控制】
-{tp_sl_hint}
-仓位管理: 基于价格位置动态调整
-止损设置: 根据ATR波动率实时计算
-
-【🎯 交易决策要求】
-1. 信号类型：BUY（买入）/SELL（卖出）/HOLD（观望）
-2. 信心等级：HIGH（高）/MEDIUM（中）/LOW（低）
-3. 详细分析理由（包含技术面、情绪面、风险分析）
-4. 具体风险提示和止损建议
-
-【⚡ 关键提醒 - 强制差异化要求】
-- 你必须给出与其他AI完全不同的判断
-- 当前偏见: {bias_instruction}
-- 不要参考其他分析师的观点
-- 基于你的专业角度独立决策
-- 即使市场看起来明显，也要寻找不同视角
-
-请以JSON格式回复，包含以下字段：
-{{
-    "signal": "BUY/SELL/HOLD",
-    "confidence": "HIGH|MEDIUM|LOW",
-    "reason": "详细分析理由（不少于100字）",
-    "risk": "具体风险提示和止损建议"
-}}
-"""
-        return prompt
+        """构建增强的AI提示词 - 融合之前项目的成功经验
+
+        静态部分已预编译，市场数据部分同一周期只渲染一次（见 ai/prompts.py）
+        """
+        return self.prompts.build(provider, market_data)
     
+    async def _read_streaming_signal(self, provider: str, response: aiohttp.ClientResponse,
+                                     request_start_time: float) -> Optional[AISignal]:
+        """读取流式响应：决策字段完整后最多再等 AI_STREAM_REASON_GRACE 秒补全理由"""
+        result = await read_signal_stream(response, float(config.get('ai', 'stream_reason_grace', 2.0)))
+        stats = result['stats']
+        fields = result['fields']
+
+        if fields is None:
+            self._update_timeout_stats(provider, 0, False, timeout_type='error')
+            log_error(f"{provider} 流式响应未包含有效信号字段: {result['content'][:200]}")
+            return None
+
+        # 延迟统计（对冲分位数）以拿到决策字段的时间为准
+        decision_time = (time.time() - request_start_time) - (stats['time_total'] - (stats['time_to_signal'] or stats['time_total']))
+        self._update_timeout_stats(provider, decision_time, True)
+        self.prompt_cache_stats.record(provider, result.get('usage'), decision_time)
+        log_info(f"🌊 {provider} 流式决策: {decision_time:.2f}s 获得信号"
+                 f"{'' if stats['reason_complete'] else '（理由未完整，已截断）'}")
+
+        raw_response = {
+            'choices': [{'message': {'role': 'assistant', 'content': result['content']}}],
+            'stream': stats,
+            'usage': result.get('usage')
+        }
+        signal = self._build_signal(provider, fields, raw_response)
+        signal.response_time = decision_time
+        return signal
+
+    def _cache_signal(self, cache_key: Optional[str], signal: Optional[AISignal]) -> Optional[AISignal]:
+        """缓存成功解析的信号"""
+        if cache_key and signal is not None:
+            ai_request_cache.store(cache_key, signal.provider, {
+                'signal': signal.signal,
+                'confidence': signal.confidence,
+                'reason': signal.reason,
+                'raw_response': signal.raw_response
+            })
+        return signal
+
+    def _signal_from_cache(self, provider: str, cached: Dict[str, Any]) -> AISignal:
+        """由缓存条目还原AI信号"""
+        return AISignal(
+            provider=provider,
+            signal=cached['signal'],
+            confidence=cached['confidence'],
+            reason=cached['reason'],
+            timestamp=datetime.now().isoformat(),
+            raw_response={**(cached.get('raw_response') or {}), 'cached': True}
+        )
+
+    def get_request_cache_stats(self) -> Dict[str, Any]:
+        """获取AI请求缓存统计"""
+        return ai_request_cache.get_stats()
+
+    def _build_signal(self, provider: str, parsed: Dict[str, Any], raw_response: Dict[str, Any]) -> AISignal:
+        """由解析出的字段构建AI信号"""
+        # 确保signal值不为None
+        signal_value = str(parsed.get('signal', 'HOLD')).upper()
+
+        return AISignal(
+            provider=provider,
+            signal=signal_value,
+            confidence=confidence_value(parsed.get('confidence')),
+            reason=str(parsed.get('reason', 'AI分析')),
+            timestamp=datetime.now().isoformat(),
+            raw_response=raw_response
+        )
+
     def _parse_ai_response(self, provider: str, response_data: Dict[str, Any]) -> Optional[AISignal]:
-        """解析AI响应"""
-        try:
-            if not response_data:
-                log_error(f"{provider}响应数据为空")
-                return None
-                
-            choices = response_data.get('choices')
-            if not choices or not isinstance(choices, list) or len(choices) == 0:
-                log_error(f"{provider}响应无choices或格式错误: {response_data}")
-                return None
-                
-            first_choice = choices[0]
-            if not first_choice or not isinstance(first_choice, dict):
-                log_error(f"{provider}响应choices[0]格式错误: {response_data}")
-                return None
-                
-            message = first_choice.get('message')
-            if not message or not isinstance(message, dict):
-                log_error(f"{provider}响应无message或格式错误: {response_data}")
-                return None
-                
-            content = message.get('content')
-            if not content:
-                log_error(f"{provider}响应无content: {response_data}")
-                return None
-            
-            # 清理JSON字符串
-            content = content.strip()
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0]
-            elif '```' in content:
-                content = content.split('```')[1]
-            
-            try:
-                parsed = json.loads(content)
-            except json.JSONDecodeError as e:
-                log_error(f"{provider}响应JSON解析失败: {e}")
-                return None
-            
-            # 映射信心等级到数值
-            confidence_map = {
-                'HIGH': 0.9,
-                'MEDIUM': 0.7,
-                'LOW': 0.5
-            }
-            
-            # 确保confidence值不为None
-            confidence_str = str(parsed.get('confidence', 'MEDIUM')).upper()
-            confidence_value = confidence_map.get(confidence_str, 0.7)
-            
-            # 确保signal值不为None
-            signal_value = str(parsed.get('signal', 'HOLD')).upper()
-            
-            return AISignal(
-                provider=provider,
-                signal=signal_value,
-                confidence=confidence_value,
-                reason=str(parsed.get('reason', 'AI分析')),
-                timestamp=datetime.now().isoformat(),
-                raw_response=response_data
-            )
-            
-        except Exception as e:
-            log_error(f"解析{provider}响应失败: {type(e).__name__}: {e}")
-            import traceback
-            log_error(f"解析{provider}响应堆栈:\n{traceback.format_exc()}")
+        """解析AI响应（共用解析器，见 ai/response_parser.py）"""
+        parsed = response_parser.parse(provider, response_data)
+        if parsed is None:
             return None
+        return self._build_signal(provider, parsed, response_data)
+
+    def get_response_parser_stats(self) -> Dict[str, Any]:
+        """获取AI响应解析统计（最近的失败样本见 response_parser.get_failure_samples）"""
+        return response_parser.get_stats()
     
     async def get_multi_ai_signals(self, market_data: Dict[str, Any], providers: List[str] = None) -> List[AISignal]:
-        """获取多AI信号（增强版）- 并行执行，支持部分成功"""
+        """获取多AI信号（增强版）- 并行执行，支持部分成功
+
+        法定人数模式（AI_QUORUM>0）下，K个提供商成功返回、或剩余未返回的票已无法改变融合结果（BUY/SELL达到融合门槛）时立即返回；
+        所有模式下超过每周期硬截止时间（AI_FANOUT_DEADLINE）都直接返回已收到的信号。
+        未返回的提供商按 AI_STRAGGLER_POLICY 取消（cancel）或在后台继续完成（background，仅用于统计）。
+        本次计入融合的提供商记录在 last_fanout 中。
+        """
         if providers is None:
             providers = ['deepseek', 'kimi', 'openai']
 
         # 过滤掉未配置的提供商
         enabled_providers = [p for p in providers if self.providers.get(p, {}).get('api_key')]
 
+        # 熔断中的提供商直接跳过，不占用本周期的重试与超时预算（冷却结束时在后台探测）
+        open_providers = [p for p in enabled_providers if not self._breaker_allows(p)]
+        if open_providers:
+            log_warning(f"⚡ 跳过熔断中的提供商: {open_providers}")
+            enabled_providers = [p for p in enabled_providers if p not in open_providers]
+
         if not enabled_providers:
             log_warning("没有可用的AI提供商")
             return []
 
-        log_info(f"🚀 并行获取多AI信号: {enabled_providers}")
+        quorum = min(int(config.get('ai', 'quorum', 0) or 0), len(enabled_providers))
+        deadline = float(config.get('ai', 'fanout_deadline', 40.0))
+        straggler_policy = config.get('ai', 'straggler_policy', 'cancel')
 
-        # 为每个提供商创建一个带超时和重试的任务
-        tasks = []
-        for provider in enabled_providers:
-            task = self._get_single_ai_signal_with_retry(provider, market_data)
-            tasks.append(task)
+        log_info(f"🚀 并行获取多AI信号: {enabled_providers}" + (f"（法定人数 {quorum}/{len(enabled_providers)}）" if quorum else ""))
 
-        # 并行执行所有任务，等待最多30秒（总超时）
-        # 使用return_exceptions=True让成功的任务正常返回，失败的任务返回异常
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # 市场数据部分本周期只渲染一次，各提供商共享
+        self.prompts.prepare(market_data)
+
+        # 为每个提供商创建一个带超时和重试的任务
+        start_time = time.time()
+        task_providers = {
+            asyncio.create_task(self._get_single_ai_signal_with_retry(provider, market_data)): provider
+            for provider in enabled_providers
+        }
+        pending = set(task_providers)
 
         # 分离成功和失败的结果
         signals = []
         successful_providers = []
         failed_providers = []
+        early_return = None
 
-        for i, result in enumerate(results):
-            provider = enabled_providers[i]
-            if isinstance(result, Exception):
-                # 任务抛出异常（超时、连接错误等）
-                log_error(f"❌ {provider} 信号获取异常: {type(result).__name__}")
-                failed_providers.append(provider)
-            elif result is None:
-                # 任务返回None（所有重试都失败）
-                log_error(f"❌ {provider} 信号获取失败（最终返回None）")
-                failed_providers.append(provider)
-            else:
-                # 成功获取信号
-                signal = result
-                signals.append(signal)
-                successful_providers.append(provider)
-                log_info(f"✅ {provider.upper()} 成功: {signal.signal} (信心: {signal.confidence:.1f})")
+        while pending:
+            remaining_time = deadline - (time.time() - start_time)
+            if remaining_time <= 0:
+                early_return = 'deadline'
+                log_warning(f"⏰ 多AI请求达到每周期截止时间 AI_FANOUT_DEADLINE={deadline:.0f}秒，使用已返回的 {len(signals)} 个信号")
+                break
+
+            try:
+                done, pending = await asyncio.wait(pending, timeout=remaining_time, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                # 调用方整体超时/取消时不遗留提供商请求
+                for task in pending:
+                    task.cancel()
+                raise
+            for task in done:
+                provider = task_providers[task]
+                if task.cancelled() or task.exception() is not None:
+                    # 任务抛出异常（超时、连接错误等）
+                    error = 'Cancelled' if task.cancelled() else type(task.exception()).__name__
+                    log_error(f"❌ {provider} 信号获取异常: {error}")
+                    failed_providers.append(provider)
+                elif task.result() is None:
+                    # 任务返回None（所有重试都失败）
+                    log_error(f"❌ {provider} 信号获取失败（最终返回None）")
+                    failed_providers.append(provider)
+                else:
+                    # 成功获取信号
+                    signal = task.result()
+                    signals.append(signal)
+                    successful_providers.append(provider)
+                    log_info(f"✅ {provider.upper()} 成功: {signal.signal} (信心: {signal.confidence:.1f})")
+
+            if pending and quorum:
+                if len(signals) >= quorum:
+                    early_return = 'quorum'
+                elif self._is_vote_decided(signals, len(pending)):
+                    early_return = 'decided'
+                if early_return:
+                    break
+
+        stragglers = [task_providers[task] for task in pending]
+        if stragglers:
+            reason = {'quorum': f'已达法定人数 {quorum}', 'decided': '剩余票数无法改变融合结果',
+                      'deadline': f'超过截止时间 {deadline:.0f}秒'}[early_return]
+            action = '后台继续' if straggler_policy == 'background' else '取消'
+            log_info(f"⚡ 提前返回（{reason}），未返回的提供商{action}: {stragglers}")
+            for task in pending:
+                if straggler_policy == 'background':
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._on_straggler_done)
+                else:
+                    task.cancel()
+
+        self.last_fanout = {
+            'counted_providers': successful_providers,
+            'failed_providers': failed_providers,
+            'stragglers': stragglers,
+            'straggler_policy': straggler_policy,
+            'early_return': early_return,
+            'quorum': quorum,
+            'elapsed': time.time() - start_time
+        }
 
         # 记录统计信息
-        log_info(f"📊 多AI信号获取统计: 成功={len(successful_providers)}, 失败={len(failed_providers)}")
+        log_info(f"📊 多AI信号获取统计: 成功={len(successful_providers)}, 失败={len(failed_providers)}, "
+                 f"未返回={len(stragglers)}, 耗时={self.last_fanout['elapsed']:.2f}s")
         if successful_providers:
             log_info(f"✅ 成功提供商: {successful_providers}")
         if failed_providers:
@@ -1142,17 +938,55 @@ MACD: {macd}
 
         return signals
 
+    @classmethod
+    def _is_vote_decided(cls, signals: List[AISignal], outstanding: int) -> bool:
+        """剩余未返回的票无论投给什么、信心多高，融合结果都不会改变时返回True
+
+        fuse_signals 并非简单多数：HOLD共识中出现买卖分歧会突破为BUY/SELL，无多数时按信心选择，
+        因此只有BUY/SELL在最坏情况下（剩余票全部投给其他信号）仍达到弱共识门槛才算确定；
+        此时另外两种信号都不可能达到强/弱共识，已收到的子集融合与等待全部返回的结果一致。
+        HOLD领先永远不算确定。
+        """
+        total = len(signals) + outstanding
+        if not signals or total < 2:
+            return False
+        for direction in ('BUY', 'SELL'):
+            votes = sum(1 for signal in signals if signal.signal == direction)
+            if votes / total >= cls.WEAK_CONSENSUS_THRESHOLD:
+                return True
+        return False
+
+    def _on_straggler_done(self, task: asyncio.Task) -> None:
+        """后台完成的提供商请求：仅记录结果（超时/成功率统计已在请求内部更新）"""
+        self._background_tasks.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            log_info(f"🐢 后台提供商请求失败: {type(task.exception()).__name__}")
+        elif task.result() is not None:
+            signal = task.result()
+            log_info(f"🐢 {signal.provider} 后台完成（未计入融合）: {signal.signal} (信心: {signal.confidence:.1f})")
+
     async def _get_single_ai_signal_with_retry(self, provider: str, market_data: Dict[str, Any]) -> Optional[AISignal]:
         """单个AI信号获取（带重试）- 新实现"""
         provider_config = self.timeout_config.get(provider, self.timeout_config['openai'])
         max_retries = provider_config['max_retries']
 
+        origin = f"ai:{provider}"
+        retry_budget.record_request(origin)
+
         for attempt in range(max_retries + 1):
+            # 重试前提供商已被熔断时不再继续
+            if attempt > 0 and not self.circuit_breakers.allow_request(provider):
+                log_warning(f"⚡ {provider} 已熔断，停止重试")
+                return None
+
+            # 检查重试成本限制（本地决策，不计入熔断器）
+            if attempt > 0 and not self._check_retry_cost_limit(provider):
+                log_warning(f"⚠️ {provider} 重试成本超出限制，跳过重试")
+                return None
+
             try:
-                # 检查重试成本限制
-                if attempt > 0 and not self._check_retry_cost_limit(provider):
-                    log_warning(f"⚠️ {provider} 重试成本超出限制，跳过重试")
-                    raise Exception(f"{provider} 重试成本超出限制")
 
                 # 获取动态调整的超时时间
                 adjusted_timeout = self._calculate_dynamic_timeout(provider, provider_config)
@@ -1160,18 +994,22 @@ MACD: {macd}
 
                 log_info(f"🔄 {provider} 第{attempt + 1}次尝试，超时:{signal_timeout:.1f}s")
 
-                # 获取信号（带个别超时）
+                # 获取信号（带个别超时；超过该提供商的延迟分位数仍未返回时发出对冲请求）
                 signal = await asyncio.wait_for(
-                    self.get_signal_from_provider(provider, market_data),
+                    hedged_call(
+                        lambda: self.get_signal_from_provider(provider, market_data),
+                        self._get_hedge_delay(provider), self.hedge_budget, label=provider
+                    ),
                     timeout=signal_timeout
                 )
+                self._record_breaker_result(provider, signal)
 
                 if signal:
                     # 成功获取信号
                     return signal
                 else:
-                    # 信号为None，继续重试
-                    if attempt < max_retries:
+                    # 信号为None，在全局重试预算内继续重试
+                    if attempt < max_retries and retry_budget.try_acquire(origin):
                         retry_delay = self._calculate_exponential_backoff(provider, attempt, adjusted_timeout['retry_base_delay'])
                         log_warning(f"{provider} 第{attempt + 1}次返回None，{retry_delay:.1f}秒后重试...")
                         await asyncio.sleep(retry_delay)
@@ -1180,9 +1018,19 @@ MACD: {macd}
                         log_error(f"{provider} 最终失败（返回None）")
                         return None
 
+            except RateLimited as e:
+                # 本地限流排队超时或提供商429：由限流器处理，不计入熔断器
+                log_warning(f"⏳ {e}")
+                if attempt < max_retries and retry_budget.try_acquire(origin):
+                    retry_delay = self._calculate_exponential_backoff(provider, attempt, provider_config['retry_base_delay'])
+                    await asyncio.sleep(retry_delay)
+                else:
+                    return None
+
             except asyncio.TimeoutError:
                 log_error(f"{provider} 请求超时（动态超时）")
-                if attempt < max_retries:
+                self.circuit_breakers.record(provider, False)
+                if attempt < max_retries and retry_budget.try_acquire(origin):
                     retry_delay = self._calculate_exponential_backoff(provider, attempt, provider_config['retry_base_delay'])
                     log_info(f"{provider} 超时重试，等待{retry_delay:.1f}秒...")
                     await asyncio.sleep(retry_delay)
@@ -1193,7 +1041,8 @@ MACD: {macd}
 
             except Exception as e:
                 log_error(f"{provider} 异常: {e}")
-                if attempt < max_retries:
+                self.circuit_breakers.record(provider, False)
+                if attempt < max_retries and retry_budget.try_acquire(origin):
                     retry_delay = self._calculate_exponential_backoff(provider, attempt, provider_config['retry_base_delay'])
                     log_info(f"{provider} 异常重试，等待{retry_delay:.1f}秒...")
                     await asyncio.sleep(retry_delay)
@@ -1205,6 +1054,81 @@ MACD: {macd}
         # 所有重试都失败
         return None
     
+    def _record_breaker_result(self, provider: str, signal: Optional[AISignal]) -> None:
+        """记录一次请求结果到熔断器（缓存命中的信号不反映提供商状态，不计入）
+
+        慢请求按请求发出后的耗时判断，不含本地限流排队与对冲等待
+        """
+        if signal is not None and (signal.raw_response or {}).get('cached'):
+            return
+        self.circuit_breakers.record(provider, signal is not None, (signal.response_time or 0.0) if signal else 0.0)
+
+    def _breaker_allows(self, provider: str) -> bool:
+        """熔断器是否放行该提供商；冷却结束时在后台发起一次探测"""
+        if self.circuit_breakers.allow_request(provider):
+            return True
+        if self.circuit_breakers.get(provider).probe_due():
+            task = asyncio.create_task(self._probe_provider(provider))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        return False
+
+    async def _probe_provider(self, provider: str) -> bool:
+        """熔断探测：发送一个最小的chat请求（max_tokens=1），返回200即视为恢复"""
+        provider_config = self.providers[provider]
+        timeout = self.timeout_config.get(provider, self.timeout_config['openai'])['total_timeout']
+        ok = False
+        try:
+            session = self.session_pool.get_session(provider)
+            async with session.post(
+                provider_config['url'],
+                headers={'Authorization': f"Bearer {provider_config['api_key']}", 'Content-Type': 'application/json'},
+                json={'model': provider_config['model'], 'messages': [{'role': 'user', 'content': 'ping'}],
+                      'max_tokens': 1},
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                await response.read()
+                # 429说明提供商在线，只是被限流：由限流器暂停，熔断器照常恢复
+                ok = response.status in (200, 429)
+                if response.status == 429:
+                    rate_limiter.on_rate_limited(provider, parse_retry_after(response.headers.get('Retry-After')))
+        except Exception as e:
+            log_warning(f"⚡ {provider} 熔断探测失败: {type(e).__name__}: {e}")
+        finally:
+            # 探测任务被取消时也要结束半开状态，否则该提供商会一直被跳过
+            self.circuit_breakers.get(provider).record_probe(ok)
+        return ok
+
+    def get_retry_budget_stats(self) -> Dict[str, Any]:
+        """获取全局重试预算统计（按来源的首次请求、放行与拒绝的重试次数）"""
+        return retry_budget.get_stats()
+
+    def get_circuit_breaker_stats(self) -> Dict[str, Any]:
+        """获取各提供商熔断器状态（closed/open/half_open、窗口失败率、距下次探测的秒数）"""
+        return self.circuit_breakers.get_stats()
+
+    def _get_hedge_delay(self, provider: str) -> Optional[float]:
+        """对冲触发延迟：该提供商近期延迟的 p90/p95，未启用或样本不足时返回None"""
+        if not config.get('ai', 'hedge_enabled', True):
+            return None
+        return self.latency_tracker.percentile(
+            provider,
+            float(config.get('ai', 'hedge_percentile', 0.95)),
+            min_samples=int(config.get('ai', 'hedge_min_samples', 10))
+        )
+
+    def get_hedge_stats(self) -> Dict[str, Any]:
+        """获取对冲请求统计（发出/胜出/预算拒绝）"""
+        return self.hedge_budget.get_stats()
+
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """获取各提供商限流统计（排队延迟、429次数、当前速率倍数）"""
+        return rate_limiter.get_all_stats()
+
+    def get_prompt_cache_stats(self) -> Dict[str, Any]:
+        """获取各提供商提示词缓存命中统计（命中/未命中token、命中与未命中时的平均延迟）"""
+        return self.prompt_cache_stats.get_stats()
+
     def _log_timeout_performance(self):
         """记录超时性能统计"""
         try:
@@ -1216,6 +1140,32 @@ MACD: {macd}
             for provider, stats in self.timeout_stats['provider'].items():
                 if stats['total_requests'] > 0:
                     log_info(f"📊 {provider} 性能: 成功率={stats['success_rate']:.2%}, 平均响应={stats['avg_response_time']:.1f}s, 请求数={stats['total_requests']}")
+
+            hedge_stats = self.hedge_budget.stats
+            if hedge_stats['hedges_issued'] or hedge_stats['budget_denied']:
+                log_info(f"🪝 对冲请求: 发出={hedge_stats['hedges_issued']}, 胜出={hedge_stats['hedges_won']}, "
+                         f"预算拒绝={hedge_stats['budget_denied']}")
+
+            for provider, stats in self.circuit_breakers.get_stats().items():
+                if stats['state'] != 'closed':
+                    probe_in = f"{stats['probe_in_seconds']:.0f}秒后探测" if stats['probe_in_seconds'] is not None else "探测中"
+                    log_info(f"⚡ {provider} 熔断器: {stats['state']}, 熔断={stats['opened']}次, "
+                             f"拒绝={stats['rejected']}次, {probe_in}")
+
+            budget_stats = retry_budget.get_stats()
+            if budget_stats['retries_granted'] or budget_stats['retries_denied']:
+                log_info(f"🪫 重试预算: 首次请求={budget_stats['requests']}, 重试放行={budget_stats['retries_granted']}, "
+                         f"拒绝={budget_stats['retries_denied']}, 剩余令牌={budget_stats['tokens']:.1f}")
+
+            for provider, stats in rate_limiter.get_all_stats().items():
+                if stats['throttled'] or stats['rate_limit_hits']:
+                    log_info(f"🚦 {provider} 限流: 排队={stats['throttled']}次, 平均排队={stats['avg_queue_delay_ms']:.0f}ms, "
+                             f"429={stats['rate_limit_hits']}次, 速率倍数={stats['adaptive_multiplier']:.2f}x")
+
+            for provider, stats in self.prompt_cache_stats.get_stats().items():
+                if stats['with_usage']:
+                    log_info(f"🗃️ {provider} 提示词缓存: token命中率={stats['token_hit_rate']:.1%}, "
+                             f"命中请求={stats['cache_hits']}/{stats['with_usage']}")
                     
         except Exception as e:
             log_error(f"超时性能记录失败: {e}")
@@ -1927,7 +1877,7 @@ MACD: {macd}
         # 🚀 增强决策逻辑 - 减少过度保守倾向
         majority_threshold = 0.5  # 降低门槛到50%
         strong_consensus_threshold = 0.7  # 强共识70%
-        weak_consensus_threshold = 0.6   # 弱共识60%
+        weak_consensus_threshold = self.WEAK_CONSENSUS_THRESHOLD   # 弱共识60%
         
         # 计算各信号的占比
         buy_ratio = buy_votes / total_signals
@@ -2087,19 +2037,30 @@ MACD: {macd}
         if provider not in self.providers or not self.providers[provider].get('api_key'):
             log_error(f"AI提供商 {provider} 未配置或不可用")
             return None
-            
+
+        if not self._breaker_allows(provider):
+            log_warning(f"⚡ {provider} 已熔断，跳过请求")
+            return None
+
         try:
             signal = await asyncio.wait_for(
                 self.get_signal_from_provider(provider, market_data),
                 timeout=10.0  # 从30秒优化到10秒
             )
+            self._record_breaker_result(provider, signal)
             return signal
-            
+
+        except RateLimited as e:
+            log_warning(f"⏳ {e}")
+            return None
+
         except asyncio.TimeoutError:
             log_error(f"{provider} 请求超时（10秒）")
+            self.circuit_breakers.record(provider, False)
             return None
         except Exception as e:
             log_error(f"{provider} 异常: {e}")
+            self.circuit_breakers.record(provider, False)
             return None
 
     def _calculate_dynamic_timeout(self, provider: str, base_config: Dict[str, Any]) -> Dict[str, Any]:
@@ -2177,6 +2138,7 @@ MACD: {macd}
             stats['last_response_time'] = response_time
             
             if success and response_time > 0:
+                self.latency_tracker.record(provider, response_time)
                 # 更新平均响应时间（使用移动平均）
                 if stats['avg_response_time'] == 0:
                     stats['avg_response_time'] = response_time
@@ -4,68 +4,77 @@ AI请求缓存模块
 """
 
 import hashlib
+import heapq
 import json
+import os
 import time
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 不参与缓存键的请求参数（敏感信息或不影响生成内容的传输选项）
+_EXCLUDED_PARAMS = ('api_key', 'token', 'stream', 'stream_options')
+
+
 class AIRequestCache:
-    """AI请求缓存管理器"""
+    """AI请求缓存管理器
+
+    OrderedDict 按访问顺序维护条目，命中时移到末尾、满时淘汰头部，均为O(1)；
+    过期时间记录在最小堆中，每次写入只弹出已到期的条目（均摊O(log n)），不再全表扫描。
+    指定 persist_path 时，每次写入追加一行到JSONL日志，启动时重放未过期的条目，
+    相同的市场状态在重启或回测之间不会重复请求API；日志行数超过容量两倍时压缩重写。
+    """
 
-    def __init__(self, max_size: int = 1000, ttl_seconds: int = 300):
+    def __init__(self, max_size: int = 1000, ttl_seconds: int = 300, persist_path: Optional[str] = None):
         """
         初始化缓存
 
         Args:
             max_size: 最大缓存条目数
             ttl_seconds: 缓存过期时间（秒）
+            persist_path: 持久化文件路径（JSONL），为空时只在内存中缓存
         """
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._access_times: Dict[str, float] = {}
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []  # (过期时间, 键)，条目重写后旧记录惰性丢弃
+        self._journal_lines = 0
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'loaded': 0
+        }
+
+        if self.persist_path:
+            self._load()
 
-    def _generate_cache_key(self, provider: str, prompt: str, model: str, **kwargs) -> str:
-        """生成缓存键"""
-        # 创建标准化的请求数据
+    def make_key(self, provider: str, prompt: str, model: str, **kwargs) -> str:
+        """生成缓存键：规范化的提示词（折叠空白）+ 模型 + 生成参数"""
         cache_data = {
             'provider': provider,
-            'prompt': prompt.strip(),  # 去除首尾空格
+            'prompt': ' '.join(prompt.split()),
             'model': model,
-            'kwargs': {k: v for k, v in sorted(kwargs.items()) if k not in ['api_key', 'token']}  # 排除敏感信息
+            'kwargs': {k: v for k, v in kwargs.items() if k not in _EXCLUDED_PARAMS}  # 排除敏感信息
         }
 
-        # 生成哈希键
         key_str = json.dumps(cache_data, sort_keys=True, ensure_ascii=False)
-        return hashlib.md5(key_str.encode('utf-8')).hexdigest()
+        return hashlib.sha256(key_str.encode('utf-8')).hexdigest()
+
+    # 兼容旧接口
+    _generate_cache_key = make_key
 
     def get(self, provider: str, prompt: str, model: str, **kwargs) -> Optional[Dict[str, Any]]:
         """获取缓存结果"""
         try:
-            cache_key = self._generate_cache_key(provider, prompt, model, **kwargs)
-            current_time = time.time()
-
-            # 检查缓存是否存在
-            if cache_key not in self._cache:
-                return None
-
-            # 检查缓存是否过期
-            cache_entry = self._cache[cache_key]
-            if current_time - cache_entry['timestamp'] > self.ttl_seconds:
-                # 缓存过期，删除条目
-                del self._cache[cache_key]
-                del self._access_times[cache_key]
-                return None
-
-            # 更新访问时间
-            self._access_times[cache_key] = current_time
-
-            logger.debug(f"缓存命中: {provider} - {cache_key[:8]}...")
-            return cache_entry['data']
-
+            return self.lookup(self.make_key(provider, prompt, model, **kwargs))
         except Exception as e:
             logger.error(f"缓存获取失败: {e}")
             return None
@@ -73,77 +82,140 @@ class AIRequestCache:
     def set(self, provider: str, prompt: str, model: str, data: Dict[str, Any], **kwargs) -> None:
         """设置缓存结果"""
         try:
-            cache_key = self._generate_cache_key(provider, prompt, model, **kwargs)
-            current_time = time.time()
-
-            # 清理过期缓存
-            self._cleanup_expired()
-
-            # 如果缓存已满，清理最久未使用的条目
-            if len(self._cache) >= self.max_size:
-                self._cleanup_lru()
-
-            # 设置缓存
-            self._cache[cache_key] = {
-                'data': data,
-                'timestamp': current_time,
-                'provider': provider
-            }
-            self._access_times[cache_key] = current_time
-
-            logger.debug(f"缓存设置: {provider} - {cache_key[:8]}...")
-
+            self.store(self.make_key(provider, prompt, model, **kwargs), provider, data)
         except Exception as e:
             logger.error(f"缓存设置失败: {e}")
 
-    def _cleanup_expired(self) -> None:
-        """清理过期缓存"""
-        try:
-            current_time = time.time()
-            expired_keys = []
+    def lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """按缓存键获取结果（命中时刷新LRU位置）"""
+        entry = self._cache.get(cache_key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
 
-            for key, entry in self._cache.items():
-                if current_time - entry['timestamp'] > self.ttl_seconds:
-                    expired_keys.append(key)
+        if entry['expires_at'] <= time.time():
+            del self._cache[cache_key]
+            self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            return None
 
-            for key in expired_keys:
+        self._cache.move_to_end(cache_key)
+        self.stats['hits'] += 1
+        logger.debug(f"缓存命中: {entry['provider']} - {cache_key[:8]}...")
+        return entry['data']
+
+    def store(self, cache_key: str, provider: str, data: Dict[str, Any]) -> None:
+        """按缓存键写入结果"""
+        now = time.time()
+        self._insert(cache_key, provider, data, now, now + self.ttl_seconds)
+        self.stats['sets'] += 1
+        logger.debug(f"缓存设置: {provider} - {cache_key[:8]}...")
+
+        if self.persist_path:
+            self._append({'key': cache_key, 'provider': provider, 'timestamp': now,
+                          'expires_at': now + self.ttl_seconds, 'data': data})
+
+    def _insert(self, cache_key: str, provider: str, data: Dict[str, Any],
+                timestamp: float, expires_at: float) -> None:
+        self._cleanup_expired(timestamp)
+
+        if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+        elif len(self._cache) >= self.max_size:
+            self._cleanup_lru()
+
+        self._cache[cache_key] = {
+            'data': data,
+            'timestamp': timestamp,
+            'expires_at': expires_at,
+            'provider': provider
+        }
+        heapq.heappush(self._expiry_heap, (expires_at, cache_key))
+
+        # 旧的堆记录过多时重建，避免重复写入同一键导致堆无限增长
+        if len(self._expiry_heap) > 2 * self.max_size + 16:
+            self._expiry_heap = [(entry['expires_at'], key) for key, entry in self._cache.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _cleanup_expired(self, now: Optional[float] = None) -> None:
+        """清理已到期的缓存（只弹出堆顶到期记录）"""
+        now = time.time() if now is None else now
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._cache.get(key)
+            # 条目已被重写（过期时间不同）或已删除时跳过
+            if entry is not None and entry['expires_at'] == expires_at:
                 del self._cache[key]
-                del self._access_times[key]
-
-            if expired_keys:
-                logger.debug(f"清理过期缓存: {len(expired_keys)} 条")
-
-        except Exception as e:
-            logger.error(f"清理过期缓存失败: {e}")
+                self.stats['expirations'] += 1
 
     def _cleanup_lru(self) -> None:
         """清理最久未使用的缓存（LRU）"""
-        try:
-            if not self._access_times:
-                return
+        if self._cache:
+            oldest_key, _ = self._cache.popitem(last=False)
+            self.stats['evictions'] += 1
+            logger.debug(f"LRU清理: {oldest_key[:8]}...")
 
-            # 找到最久未使用的键
-            oldest_key = min(self._access_times, key=self._access_times.get)
+    def _load(self) -> None:
+        """从持久化日志重放未过期的条目"""
+        if not self.persist_path.exists():
+            return
+        now = time.time()
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._journal_lines += 1
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 写入中断导致的残缺行
+                    if record.get('expires_at', 0) > now:
+                        self._insert(record['key'], record.get('provider', 'unknown'), record['data'],
+                                     record.get('timestamp', now), record['expires_at'])
+            self.stats['loaded'] = len(self._cache)
+            logger.info(f"💾 AI请求缓存已加载: {len(self._cache)} 条")
+        except Exception as e:
+            logger.warning(f"⚠️ 读取AI请求缓存失败，忽略: {e}")
+            return
 
-            del self._cache[oldest_key]
-            del self._access_times[oldest_key]
+        if self._journal_lines > len(self._cache):
+            self._compact()
 
-            logger.debug(f"LRU清理: {oldest_key[:8]}...")
+    def _append(self, record: Dict[str, Any]) -> None:
+        """追加一条记录到持久化日志"""
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.persist_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            self._journal_lines += 1
+            if self._journal_lines > 2 * self.max_size:
+                self._compact()
+        except Exception as e:
+            logger.warning(f"⚠️ 写入AI请求缓存失败: {e}")
 
+    def _compact(self) -> None:
+        """只保留当前有效条目重写日志（原子替换）"""
+        try:
+            self._cleanup_expired()
+            tmp_path = self.persist_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for key, entry in self._cache.items():
+                    f.write(json.dumps({'key': key, 'provider': entry['provider'], 'timestamp': entry['timestamp'],
+                                        'expires_at': entry['expires_at'], 'data': entry['data']},
+                                       ensure_ascii=False, default=str) + '\n')
+            os.replace(tmp_path, self.persist_path)
+            self._journal_lines = len(self._cache)
         except Exception as e:
-            logger.error(f"LRU清理失败: {e}")
+            logger.warning(f"⚠️ 压缩AI请求缓存失败: {e}")
 
     def clear_provider_cache(self, provider: str) -> None:
         """清理特定提供商的缓存"""
         try:
-            keys_to_remove = []
-            for key, entry in self._cache.items():
-                if entry.get('provider') == provider:
-                    keys_to_remove.append(key)
-
+            keys_to_remove = [key for key, entry in self._cache.items() if entry.get('provider') == provider]
             for key in keys_to_remove:
                 del self._cache[key]
-                del self._access_times[key]
+            if self.persist_path and keys_to_remove:
+                self._compact()
 
             logger.info(f"清理 {provider} 缓存: {len(keys_to_remove)} 条")
 
@@ -157,7 +229,9 @@ class AIRequestCache:
                 'cache_size': len(self._cache),
                 'max_size': self.max_size,
                 'ttl_seconds': self.ttl_seconds,
+                'persistent': self.persist_path is not None,
                 'hit_rate': self._calculate_hit_rate(),
+                **self.stats,
                 'providers': self._get_provider_stats()
             }
         except Exception as e:
@@ -165,21 +239,32 @@ class AIRequestCache:
             return {'error': str(e)}
 
     def _calculate_hit_rate(self) -> float:
-        """计算缓存命中率（简化版）"""
-        # 这里可以实现更复杂的命中率统计
-        return 0.0  # 简化实现
+        """计算缓存命中率"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups > 0 else 0.0
 
     def _get_provider_stats(self) -> Dict[str, int]:
         """获取各提供商的缓存统计"""
-        try:
-            provider_stats = {}
-            for entry in self._cache.values():
-                provider = entry.get('provider', 'unknown')
-                provider_stats[provider] = provider_stats.get(provider, 0) + 1
-            return provider_stats
-        except Exception as e:
-            logger.error(f"获取提供商统计失败: {e}")
-            return {}
+        provider_stats = {}
+        for entry in self._cache.values():
+            provider = entry.get('provider', 'unknown')
+            provider_stats[provider] = provider_stats.get(provider, 0) + 1
+        return provider_stats
+
+
+def _create_request_cache() -> AIRequestCache:
+    """按配置创建全局缓存实例（配置不可用时使用默认参数）"""
+    try:
+        from config import config
+        return AIRequestCache(
+            max_size=int(config.get('ai', 'request_cache_size', 1000)),
+            ttl_seconds=float(config.get('ai', 'request_cache_ttl', 300)),
+            persist_path=config.get('ai', 'request_cache_path', '') or None
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ AI请求缓存配置加载失败，使用默认参数: {e}")
+        return AIRequestCache()
+
 
 # 全局缓存实例
-ai_request_cache = AIRequestCache()
\ No newline at end of file
+ai_request_cache = _create_request_cache()
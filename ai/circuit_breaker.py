@@ -0,0 +1,162 @@
+"""
+AI提供商熔断器
+按提供商统计最近N次请求的失败率与慢请求比例，超过阈值即熔断（open）：
+熔断期间该提供商在多AI并发前被直接跳过，不再消耗本周期的重试与超时预算；
+冷却时间到后进入半开（half_open），由后台探测请求决定恢复（closed）还是继续熔断（冷却时间加倍）。
+熔断器实例随AI客户端常驻，状态跨交易周期共享
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Deque, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """单个提供商的熔断器
+
+    closed: 正常放行，记录结果；窗口内样本不少于 min_requests 且失败率 ≥ failure_rate
+            或慢请求比例 ≥ slow_rate 时熔断
+    open: 拒绝请求；冷却 open_seconds 后可以发起探测（进入 half_open）
+    half_open: 仍拒绝普通请求，只等待探测结果：成功则恢复，失败则重新熔断且冷却时间加倍（不超过 max_open_seconds）
+    """
+
+    def __init__(self, name: str, window: int = 20, min_requests: int = 4,
+                 failure_rate: float = 0.5, slow_seconds: Optional[float] = None, slow_rate: float = 0.8,
+                 open_seconds: float = 120.0, max_open_seconds: float = 1800.0):
+        self.name = name
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds  # 超过该耗时的成功请求视为慢请求，为空不统计
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+
+        self.state = CLOSED
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window)  # (是否失败, 是否慢请求)
+        self._opened_at = 0.0
+        self._cooldown = open_seconds
+        self.stats = {
+            'successes': 0,
+            'failures': 0,
+            'slow_calls': 0,
+            'rejected': 0,
+            'opened': 0,
+            'probes': 0,
+            'probe_failures': 0
+        }
+
+    def allow_request(self) -> bool:
+        """是否放行普通请求（熔断/半开状态下直接拒绝）"""
+        if self.state == CLOSED:
+            return True
+        self.stats['rejected'] += 1
+        return False
+
+    def probe_due(self) -> bool:
+        """熔断冷却已结束且尚未探测时进入半开状态，返回True表示调用方应发起一次探测"""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self._cooldown:
+            self.state = HALF_OPEN
+            self.stats['probes'] += 1
+            logger.info(f"🔌 {self.name} 熔断冷却结束，开始探测")
+            return True
+        return False
+
+    def record_success(self, latency: float) -> None:
+        self.stats['successes'] += 1
+        slow = self.slow_seconds is not None and latency >= self.slow_seconds
+        if slow:
+            self.stats['slow_calls'] += 1
+        self._window.append((False, slow))
+        self._evaluate()
+
+    def record_failure(self) -> None:
+        self.stats['failures'] += 1
+        self._window.append((True, False))
+        self._evaluate()
+
+    def record_probe(self, success: bool) -> None:
+        """记录半开探测结果"""
+        if self.state != HALF_OPEN:
+            return
+        if success:
+            self.state = CLOSED
+            self._window.clear()
+            self._cooldown = self.open_seconds
+            logger.info(f"✅ {self.name} 探测成功，熔断恢复")
+        else:
+            self.stats['probe_failures'] += 1
+            self._cooldown = min(self._cooldown * 2, self.max_open_seconds)
+            self._open()
+
+    def _evaluate(self) -> None:
+        if self.state != CLOSED or len(self._window) < self.min_requests:
+            return
+        total = len(self._window)
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow_calls = sum(1 for _, slow in self._window if slow)
+        if failures / total >= self.failure_rate:
+            logger.warning(f"⚡ {self.name} 熔断: 最近{total}次请求失败{failures}次")
+            self._open()
+        elif self.slow_seconds is not None and slow_calls / total >= self.slow_rate:
+            logger.warning(f"⚡ {self.name} 熔断: 最近{total}次请求中{slow_calls}次超过{self.slow_seconds:.0f}秒")
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.stats['opened'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = len(self._window)
+        failures = sum(1 for failed, _ in self._window if failed)
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(0.0, self._cooldown - (time.monotonic() - self._opened_at))
+        return {
+            'state': self.state,
+            'window_size': total,
+            'window_failure_rate': failures / total if total else 0.0,
+            'cooldown_seconds': self._cooldown,
+            'probe_in_seconds': retry_in,
+            **self.stats
+        }
+
+
+class CircuitBreakerRegistry:
+    """按提供商管理熔断器（首次使用时按统一参数创建）"""
+
+    def __init__(self, **breaker_kwargs):
+        self.enabled = True
+        self.breaker_kwargs = breaker_kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def configure(self, **breaker_kwargs) -> None:
+        """更新参数（只影响之后创建的熔断器）"""
+        self.breaker_kwargs.update(breaker_kwargs)
+
+    def get(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = self._breakers[provider] = CircuitBreaker(provider, **self.breaker_kwargs)
+        return breaker
+
+    def allow_request(self, provider: str) -> bool:
+        return not self.enabled or self.get(provider).allow_request()
+
+    def record(self, provider: str, success: bool, latency: float = 0.0) -> None:
+        if not self.enabled:
+            return
+        if success:
+            self.get(provider).record_success(latency)
+        else:
+            self.get(provider).record_failure()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {provider: breaker.get_stats() for provider, breaker in self._breakers.items()}
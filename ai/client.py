@@ -19,6 +19,7 @@ from .timeout import TimeoutManager
 from .cache import ai_request_cache
 from .proxy import create_proxy_session
 from .rate_limiter import rate_limit
+from .response_parser import response_parser, confidence_value, loads
 
 logger = logging.getLogger(__name__)
 
@@ -318,7 +319,7 @@ class BaseAIProvider(ABC):
                             logger.error(f"{self.config.name} 响应文本为空")
                             return None
                         
-                        data = json.loads(response_text)
+                        data = loads(response_text)
                         if data is None:
                             logger.error(f"{self.config.name} 响应数据为None")
                             return None
@@ -397,58 +398,20 @@ class DeepseekProvider(BaseAIProvider):
         """
     
     def _parse_ai_response(self, response_data: Dict[str, Any], provider: str) -> Optional[AISignal]:
-        """解析AI响应"""
-        try:
-            if not response_data:
-                return None
-                
-            choices = response_data.get('choices', [])
-            if not choices:
-                return None
-                
-            first_choice = choices[0]
-            message = first_choice.get('message', {})
-            content = message.get('content', '')
-            
-            if not content:
-                return None
-            
-            # 清理JSON字符串
-            content = content.strip()
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0]
-            elif '```' in content:
-                content = content.split('```')[1]
-            
-            try:
-                parsed = json.loads(content)
-            except json.JSONDecodeError:
-                return None
-            
-            # 映射信心等级到数值
-            confidence_map = {
-                'HIGH': 0.9,
-                'MEDIUM': 0.7,
-                'LOW': 0.5
-            }
-            
-            confidence_str = str(parsed.get('confidence', 'MEDIUM')).upper()
-            confidence_value = confidence_map.get(confidence_str, 0.7)
-            signal_value = str(parsed.get('signal', 'HOLD')).upper()
-            
-            return AISignal(
-                provider=provider,
-                signal=signal_value,
-                confidence=confidence_value,
-                reason=str(parsed.get('reason', 'AI分析')),
-                timestamp=datetime.now().isoformat(),
-                raw_response=response_data
-            )
-            
-        except Exception as e:
-            logger.error(f"解析{provider}响应失败: {e}")
+        """解析AI响应（共用解析器，见 ai/response_parser.py）"""
+        parsed = response_parser.parse(provider, response_data)
+        if parsed is None:
             return None
 
+        return AISignal(
+            provider=provider,
+            signal=parsed['signal'],
+            confidence=confidence_value(parsed.get('confidence')),
+            reason=str(parsed.get('reason', 'AI分析')),
+            timestamp=datetime.now().isoformat(),
+            raw_response=response_data
+        )
+
 class AIClient:
     """AI客户端 - 管理多个AI提供商"""
     
@@ -1,17 +1,21 @@
 """
 DNS管理器
-提供DNS缓存、预解析和智能解析功能
+提供DNS缓存、预解析和智能解析功能：并发解析各提供商域名，对候选IP测量TCP连接延迟并记录最快的IP，
+PreferredIPResolver 让aiohttp连接池优先连接该IP
 """
 
 import asyncio
 import socket
 import time
 import logging
-from typing import Dict, Any, Optional, List, Set
+from typing import Dict, Any, Optional, List, Set, Tuple
 from collections import defaultdict
+from urllib.parse import urlsplit
 import dns.resolver
 import dns.asyncresolver
 from dns.exception import DNSException
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +30,10 @@ class DNSManager:
         self.resolver = dns.asyncresolver.Resolver()
         self.resolver.timeout = 5.0
         self.resolver.lifetime = 10.0
+        self.probe_timeout = 2.0  # 单个IP连接测速超时（秒）
+        self.best_ips: Dict[str, str] = {}  # 域名 -> 连接延迟最低的IP
+        self.probe_results: Dict[str, Dict[str, Optional[float]]] = {}  # 域名 -> {IP: 连接延迟(ms)，失败为None}
+        self.stats = {'hits': 0, 'misses': 0, 'probes': 0, 'probe_failures': 0}
 
         # 预解析的域名
         self.pre_resolve_domains = [
@@ -44,7 +52,9 @@ class DNSManager:
             if not force_refresh and domain in self.cache:
                 if time.time() - self.cache_ttl.get(domain, 0) < self.default_ttl:
                     logger.debug(f"DNS缓存命中: {domain}")
+                    self.stats['hits'] += 1
                     return self.cache[domain]
+            self.stats['misses'] += 1
 
             # 检查失败记录
             if domain in self.failed_domains and not force_refresh:
@@ -53,9 +63,9 @@ class DNSManager:
 
             # 执行解析
             logger.info(f"🔍 解析DNS: {domain}")
-            result = await self.resolver.resolve(domain, 'A')
-
-            ips = [str(ip) for ip in result]
+            ips = await self._query(domain)
+            if not ips:
+                raise DNSException(f"无A记录: {domain}")
 
             # 缓存结果
             self.cache[domain] = ips
@@ -76,43 +86,100 @@ class DNSManager:
             self.failed_domains.add(domain)
             return None
 
-    async def pre_resolve_all(self) -> Dict[str, List[str]]:
-        """预解析所有AI提供商域名"""
-        logger.info("🚀 开始预解析AI提供商DNS...")
-
-        results = {}
-        tasks = []
-
-        for domain in self.pre_resolve_domains:
-            task = self.resolve_domain(domain, force_refresh=True)
-            tasks.append((domain, task))
+    async def _query(self, domain: str) -> List[str]:
+        """查询A记录；dnspython查询失败（无可用上游、本地hosts域名等）时回退到系统解析器"""
+        try:
+            result = await self.resolver.resolve(domain, 'A')
+            return [str(ip) for ip in result]
+        except DNSException as e:
+            logger.debug(f"dnspython解析失败，回退系统解析器: {domain} - {e}")
+
+        infos = await asyncio.get_running_loop().getaddrinfo(domain, None, family=socket.AF_INET,
+                                                             type=socket.SOCK_STREAM)
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+    async def pre_resolve_all(self, domains: Optional[List[str]] = None, probe: bool = False,
+                              ports: Optional[Dict[str, int]] = None) -> Dict[str, List[str]]:
+        """并发预解析域名（默认为内置的AI提供商域名）
+
+        Args:
+            domains: 要解析的域名，为空时使用 pre_resolve_domains
+            probe: 是否同时对候选IP测速并记录最快的IP
+            ports: 各域名测速连接的端口，未指定的域名使用443
+        """
+        ports = ports or {}
+        domains = list(dict.fromkeys(domains or self.pre_resolve_domains))
+        logger.info(f"🚀 开始预解析DNS: {len(domains)} 个域名")
+
+        async def resolve_one(domain: str) -> Optional[List[str]]:
+            if probe:
+                await self.smart_resolve(domain, port=ports.get(domain, 443), force_refresh=True)
+                return self.get_cached_ips(domain)
+            return await self.resolve_domain(domain, force_refresh=True)
 
         # 并发解析
-        for domain, task in tasks:
-            try:
-                ips = await task
-                if ips:
-                    results[domain] = ips
-            except Exception as e:
-                logger.error(f"预解析失败: {domain} - {e}")
+        outcomes = await asyncio.gather(*[resolve_one(domain) for domain in domains], return_exceptions=True)
 
-        logger.info(f"✅ DNS预解析完成，成功: {len(results)}/{len(self.pre_resolve_domains)}")
+        results = {}
+        for domain, ips in zip(domains, outcomes):
+            if isinstance(ips, Exception):
+                logger.error(f"预解析失败: {domain} - {ips}")
+            elif ips:
+                results[domain] = ips
+
+        logger.info(f"✅ DNS预解析完成，成功: {len(results)}/{len(domains)}")
         return results
 
-    async def smart_resolve(self, domain: str) -> Optional[str]:
-        """智能选择最佳IP"""
-        ips = await self.resolve_domain(domain)
+    async def _probe_ip(self, ip: str, port: int) -> Optional[float]:
+        """测量到IP的TCP连接建立耗时（毫秒），失败返回None"""
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout=self.probe_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.debug(f"IP测速失败: {ip}:{port} - {type(e).__name__}")
+            return None
+        latency = (time.perf_counter() - start) * 1000
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return latency
+
+    async def probe_ips(self, ips: List[str], port: int = 443) -> Dict[str, Optional[float]]:
+        """并发测量候选IP的连接延迟"""
+        latencies = await asyncio.gather(*[self._probe_ip(ip, port) for ip in ips])
+        self.stats['probes'] += len(ips)
+        self.stats['probe_failures'] += sum(1 for latency in latencies if latency is None)
+        return dict(zip(ips, latencies))
+
+    async def smart_resolve(self, domain: str, port: int = 443, force_refresh: bool = False) -> Optional[str]:
+        """智能选择最佳IP：并发测量所有候选IP的TCP连接延迟，选择最快的一个"""
+        ips = await self.resolve_domain(domain, force_refresh=force_refresh)
         if not ips:
             return None
 
-        # 如果有多个IP，选择响应时间最短的
-        if len(ips) > 1:
-            # 这里可以实现IP响应时间测试
-            # 简化实现：选择第一个
-            logger.info(f"🎯 智能选择IP: {ips[0]} (从 {len(ips)} 个IP中选择)")
+        latencies = await self.probe_ips(ips, port)
+        self.probe_results[domain] = latencies
+        reachable = {ip: latency for ip, latency in latencies.items() if latency is not None}
+        if not reachable:
+            # 全部测速失败（可能只是禁止了直连），保持解析顺序
+            self.best_ips.pop(domain, None)
+            logger.warning(f"⚠️ {domain} 所有IP测速失败，使用解析顺序")
             return ips[0]
 
-        return ips[0] if ips else None
+        best = min(reachable, key=reachable.get)
+        self.best_ips[domain] = best
+        if len(ips) > 1:
+            logger.info(f"🎯 智能选择IP: {domain} -> {best} ({reachable[best]:.1f}ms，"
+                        f"{len(reachable)}/{len(ips)} 个IP可达)")
+        return best
+
+    def get_best_ip(self, domain: str) -> Optional[str]:
+        """获取测速选出的最佳IP（随DNS缓存一同过期）"""
+        if domain in self.best_ips and self.get_cached_ips(domain):
+            return self.best_ips[domain]
+        return None
 
     def get_cached_ips(self, domain: str) -> Optional[List[str]]:
         """获取缓存的IP列表"""
@@ -125,10 +192,14 @@ class DNSManager:
         if domain:
             self.cache.pop(domain, None)
             self.cache_ttl.pop(domain, None)
+            self.best_ips.pop(domain, None)
+            self.probe_results.pop(domain, None)
             logger.info(f"🗑️ 清除DNS缓存: {domain}")
         else:
             self.cache.clear()
             self.cache_ttl.clear()
+            self.best_ips.clear()
+            self.probe_results.clear()
             logger.info("🗑️ 清除所有DNS缓存")
 
     def get_stats(self) -> Dict[str, Any]:
@@ -137,13 +208,19 @@ class DNSManager:
             'cache_size': len(self.cache),
             'failed_domains': len(self.failed_domains),
             'pre_resolve_domains': len(self.pre_resolve_domains),
-            'cache_hit_rate': self._calculate_hit_rate()
+            'cache_hit_rate': self._calculate_hit_rate(),
+            'best_ips': dict(self.best_ips),
+            'probe_latency_ms': {
+                domain: {ip: round(latency, 1) if latency is not None else None for ip, latency in latencies.items()}
+                for domain, latencies in self.probe_results.items()
+            },
+            **self.stats
         }
 
     def _calculate_hit_rate(self) -> float:
-        """计算缓存命中率（简化版）"""
-        # 这里可以实现更复杂的命中率计算
-        return 0.8  # 假设命中率
+        """计算缓存命中率"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups > 0 else 0.0
 
     async def periodic_refresh(self, interval: int = 300):
         """定期刷新DNS缓存"""
@@ -167,6 +244,44 @@ class DNSManager:
             except Exception as e:
                 logger.error(f"定期DNS刷新失败: {e}")
 
+class PreferredIPResolver(AbstractResolver):
+    """aiohttp解析器：域名有测速选出的最佳IP时把它排在首位（连接池优先连接该IP），
+    其余情况交给aiohttp默认解析器。TLS的SNI与证书校验仍使用原域名。
+    """
+
+    def __init__(self, manager: 'DNSManager'):
+        self.manager = manager
+        self._fallback = DefaultResolver()
+
+    async def resolve(self, host: str, port: int = 0,
+                      family: socket.AddressFamily = socket.AF_INET) -> List[Dict[str, Any]]:
+        best = self.manager.get_best_ip(host) if family != socket.AF_INET6 else None
+        if best is None:
+            return await self._fallback.resolve(host, port, family)
+
+        ips = [best] + [ip for ip in self.manager.get_cached_ips(host) or [] if ip != best]
+        # 与aiohttp的ResolveResult（3.10+的TypedDict）字段一致，用普通字典兼容旧版本
+        return [
+            {'hostname': host, 'host': ip, 'port': port, 'family': socket.AF_INET,
+             'proto': 0, 'flags': socket.AI_NUMERICHOST}
+            for ip in ips
+        ]
+
+    async def close(self) -> None:
+        await self._fallback.close()
+
+
+def url_endpoint(url: str) -> Optional[Tuple[str, int]]:
+    """提取URL中的主机名和端口（未指定端口时按协议取默认端口）"""
+    try:
+        parts = urlsplit(url)
+        if not parts.hostname:
+            return None
+        return parts.hostname, parts.port or (80 if parts.scheme == 'http' else 443)
+    except ValueError:
+        return None
+
+
 # 全局DNS管理器
 dns_manager = DNSManager()
 
@@ -0,0 +1,134 @@
+"""
+AI请求对冲模块
+记录各提供商近期响应延迟的分位数；请求超过该提供商的 p90/p95 延迟仍未返回时，
+再发出一个相同的请求，取先返回的结果。全局对冲预算限制额外请求的比例
+"""
+
+import asyncio
+import math
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Deque, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """各提供商最近N次成功请求的延迟窗口"""
+
+    def __init__(self, window: int = 100):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, provider: str, latency: float) -> None:
+        samples = self._samples.get(provider)
+        if samples is None:
+            samples = self._samples[provider] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    def count(self, provider: str) -> int:
+        return len(self._samples.get(provider, ()))
+
+    def percentile(self, provider: str, p: float, min_samples: int = 1) -> Optional[float]:
+        """延迟分位数（秒），样本不足时返回None"""
+        samples = self._samples.get(provider)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """全局对冲预算（令牌桶）
+
+    每个主请求积累 ratio 个令牌（上限 burst），每次对冲消耗1个，
+    长期看对冲请求不超过主请求数的 ratio 倍。
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 2.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+
+        self.stats = {
+            'requests': 0,
+            'hedges_issued': 0,
+            'hedges_won': 0,
+            'budget_denied': 0
+        }
+
+    def on_request(self) -> None:
+        self.stats['requests'] += 1
+        self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            self.stats['hedges_issued'] += 1
+            return True
+        self.stats['budget_denied'] += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        issued = self.stats['hedges_issued']
+        return {
+            **self.stats,
+            'tokens': round(self._tokens, 3),
+            'hedge_rate': issued / self.stats['requests'] if self.stats['requests'] else 0,
+            'win_rate': self.stats['hedges_won'] / issued if issued else 0
+        }
+
+
+async def hedged_call(factory: Callable[[], Awaitable[Any]], hedge_delay: Optional[float],
+                      budget: HedgeBudget, label: str = '') -> Any:
+    """执行带对冲的请求
+
+    factory 每次调用返回一个新的请求协程；hedge_delay 为None时不对冲。
+    结果为None或异常视为失败，会继续等待另一个请求；两个都失败时返回最后的结果或抛出最后的异常。
+    """
+    budget.on_request()
+    primary = asyncio.ensure_future(factory())
+    if hedge_delay is None:
+        return await primary
+
+    hedge: Optional[asyncio.Future] = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done or not budget.try_acquire():
+            return await primary
+
+        logger.info(f"🪝 {label} 超过 {hedge_delay:.2f}s 未返回，发出对冲请求")
+        hedge = asyncio.ensure_future(factory())
+        hedge_start = time.perf_counter()
+        pending = {primary, hedge}
+        last_error: Optional[BaseException] = None
+        result = None
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    continue
+                result = task.result()
+                if result is not None:
+                    for other in pending:
+                        other.cancel()
+                    if task is hedge:
+                        budget.stats['hedges_won'] += 1
+                        logger.info(f"🪝 {label} 对冲请求胜出（对冲后 {time.perf_counter() - hedge_start:.2f}s）")
+                    return result
+
+        if result is None and last_error is not None:
+            raise last_error
+        return result
+
+    except asyncio.CancelledError:
+        primary.cancel()
+        if hedge is not None:
+            hedge.cancel()
+        raise
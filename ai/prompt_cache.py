@@ -0,0 +1,114 @@
+"""
+提供商侧提示词缓存统计
+解析响应中的 usage 字段（命中缓存的token / 未命中token），按提供商统计缓存命中率，
+并对比命中与未命中缓存时的请求延迟
+"""
+
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_usage(usage: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """解析各提供商的 usage 字段
+
+    支持的格式：
+    - DeepSeek: prompt_cache_hit_tokens / prompt_cache_miss_tokens
+    - OpenAI / 通义千问兼容模式: prompt_tokens_details.cached_tokens
+    - Kimi: 顶层 cached_tokens
+
+    Returns:
+        {'prompt_tokens', 'cached_tokens', 'uncached_tokens', 'completion_tokens'}，无法解析时返回None
+    """
+    if not isinstance(usage, dict):
+        return None
+
+    try:
+        prompt_tokens = int(usage.get('prompt_tokens') or 0)
+        completion_tokens = int(usage.get('completion_tokens') or 0)
+
+        if 'prompt_cache_hit_tokens' in usage or 'prompt_cache_miss_tokens' in usage:
+            cached = int(usage.get('prompt_cache_hit_tokens') or 0)
+            uncached = int(usage.get('prompt_cache_miss_tokens') or 0)
+            prompt_tokens = prompt_tokens or cached + uncached
+        else:
+            details = usage.get('prompt_tokens_details') or {}
+            cached = int(details.get('cached_tokens') or usage.get('cached_tokens') or 0)
+            uncached = max(0, prompt_tokens - cached)
+    except (TypeError, ValueError):
+        return None
+
+    return {
+        'prompt_tokens': prompt_tokens,
+        'cached_tokens': cached,
+        'uncached_tokens': uncached,
+        'completion_tokens': completion_tokens
+    }
+
+
+class PromptCacheStats:
+    """按提供商统计提示词缓存命中情况"""
+
+    def __init__(self):
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def _stats_for(self, provider: str) -> Dict[str, Any]:
+        stats = self.stats.get(provider)
+        if stats is None:
+            stats = self.stats[provider] = {
+                'requests': 0,
+                'with_usage': 0,
+                'cache_hits': 0,  # 至少部分提示词命中缓存的请求数
+                'prompt_tokens': 0,
+                'cached_tokens': 0,
+                'completion_tokens': 0,
+                'hit_latency_total': 0.0,
+                'miss_latency_total': 0.0
+            }
+        return stats
+
+    def record(self, provider: str, usage: Optional[Dict[str, Any]], latency: float) -> Optional[Dict[str, int]]:
+        """记录一次成功响应的 usage 与延迟，返回解析后的token统计"""
+        stats = self._stats_for(provider)
+        stats['requests'] += 1
+        parsed = parse_usage(usage)
+        if parsed is None:
+            return None
+
+        stats['with_usage'] += 1
+        stats['prompt_tokens'] += parsed['prompt_tokens']
+        stats['cached_tokens'] += parsed['cached_tokens']
+        stats['completion_tokens'] += parsed['completion_tokens']
+        if parsed['cached_tokens'] > 0:
+            stats['cache_hits'] += 1
+            stats['hit_latency_total'] += latency
+        else:
+            stats['miss_latency_total'] += latency
+        return parsed
+
+    def hit_rate(self, provider: str) -> float:
+        """提示词token的缓存命中率"""
+        stats = self.stats.get(provider)
+        if not stats or not stats['prompt_tokens']:
+            return 0.0
+        return stats['cached_tokens'] / stats['prompt_tokens']
+
+    def get_stats(self) -> Dict[str, Any]:
+        result = {}
+        for provider, stats in self.stats.items():
+            misses = stats['with_usage'] - stats['cache_hits']
+            result[provider] = {
+                'requests': stats['requests'],
+                'with_usage': stats['with_usage'],
+                'cache_hits': stats['cache_hits'],
+                'prompt_tokens': stats['prompt_tokens'],
+                'cached_tokens': stats['cached_tokens'],
+                'uncached_tokens': stats['prompt_tokens'] - stats['cached_tokens'],
+                'completion_tokens': stats['completion_tokens'],
+                'token_hit_rate': self.hit_rate(provider),
+                'request_hit_rate': stats['cache_hits'] / stats['with_usage'] if stats['with_usage'] else 0,
+                'avg_latency_hit': stats['hit_latency_total'] / stats['cache_hits'] if stats['cache_hits'] else None,
+                'avg_latency_miss': stats['miss_latency_total'] / misses if misses else None
+            }
+        return result
@@ -0,0 +1,570 @@
+"""
+AI提示词模板模块
+静态部分（系统提示、温度参数、各提供商规则与震荡市策略、决策要求与JSON格式）在启动时编译一次，
+组成每次调用字节完全相同的稳定前缀；市场数据部分每个交易周期只渲染一次并在各提供商之间共享，
+与提供商的行情分析框架一起放在前缀之后
+"""
+
+import math
+import random
+import time
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 偏见指令每3分钟轮换一次
+BIAS_ROTATION_SECONDS = 180
+
+DEFAULT_TEMPERATURE = 0.7
+
+# 为不同提供商设置不同的温度参数 - 大幅提高多样性
+PROVIDER_TEMPERATURES = {
+    'deepseek': 0.95,   # 极高温度，非常创造性
+    'kimi': 0.85,       # 高温度，增加多样性
+    'qwen': 0.90,       # 很高温度，基于数据创造性
+    'openai': 0.92      # 很高温度，平衡创造性和合理性
+}
+
+# 为不同提供商定制系统提示 - 融合之前项目的成功经验
+SYSTEM_PROMPTS = {
+    'deepseek': """你是专业的BTC波段交易大师，专注精准抄底和趋势跟踪。你必须积极寻找交易机会，避免保守的HOLD建议。
+
+你的特点：
+- 技术派激进交易者，专注突破交易
+- 不喜欢保守观望，倾向于果断行动
+- 基于技术面给出BUY/SELL建议，尽量避免HOLD
+- 必须与其他分析师持不同观点，即使市场稳定也要寻找交易机会
+
+记住：你是DEEPSEEK，要以技术分析为主导，积极交易为风格。""",
+
+    'kimi': """你是一位专业的BTC短线交易员，专注于15分钟周期的精准交易。你注重风险控制和交易效率。
+
+你的特点：
+- 稳健型交易者，注重风险控制
+- 专注短线交易，基于RSI和趋势判断
+- 基于市场波动率动态设置止盈止损
+- RSI交易规则：超卖买入，超买卖出，中性结合趋势
+- 震荡市区间交易，趋势市顺势交易
+
+记住：你是KIMI，要以稳健高效为风格，简洁专业为特点。""",
+
+    'qwen': """你是一位专业的量化交易员，专注于BTC/USDT永续合约的15分钟周期交易。你完全基于数据和统计模型做决策。
+
+你的特点：
+- 数据驱动的量化交易者，完全基于统计模型
+- 运用统计学、概率论和量化模型分析市场
+- 决策必须基于具体数据指标，不依赖主观判断
+- 信心等级要反映统计显著性和数学概率
+- 确保分析角度与其他分析师完全不同，用数字说话
+
+记住：你是QWEN，要以数据量化为主导，统计模型为基础。""",
+
+    'openai': """你是一个平衡型交易者，但今天必须扮演"逆向投资者"角色。你要刻意寻找与市场共识相反的观点。
+
+你的特点：
+- 平衡考虑技术面、基本面、风险管理和市场情绪
+- 刻意寻找与市场共识相反的观点和机会
+- 如果技术指标显示BUY，你要考虑SELL的可能性
+- 如果大家都看HOLD，你要寻找突破机会
+- 确保你的判断与其他三位分析师显著不同
+
+记住：你是OPENAI，要以逆向思维为特色，与众不同为目标。""",
+
+    'default': '你是一个独立思考的交易分析师，必须给出与其他分析师不同的观点，不要跟随市场共识。'
+}
+
+# 各提供商的固定规则（不含行情数值，属于可缓存的稳定前缀）
+PROVIDER_RULES = {
+    'deepseek': """
+【🎯 DEEPSEEK震荡市专用策略】
+震荡市识别：价格波动<4%，ATR<1.5%，趋势强度<0.5%
+🔄 区间交易策略：
+1. 靠近支撑位（<25%）+ 反转信号 → HIGH信心BUY
+2. 靠近阻力位（>75%）+ 反转信号 → HIGH信心SELL
+3. 区间中点（40-60%）+ 明确信号 → MEDIUM信心交易
+4. 区间突破立即止损（0.3%）
+
+⚠️ 震荡市风控：
+- 每日最多2次交易
+- 盈利0.8%立即止盈
+- 亏损0.5%立即止损
+- 仓位降低至60%
+- 最长持仓2小时
+
+🚫 禁止交易：
+- 波动率<1.5%（无行情）
+- 无明确区间形成
+- 区间太窄（<0.5%）或太宽（>4%）
+""",
+    'kimi': """
+【KIMI策略要求】
+1. 专注15分钟周期交易
+2. 基于市场波动率动态设置止盈止损
+3. RSI交易规则：
+   - RSI<35：超卖区域，优先买入
+   - RSI>70：超买区域，优先卖出
+   - 35≤RSI≤70：中性区域，结合趋势判断
+4. 震荡市区间交易，趋势市顺势交易
+5. 动态止盈止损：系统会自动基于市场波动率和持仓状态计算最优TP/SL
+""",
+    'qwen': """
+【QWEN动态风控参数】
+- 基于ATR波动率动态调整止损止盈
+- 系统会自动计算最优TP/SL
+- 最大仓位: 90%
+- 低波动时降低仓位
+
+【QWEN量化决策要求】
+完全基于统计模型和概率计算
+信心等级要反映统计显著性
+用数据说话，避免主观判断
+""",
+    'openai': """
+【OPENAI决策矩阵】
+多重确认: 技术+情绪+风险综合评分
+独立判断: 避免羊群效应，刻意寻找不同观点
+动态调整: 根据市场状态实时修正
+逆向思维: 与主流观点保持适当差异
+""",
+    'default': ""
+}
+
+# 各提供商的行情分析框架（str.format 模板，字段来自每周期计算一次的市场上下文）
+FRAMEWORK_TEMPLATES = {
+    'deepseek': """
+【🎯 DEEPSEEK核心价格分析】
+当前价格: ${price:,.2f}
+相对位置: {price_position:.1f}% (0%=底部,100%=顶部)
+价格变化: {price_change_pct:+.2f}%
+波动率: {atr_pct:.2f}%
+
+【📊 技术状态】
+RSI: {rsi:.1f} ({rsi_status})
+MACD: {macd}
+均线状态: {ma_status}
+
+【💰 博弈策略】
+价格低位权重: {buy_weight_multiplier:.1f}x
+超卖信号: {oversold_mark}
+低波动机会: {low_volatility_mark}
+""",
+    'kimi': """
+【KIMI当前市场分析】
+价格: ${price:,.2f}
+变化: {price_change_pct:+.2f}%
+RSI: {rsi:.1f}
+趋势: {overall_trend}
+
+【K线数据】
+基于{kline_count}根K线的技术分析
+
+【持仓状态】
+{position_text}
+{last_signal_info}
+""",
+    'qwen': """
+【QWEN量化市场分析】
+当前价格: ${price:,.2f}
+价格变化: {price_change_pct:+.2f}%
+RSI(14): {rsi:.1f}
+ATR: {atr_pct:.2f}%
+趋势强度: {trend}
+
+【K线量化分析】
+基于{kline_count}根K线的统计模型
+
+【持仓量化状态】
+{position_text}
+""",
+    'openai': """
+【OPENAI综合分析框架】
+技术面: RSI={rsi:.1f}, 趋势={overall_trend}
+基本面: {sentiment_text}
+风险管理: {tp_sl_hint}
+市场结构: {market_structure}
+
+【当前市场数据】
+价格: ${price:,.2f} (位置: {price_position:.1f}%)
+波动: {atr_pct:.2f}%
+持仓: {position_text}
+""",
+    'default': """
+【市场分析】
+价格: ${price:.2f} (位置: {price_position:.1f}%)
+波动: {atr_pct:.2f}% ({volatility})
+技术: RSI={rsi:.1f} ({rsi_status})
+持仓: {position_text}
+"""
+}
+
+# 震荡市专用策略 - 为不同提供商定制不同策略（{provider} 在编译时替换）
+CONSOLIDATION_TEMPLATES = {
+    'deepseek': """
+【🎯 {provider}震荡市突破策略】
+🔄 技术突破交易规则：
+1. 价格突破区间上轨 → AGGRESSIVE BUY (HIGH信心)
+2. 价格突破区间下轨 → AGGRESSIVE SELL (HIGH信心)
+3. 区间内反弹 → 快速交易，MEDIUM信心
+4. 假突破立即反向操作
+
+⚡ 激进风控：
+- 突破确认后立即重仓
+- 止损设置在突破点外0.2%
+- 盈利1.2%快速止盈
+- 不设置持仓时间限制
+""",
+    'kimi': """
+【🎯 {provider}震荡市保守策略】
+🔄 区间观望规则：
+1. 区间内部 → 坚决HOLD，不参与震荡
+2. 突破区间 → 等待回踩确认
+3. 明确趋势形成 → 小仓位试探
+4. 任何不确定 → 保持空仓
+
+⚠️ 保守风控：
+- 80%时间保持HOLD
+- 即使突破也只用20%仓位
+- 止损0.3%非常严格
+- 优先考虑资金安全
+""",
+    'qwen': """
+【🎯 {provider}震荡市量化策略】
+📊 数据统计规则：
+1. 突破概率 > 65% → BUY/SELL (基于历史回测)
+2. 震荡概率 > 70% → HOLD (统计显著)
+3. 收益风险比 > 2:1 → 执行交易
+4. 胜率 < 55% → 放弃交易
+
+📈 量化的风控：
+- 基于凯利公式计算仓位
+- 止损=2×ATR，止盈=3×ATR
+- 期望值为正才交易
+- 严格遵循统计规律
+""",
+    'openai': """
+【🎯 {provider}震荡市逆向策略】
+🔄 反向交易规则：
+1. 区间顶部 → 反向SELL (别人贪婪我恐惧)
+2. 区间底部 → 反向BUY (别人恐惧我贪婪)
+3. 突破初期 → 等待假突破机会
+4. 共识形成 → 反向操作
+
+🎯 逆向风控：
+- 与主流观点相反操作
+- 提前布局，提前退出
+- 小止损，大止盈
+- 利用市场情绪获利
+""",
+    'default': """
+【🎯 震荡市通用策略】
+🔄 标准区间规则：
+1. 区间交易，高抛低吸
+2. 突破跟进，趋势跟随
+3. 严格止损，保护资金
+4. 灵活应对，随机应变
+
+⚠️ 标准风控：
+- 合理控制仓位
+- 设置止损止盈
+- 保持理性判断
+"""
+}
+
+# 为不同提供商添加强制性偏见（候选项）
+PROVIDER_BIAS_CHOICES = {
+    'deepseek': ('偏好做多', '偏好做空', '偏好突破'),
+    'kimi': ('极度保守', '偏向观望', '等待确认'),
+    'qwen': ('数据支持', '统计显著', '概率优势'),
+    'openai': ('逆向思维', '与众不同', '挑战共识'),
+    'default': ('独立思考', '客观分析', '理性判断')
+}
+
+# ---- 稳定前缀：同一提供商每次调用字节完全相同，可命中提供商侧的上下文缓存 ----
+
+PROMPT_HEADER = """
+你是专业的BTC波段交易大师，专注精准抄底和趋势跟踪。
+"""
+
+RULES_SECTION = """
+【⚠️ 风险控制】
+仓位管理: 基于价格位置动态调整
+止损设置: 根据ATR波动率实时计算
+
+【🎯 交易决策要求】
+1. 信号类型：BUY（买入）/SELL（卖出）/HOLD（观望）
+2. 信心等级：HIGH（高）/MEDIUM（中）/LOW（低）
+3. 详细分析理由（包含技术面、情绪面、风险分析）
+4. 具体风险提示和止损建议
+
+【⚡ 关键提醒 - 强制差异化要求】
+- 你必须给出与其他AI完全不同的判断
+- 遵循行情数据中给出的当前偏见
+- 不要参考其他分析师的观点
+- 基于你的专业角度独立决策
+- 即使市场看起来明显，也要寻找不同视角
+
+请以JSON格式回复，包含以下字段：
+{
+    "signal": "BUY/SELL/HOLD",
+    "confidence": "HIGH|MEDIUM|LOW",
+    "reason": "详细分析理由（不少于100字）",
+    "risk": "具体风险提示和止损建议"
+}
+"""
+
+# ---- 易变部分：本周期行情数据，放在稳定前缀之后 ----
+
+VOLATILE_HEADER = """
+==================== 本周期行情数据 ====================
+"""
+
+# 所有提供商共享的市场数据部分（每周期渲染一次）
+MARKET_SECTION_TEMPLATE = """
+【📊 核心市场数据】
+当前价格: ${price:,.2f} (相对位置: {price_position:.1f}%)
+价格变化: {price_change_pct:+.2f}%
+ATR波动率: {atr_pct:.2f}%
+市场趋势: {trend}
+整体技术: {overall_trend}
+
+【💰 持仓状态】
+{position_text}
+{last_signal_info}
+
+【🔧 技术分析】
+RSI: {rsi:.1f} ({rsi_status})
+MACD: {macd}
+均线状态: {ma_status}
+
+【⚠️ 当前风控提示】
+{tp_sl_hint}
+"""
+
+BIAS_SECTION = """
+【⚡ 当前偏见】
+"""
+
+PROMPT_FOOTER = """
+
+请基于以上行情数据，按前述JSON格式回复。
+"""
+
+
+def build_market_context(market_data: Dict[str, Any]) -> Dict[str, Any]:
+    """由市场数据计算提示词模板字段"""
+    # 安全获取基础数据
+    price = float(market_data.get('price', 0))
+    atr_pct = float(market_data.get('atr_pct', 0))
+
+    # 安全获取持仓信息
+    position = market_data.get('position') or {}
+    position_size = float(position.get('size', 0))
+    entry_price = float(position.get('entry_price', 0))
+
+    # 获取技术指标数据
+    technical_data = market_data.get('technical_data', {})
+    rsi = float(technical_data.get('rsi', 50))
+
+    # 计算价格位置（相对高低位置）
+    price_history = market_data.get('price_history', [])
+    price_position = 50  # 默认中位
+    if price_history and len(price_history) >= 20:
+        recent_prices = price_history[-20:]
+        min_price = min(recent_prices)
+        max_price = max(recent_prices)
+        if max_price > min_price:
+            price_position = ((price - min_price) / (max_price - min_price)) * 100
+
+    price_change_pct = float(market_data.get('price_change_pct', 0))
+
+    # 构建持仓状态描述
+    if position_size <= 0:
+        position_text = "💰 当前无持仓，可灵活操作"
+    else:
+        pnl_pct = ((price - entry_price) / entry_price * 100) if entry_price > 0 else 0
+        position_text = f"📊 持仓状态: {position_size}BTC @ ${entry_price:.2f} (盈亏: {pnl_pct:+.2f}%)"
+
+    # 获取AI信号历史
+    last_signal_info = ""
+    signal_history = market_data.get('signal_history', [])
+    if signal_history:
+        last_signal = signal_history[-1]
+        last_signal_info = f"🔄 上次信号: {last_signal.get('signal', 'N/A')} (信心: {last_signal.get('confidence', 0):.1f})"
+
+    # 构建博弈策略权重
+    buy_weight_multiplier = 1.0
+    if price_position < 25:  # 价格低位
+        buy_weight_multiplier = 1.5
+    elif price_position > 75:  # 价格高位
+        buy_weight_multiplier = 0.7
+
+    # 检测震荡市条件
+    is_consolidation = (
+        atr_pct < 1.5 and
+        abs(price_change_pct) < 4 and
+        price_position > 25 and
+        price_position < 75
+    )
+
+    # 构建风控提示
+    if is_consolidation:
+        tp_sl_hint = "⚠️ 震荡市: 止盈0.8%，止损0.5%，仓位降低至60%"
+    elif atr_pct > 3.0:
+        tp_sl_hint = "⚠️ 高波动: 扩大止损范围，谨慎操作"
+    else:
+        tp_sl_hint = "✅ 正常波动: 标准止盈止损设置"
+
+    # 构建市场情绪
+    if rsi < 30:
+        sentiment_text = "📉 市场情绪: 极度恐慌，可能反弹"
+    elif rsi > 70:
+        sentiment_text = "📈 市场情绪: 极度贪婪，可能回调"
+    elif is_consolidation:
+        sentiment_text = "➡️ 市场情绪: 震荡观望，等待方向"
+    else:
+        sentiment_text = "😐 市场情绪: 相对平衡"
+
+    return {
+        'price': price,
+        'trend': str(market_data.get('trend_strength', '震荡')),
+        'volatility': str(market_data.get('volatility', 'normal')),
+        'atr_pct': atr_pct,
+        'rsi': rsi,
+        'rsi_status': "超卖" if rsi < 35 else "超买" if rsi > 70 else "正常",
+        'macd': technical_data.get('macd', 'N/A'),
+        'ma_status': technical_data.get('ma_status', 'N/A'),
+        'overall_trend': market_data.get('trend_analysis', {}).get('overall', 'N/A'),
+        'price_position': price_position,
+        'price_change_pct': price_change_pct,
+        'kline_count': len(price_history) if price_history else 0,
+        'position_text': position_text,
+        'last_signal_info': last_signal_info,
+        'buy_weight_multiplier': buy_weight_multiplier,
+        'oversold_mark': '✅' if rsi < 35 else '❌',
+        'low_volatility_mark': '✅' if atr_pct < 1.5 else '❌',
+        'market_structure': "震荡" if is_consolidation else "趋势",
+        'tp_sl_hint': tp_sl_hint,
+        'sentiment_text': sentiment_text
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    """估算提示词token数（未安装分词器时的近似值）
+
+    中日韩文字及全角符号、emoji按每字符1个token计，其余字符按每4个字符1个token计。
+    """
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return wide + math.ceil((len(text) - wide) / 4)
+
+
+def prompt_size(text: str) -> Dict[str, int]:
+    """提示词大小：UTF-8字节数、字符数与估算token数"""
+    return {
+        'bytes': len(text.encode('utf-8')),
+        'chars': len(text),
+        'tokens': estimate_tokens(text)
+    }
+
+
+class MarketPromptContext:
+    """一个周期内共享的市场数据渲染结果，及已拼接完成的各提供商提示词"""
+
+    __slots__ = ('market_data', 'fields', 'market_section', 'prompts')
+
+    def __init__(self, market_data: Dict[str, Any]):
+        self.market_data = market_data
+        self.fields = build_market_context(market_data)
+        self.market_section = MARKET_SECTION_TEMPLATE.format_map(self.fields)
+        self.prompts: Dict[Tuple[str, int], str] = {}  # (提供商, 偏见轮换周期) -> 提示词
+
+
+class PromptCompiler:
+    """预编译的提示词模板
+
+    提示词分为两段：稳定前缀（角色、规则、震荡市策略、JSON格式要求）对同一提供商每次调用字节完全相同，
+    构造时编译一次，可命中提供商侧的上下文缓存；易变部分（行情数据、偏见）排在前缀之后。
+    prepare() 每周期渲染一次共享的市场数据部分，同一周期内（同一个 market_data 对象）
+    各提供商及其重试、对冲请求都复用该渲染结果。
+    """
+
+    def __init__(self):
+        self._prefixes: Dict[str, str] = {}
+        for provider in FRAMEWORK_TEMPLATES:
+            # 震荡市策略只依赖提供商名称，编译时一次性替换
+            strategy = CONSOLIDATION_TEMPLATES[provider].replace('{provider}', provider)
+            self._prefixes[provider] = ''.join((
+                PROMPT_HEADER,
+                PROVIDER_RULES[provider],
+                strategy,
+                RULES_SECTION
+            ))
+        self._bias_cache: Dict[Tuple[str, int], str] = {}
+        self._context: Optional[MarketPromptContext] = None
+
+        self.stats = {
+            'builds': 0,
+            'market_renders': 0,
+            'prompt_reuses': 0
+        }
+
+    def system_prompt(self, provider: str) -> str:
+        return SYSTEM_PROMPTS.get(provider, SYSTEM_PROMPTS['default'])
+
+    def temperature(self, provider: str) -> float:
+        return PROVIDER_TEMPERATURES.get(provider, DEFAULT_TEMPERATURE)
+
+    def stable_prefix(self, provider: str) -> str:
+        """提供商提示词的稳定前缀（跨周期不变）"""
+        return self._prefixes.get(provider, self._prefixes['default'])
+
+    def prepare(self, market_data: Dict[str, Any]) -> MarketPromptContext:
+        """渲染本周期的市场数据部分（新周期开始时调用，总是重新渲染）"""
+        self._context = MarketPromptContext(market_data)
+        self.stats['market_renders'] += 1
+        return self._context
+
+    def _context_for(self, market_data: Dict[str, Any]) -> MarketPromptContext:
+        context = self._context
+        if context is None or context.market_data is not market_data:
+            context = self.prepare(market_data)
+        return context
+
+    def bias(self, provider: str, bucket: Optional[int] = None) -> str:
+        """提供商在当前轮换周期内的偏见指令（使用独立的随机数生成器，不影响全局random状态）"""
+        if bucket is None:
+            bucket = int(time.time() / BIAS_ROTATION_SECONDS)
+        key = (provider, bucket)
+        bias = self._bias_cache.get(key)
+        if bias is None:
+            if len(self._bias_cache) > 64:
+                self._bias_cache.clear()
+            choices = PROVIDER_BIAS_CHOICES.get(provider, PROVIDER_BIAS_CHOICES['default'])
+            bias = self._bias_cache[key] = random.Random(f"{provider}_{bucket}").choice(choices)
+        return bias
+
+    def build(self, provider: str, market_data: Dict[str, Any]) -> str:
+        """构建提供商的完整提示词：稳定前缀 + 本周期行情数据（提供商分析框架 + 共享市场数据 + 偏见）"""
+        self.stats['builds'] += 1
+        context = self._context_for(market_data)
+        bucket = int(time.time() / BIAS_ROTATION_SECONDS)
+        prompt = context.prompts.get((provider, bucket))
+        if prompt is not None:
+            self.stats['prompt_reuses'] += 1
+            return prompt
+
+        framework = FRAMEWORK_TEMPLATES.get(provider, FRAMEWORK_TEMPLATES['default'])
+        prompt = ''.join((
+            self.stable_prefix(provider),
+            VOLATILE_HEADER,
+            framework.format_map(context.fields),
+            context.market_section,
+            BIAS_SECTION,
+            self.bias(provider, bucket),
+            PROMPT_FOOTER
+        ))
+        context.prompts[(provider, bucket)] = prompt
+        return prompt
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
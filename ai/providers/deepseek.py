@@ -2,12 +2,13 @@
 Deepseek AI提供商实现
 """
 
-import json
 import logging
+from datetime import datetime
 from typing import Dict, Any, Optional
 
 from ..client import BaseAIProvider, AIProviderConfig
 from ..signals import AISignal
+from ..response_parser import response_parser, confidence_value
 
 logger = logging.getLogger(__name__)
 
@@ -196,59 +197,16 @@ MACD: {macd}
         return self._parse_ai_response(response_data, "deepseek")
     
     def _parse_ai_response(self, response_data: Dict[str, Any], provider: str) -> Optional[AISignal]:
-        """解析AI响应"""
-        try:
-            if not response_data:
-                logger.error(f"{provider}响应数据为空")
-                return None
-                
-            choices = response_data.get('choices', [])
-            if not choices:
-                logger.error(f"{provider}响应无choices")
-                return None
-                
-            first_choice = choices[0]
-            message = first_choice.get('message', {})
-            content = message.get('content', '')
-            
-            if not content:
-                logger.error(f"{provider}响应无content")
-                return None
-            
-            # 清理JSON字符串
-            content = content.strip()
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0]
-            elif '```' in content:
-                content = content.split('```')[1]
-            
-            try:
-                parsed = json.loads(content)
-            except json.JSONDecodeError as e:
-                logger.error(f"{provider}响应JSON解析失败: {e}")
-                logger.error(f"{provider}响应文本: {content[:200]}...")
-                return None
-            
-            # 映射信心等级到数值
-            confidence_map = {
-                'HIGH': 0.9,
-                'MEDIUM': 0.7,
-                'LOW': 0.5
-            }
-            
-            confidence_str = str(parsed.get('confidence', 'MEDIUM')).upper()
-            confidence_value = confidence_map.get(confidence_str, 0.7)
-            signal_value = str(parsed.get('signal', 'HOLD')).upper()
-            
-            return AISignal(
-                provider=provider,
-                signal=signal_value,
-                confidence=confidence_value,
-                reason=str(parsed.get('reason', 'AI分析')),
-                timestamp=datetime.now().isoformat(),
-                raw_response=response_data
-            )
-            
-        except Exception as e:
-            logger.error(f"解析{provider}响应失败: {type(e).__name__}: {e}")
-            return None
\ No newline at end of file
+        """解析AI响应（共用解析器，见 ai/response_parser.py）"""
+        parsed = response_parser.parse(provider, response_data)
+        if parsed is None:
+            return None
+
+        return AISignal(
+            provider=provider,
+            signal=parsed['signal'],
+            confidence=confidence_value(parsed.get('confidence')),
+            reason=str(parsed.get('reason', 'AI分析')),
+            timestamp=datetime.now().isoformat(),
+            raw_response=response_data
+        )
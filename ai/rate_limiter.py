@@ -1,20 +1,35 @@
 """
 请求限流器模块
 提供智能的API请求限流，避免触发服务提供商的限制
+
+基于GCRA（通用信元速率算法）：每个时间窗口只保存一个"理论到达时间"（TAT），
+许可判断与预约都是O(1)。请求按到达顺序预约发送时刻，调用方只需休眠到该时刻，无需轮询。
+收到429或 Retry-After 时暂停该提供商并降低速率，之后随成功请求逐步恢复。
 """
 
 import asyncio
 import time
 import logging
-from typing import Dict, Any, Optional, List, Callable
-from collections import defaultdict, deque
-from datetime import datetime, timedelta
-import threading
+from typing import Dict, Any, Optional, Callable
 from dataclasses import dataclass, field
-import json
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 
 logger = logging.getLogger(__name__)
 
+
+class RateLimited(Exception):
+    """请求因限流未能完成（由限流器处理，不代表提供商故障，不计入熔断器）"""
+
+
+class RateLimitWaitExceeded(RateLimited):
+    """本地限流排队超过最长等待时间（请求未发出）"""
+
+
+class ProviderRateLimited(RateLimited):
+    """提供商返回429（限流器已按 Retry-After 暂停该提供商并降低速率）"""
+
+
 @dataclass
 class RateLimitConfig:
     """限流配置"""
@@ -25,6 +40,7 @@ class RateLimitConfig:
     adaptive_enabled: bool = True
     provider_specific: Dict[str, Dict[str, float]] = field(default_factory=dict)
 
+
 @dataclass
 class RequestRecord:
     """请求记录"""
@@ -34,236 +50,217 @@ class RequestRecord:
     response_time: float
     endpoint: str = ""
 
-class AdaptiveRateLimiter:
-    """自适应限流器"""
 
-    def __init__(self, config: RateLimitConfig):
-        self.config = config
-        self.request_history: deque = deque()
-        self.provider_stats: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
-            'total_requests': 0,
-            'successful_requests': 0,
-            'failed_requests': 0,
-            'rate_limit_hits': 0,
-            'avg_response_time': 0,
-            'current_rate': 0,
-            'last_request_time': 0
-        })
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或HTTP日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
 
-        # 滑动窗口计数器
-        self.second_window: deque = deque()
-        self.minute_window: deque = deque()
-        self.hour_window: deque = deque()
 
-        # 令牌桶
-        self.tokens = config.burst_size
-        self.last_refill = time.time()
+class GCRAWindow:
+    """单个时间窗口的GCRA状态
 
-        # 锁
-        self._lock = threading.Lock()
+    emission_interval = period / limit 为两次请求的理论间隔；
+    tolerance 允许的突发量（burst 个请求可以同时发出）。
+    """
 
-        # 自适应参数
-        self.adaptive_multiplier = 1.0
-        self.last_error_time = 0
+    __slots__ = ('period', 'limit', 'burst', 'tat')
 
-        logger.info(f"✅ 自适应限流器初始化完成")
+    def __init__(self, period: float, limit: float, burst: float):
+        self.period = period
+        self.limit = limit
+        self.burst = max(1.0, burst)
+        self.tat = 0.0  # 理论到达时间
 
-    def _clean_old_records(self):
-        """清理旧的请求记录"""
-        current_time = time.time()
+    def earliest(self, now: float, multiplier: float) -> float:
+        """按当前速率倍数，下一个请求最早可发送的时刻"""
+        interval = self.period / (self.limit * multiplier)
+        tolerance = (self.burst - 1) * interval
+        return max(now, self.tat - tolerance)
 
-        # 清理超过1小时的记录
-        cutoff_time = current_time - 3600
-        while self.request_history and self.request_history[0].timestamp < cutoff_time:
-            self.request_history.popleft()
+    def reserve(self, at: float, multiplier: float) -> None:
+        interval = self.period / (self.limit * multiplier)
+        self.tat = max(self.tat, at) + interval
 
-        # 清理滑动窗口
-        while self.second_window and self.second_window[0] < current_time - 1:
-            self.second_window.popleft()
 
-        while self.minute_window and self.minute_window[0] < current_time - 60:
-            self.minute_window.popleft()
+class SlidingWindowCounter:
+    """O(1)滑动窗口计数器：当前桶 + 上一个桶按时间比例加权"""
 
-        while self.hour_window and self.hour_window[0] < current_time - 3600:
-            self.hour_window.popleft()
+    __slots__ = ('period', '_bucket_start', '_current', '_previous')
 
-    def _get_current_rates(self) -> Dict[str, float]:
-        """获取当前请求速率"""
-        current_time = time.time()
+    def __init__(self, period: float):
+        self.period = period
+        self._bucket_start = 0.0
+        self._current = 0
+        self._previous = 0
 
-        # 计算各时间窗口内的请求数
-        second_requests = sum(1 for t in self.second_window if current_time - t < 1)
-        minute_requests = sum(1 for t in self.minute_window if current_time - t < 60)
-        hour_requests = sum(1 for t in self.hour_window if current_time - t < 3600)
+    def _roll(self, now: float) -> None:
+        elapsed = now - self._bucket_start
+        if elapsed >= self.period:
+            self._previous = self._current if elapsed < 2 * self.period else 0
+            self._current = 0
+            self._bucket_start = now - (elapsed % self.period)
 
-        return {
-            'per_second': second_requests,
-            'per_minute': minute_requests,
-            'per_hour': hour_requests
-        }
+    def add(self, now: float) -> None:
+        self._roll(now)
+        self._current += 1
 
-    def _update_provider_stats(self, provider: str, success: bool, response_time: float):
-        """更新提供商统计"""
-        stats = self.provider_stats[provider]
-        stats['total_requests'] += 1
-        stats['last_request_time'] = time.time()
+    def count(self, now: float) -> float:
+        self._roll(now)
+        weight = 1 - (now - self._bucket_start) / self.period
+        return self._current + self._previous * weight
 
-        if success:
-            stats['successful_requests'] += 1
-        else:
-            stats['failed_requests'] += 1
 
-        # 更新平均响应时间
-        if stats['avg_response_time'] == 0:
-            stats['avg_response_time'] = response_time
-        else:
-            stats['avg_response_time'] = (stats['avg_response_time'] * 0.9) + (response_time * 0.1)
+class AdaptiveRateLimiter:
+    """自适应限流器（单个提供商）
 
-    def _adaptive_adjustment(self, provider: str) -> float:
-        """自适应调整限流参数"""
-        if not self.config.adaptive_enabled:
-            return 1.0
+    每秒/每分钟/每小时三个GCRA窗口同时约束；不需要锁——所有状态修改都在事件循环中同步完成。
+    """
 
-        stats = self.provider_stats[provider]
+    # 速率倍数范围：遇到429时减半，之后每次成功请求恢复5%
+    MIN_MULTIPLIER = 0.1
+    MAX_MULTIPLIER = 1.0
+    # 429未携带Retry-After时的默认暂停时间（秒）
+    DEFAULT_BACKOFF = 2.0
 
-        # 基于成功率调整
-        if stats['total_requests'] > 10:
-            success_rate = stats['successful_requests'] / stats['total_requests']
-            if success_rate < 0.8:
-                # 成功率低，降低请求频率
-                self.adaptive_multiplier = max(0.5, self.adaptive_multiplier * 0.9)
-                logger.info(f"📉 {provider} 成功率低({success_rate:.2f})，降低请求频率至 {self.adaptive_multiplier:.2f}x")
-            elif success_rate > 0.95 and self.adaptive_multiplier < 1.5:
-                # 成功率高，可以适当提高请求频率
-                self.adaptive_multiplier = min(1.5, self.adaptive_multiplier * 1.05)
-                logger.info(f"📈 {provider} 成功率高({success_rate:.2f})，提高请求频率至 {self.adaptive_multiplier:.2f}x")
+    def __init__(self, config: RateLimitConfig):
+        self.config = config
+        self._windows = [
+            GCRAWindow(1.0, config.requests_per_second, config.burst_size),
+            GCRAWindow(60.0, config.requests_per_minute, config.requests_per_minute),
+            GCRAWindow(3600.0, config.requests_per_hour, config.requests_per_hour),
+        ]
+        self._counters = {
+            'per_second': SlidingWindowCounter(1.0),
+            'per_minute': SlidingWindowCounter(60.0),
+            'per_hour': SlidingWindowCounter(3600.0),
+        }
 
-        # 基于错误时间调整
-        current_time = time.time()
-        if current_time - self.last_error_time < 300:  # 5分钟内有错误
-            self.adaptive_multiplier = max(0.5, self.adaptive_multiplier * 0.95)
+        # 自适应参数
+        self.adaptive_multiplier = 1.0
+        self.blocked_until = 0.0  # Retry-After 截止时刻
+        self.last_error_time = 0
+
+        self.stats: Dict[str, Any] = {
+            'total_requests': 0,
+            'successful_requests': 0,
+            'failed_requests': 0,
+            'rate_limit_hits': 0,
+            'avg_response_time': 0.0,
+            'permits': 0,
+            'throttled': 0,  # 需要排队等待的许可数
+            'rejected': 0,   # 等待时间超过上限而被拒绝的许可数
+            'queue_delay_total': 0.0,
+            'queue_delay_max': 0.0,
+            'last_request_time': 0.0
+        }
 
-        return self.adaptive_multiplier
+        logger.debug("✅ 自适应限流器初始化完成")
+
+    def _earliest(self, now: float) -> float:
+        earliest = max(now, self.blocked_until)
+        for window in self._windows:
+            earliest = max(earliest, window.earliest(now, self.adaptive_multiplier))
+        return earliest
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """预约下一个发送时刻，返回需要等待的秒数；超过 max_wait 时不预约并返回None"""
+        now = time.monotonic()
+        send_at = self._earliest(now)
+        delay = send_at - now
+        if max_wait is not None and delay > max_wait:
+            self.stats['rejected'] += 1
+            return None
+
+        for window in self._windows:
+            window.reserve(send_at, self.adaptive_multiplier)
+        for counter in self._counters.values():
+            counter.add(now)
+
+        self.stats['permits'] += 1
+        if delay > 0:
+            self.stats['throttled'] += 1
+            self.stats['queue_delay_total'] += delay
+            self.stats['queue_delay_max'] = max(self.stats['queue_delay_max'], delay)
+        return delay
+
+    async def acquire(self, provider: str = "", timeout: Optional[float] = None) -> bool:
+        """等待直到可以发送请求；需要等待的时间超过 timeout 时立即返回False"""
+        delay = self.reserve(timeout)
+        if delay is None:
+            logger.warning(f"⏳ {provider} 限流等待超过 {timeout:.1f}秒，放弃本次请求")
+            return False
+        if delay > 0:
+            logger.debug(f"⏳ {provider} 限流排队 {delay * 1000:.0f}ms")
+            await asyncio.sleep(delay)
+        return True
 
     async def acquire_permission(self, provider: str, endpoint: str = "") -> bool:
-        """获取请求许可"""
-        with self._lock:
-            self._clean_old_records()
-
-            current_time = time.time()
-
-            # 获取提供商特定配置
-            provider_config = self.config.provider_specific.get(provider, {})
-
-            # 计算自适应调整
-            adaptive_multiplier = self._adaptive_adjustment(provider)
-
-            # 应用限流限制
-            rps = (provider_config.get('requests_per_second', self.config.requests_per_second) *
-                   adaptive_multiplier)
-            rpm = (provider_config.get('requests_per_minute', self.config.requests_per_minute) *
-                   adaptive_multiplier)
-            rph = (provider_config.get('requests_per_hour', self.config.requests_per_hour) *
-                   adaptive_multiplier)
-
-            # 获取当前速率
-            current_rates = self._get_current_rates()
-
-            # 检查是否超过限制
-            if current_rates['per_second'] >= rps:
-                wait_time = 1.0 / rps - (current_time - self.second_window[-1])
-                logger.debug(f"⏳ {provider} 达到每秒限流，等待 {wait_time:.2f}秒")
-                return False
-
-            if current_rates['per_minute'] >= rpm:
-                wait_time = 60.0 / rpm - (current_time - self.minute_window[-1])
-                logger.debug(f"⏳ {provider} 达到每分钟限流，等待 {wait_time:.2f}秒")
-                return False
-
-            if current_rates['per_hour'] >= rph:
-                wait_time = 3600.0 / rph - (current_time - self.hour_window[-1])
-                logger.debug(f"⏳ {provider} 达到每小时限流，等待 {wait_time:.2f}秒")
-                return False
-
-            # 令牌桶算法
-            time_passed = current_time - self.last_refill
-            tokens_to_add = time_passed * rps
-            self.tokens = min(self.config.burst_size, self.tokens + tokens_to_add)
-            self.last_refill = current_time
-
-            if self.tokens < 1:
-                logger.debug(f"⏳ {provider} 令牌桶为空，等待令牌生成")
-                return False
-
-            # 消耗令牌
-            self.tokens -= 1
-
-            # 记录请求
-            self.second_window.append(current_time)
-            self.minute_window.append(current_time)
-            self.hour_window.append(current_time)
-
-            logger.debug(f"✅ {provider} 限流检查通过，当前令牌: {self.tokens:.2f}")
-            return True
+        """获取请求许可（不等待：当前无法立即发送时返回False）"""
+        return self.reserve(max_wait=0.0) is not None
+
+    def on_rate_limited(self, provider: str, retry_after: Optional[float] = None) -> None:
+        """收到429：暂停到 Retry-After 之后，并降低速率"""
+        now = time.monotonic()
+        pause = retry_after if retry_after is not None else self.DEFAULT_BACKOFF
+        self.blocked_until = max(self.blocked_until, now + pause)
+        self.last_error_time = time.time()
+        self.stats['rate_limit_hits'] += 1
+        if self.config.adaptive_enabled:
+            self.adaptive_multiplier = max(self.MIN_MULTIPLIER, self.adaptive_multiplier * 0.5)
+        logger.warning(f"🚦 {provider} 触发速率限制，暂停 {pause:.1f}秒，速率降至 {self.adaptive_multiplier:.2f}x")
 
     def record_request(self, provider: str, success: bool, response_time: float, endpoint: str = ""):
         """记录请求结果"""
-        with self._lock:
-            current_time = time.time()
-
-            # 创建请求记录
-            record = RequestRecord(
-                timestamp=current_time,
-                provider=provider,
-                success=success,
-                response_time=response_time,
-                endpoint=endpoint
-            )
-
-            self.request_history.append(record)
+        stats = self.stats
+        stats['total_requests'] += 1
+        stats['last_request_time'] = time.time()
+        if success:
+            stats['successful_requests'] += 1
+            if self.config.adaptive_enabled and self.adaptive_multiplier < self.MAX_MULTIPLIER:
+                self.adaptive_multiplier = min(self.MAX_MULTIPLIER, self.adaptive_multiplier * 1.05)
+        else:
+            stats['failed_requests'] += 1
+            self.last_error_time = time.time()
 
-            # 更新提供商统计
-            self._update_provider_stats(provider, success, response_time)
+        # 更新平均响应时间
+        if stats['avg_response_time'] == 0:
+            stats['avg_response_time'] = response_time
+        else:
+            stats['avg_response_time'] = (stats['avg_response_time'] * 0.9) + (response_time * 0.1)
 
-            # 记录错误
-            if not success:
-                self.last_error_time = current_time
-                stats = self.provider_stats[provider]
-                stats['rate_limit_hits'] += 1
+    def _get_current_rates(self) -> Dict[str, float]:
+        """获取当前请求速率（滑动窗口估算）"""
+        now = time.monotonic()
+        return {name: round(counter.count(now), 2) for name, counter in self._counters.items()}
 
     def get_stats(self) -> Dict[str, Any]:
         """获取限流统计"""
-        with self._lock:
-            self._clean_old_records()
-
-            total_requests = len(self.request_history)
-            successful_requests = sum(1 for r in self.request_history if r.success)
-
-            current_rates = self._get_current_rates()
-
-            provider_stats = {}
-            for provider, stats in self.provider_stats.items():
-                provider_stats[provider] = {
-                    'total_requests': stats['total_requests'],
-                    'successful_requests': stats['successful_requests'],
-                    'failed_requests': stats['failed_requests'],
-                    'rate_limit_hits': stats['rate_limit_hits'],
-                    'success_rate': (stats['successful_requests'] / stats['total_requests']
-                                   if stats['total_requests'] > 0 else 0),
-                    'avg_response_time': stats['avg_response_time'],
-                    'current_rate': stats['current_rate']
-                }
-
-            return {
-                'total_requests': total_requests,
-                'successful_requests': successful_requests,
-                'overall_success_rate': successful_requests / total_requests if total_requests > 0 else 0,
-                'current_rates': current_rates,
-                'provider_stats': provider_stats,
-                'adaptive_multiplier': self.adaptive_multiplier,
-                'current_tokens': self.tokens,
-                'burst_size': self.config.burst_size
-            }
+        stats = self.stats
+        permits = stats['permits']
+        return {
+            **stats,
+            'success_rate': (stats['successful_requests'] / stats['total_requests']
+                             if stats['total_requests'] > 0 else 0),
+            'avg_queue_delay_ms': stats['queue_delay_total'] / permits * 1000 if permits else 0.0,
+            'max_queue_delay_ms': stats['queue_delay_max'] * 1000,
+            'current_rates': self._get_current_rates(),
+            'adaptive_multiplier': round(self.adaptive_multiplier, 3),
+            'blocked_for': max(0.0, self.blocked_until - time.monotonic()),
+            'burst_size': self.config.burst_size
+        }
+
 
 class MultiProviderRateLimiter:
     """多提供商限流管理器"""
@@ -274,15 +271,6 @@ class MultiProviderRateLimiter:
 
     def _initialize_provider_limiters(self):
         """初始化各提供商的限流器"""
-        # 默认限流配置
-        default_config = RateLimitConfig(
-            requests_per_second=1.0,
-            requests_per_minute=30.0,
-            requests_per_hour=500.0,
-            burst_size=3,
-            adaptive_enabled=True
-        )
-
         # 提供商特定的限流配置
         provider_configs = {
             'deepseek': RateLimitConfig(
@@ -316,41 +304,33 @@ class MultiProviderRateLimiter:
         }
 
         # 创建限流器
-        for provider, config in provider_configs.items():
-            self.limiters[provider] = AdaptiveRateLimiter(config)
+        self.limiters = {provider: AdaptiveRateLimiter(config) for provider, config in provider_configs.items()}
+
+    def get_limiter(self, provider: str) -> AdaptiveRateLimiter:
+        limiter = self.limiters.get(provider)
+        if limiter is None:
+            # 使用默认限流配置
+            limiter = self.limiters[provider] = AdaptiveRateLimiter(RateLimitConfig())
+        return limiter
 
     async def wait_for_permission(self, provider: str, endpoint: str = "",
-                                timeout: float = 30.0) -> bool:
+                                  timeout: float = 30.0) -> bool:
         """等待获取请求许可"""
-        if provider not in self.limiters:
-            # 使用默认限流器
-            self.limiters[provider] = AdaptiveRateLimiter(RateLimitConfig())
-
-        limiter = self.limiters[provider]
-        start_time = time.time()
+        return await self.get_limiter(provider).acquire(provider, timeout)
 
-        while time.time() - start_time < timeout:
-            if await limiter.acquire_permission(provider, endpoint):
-                return True
-
-            # 等待一小段时间后重试
-            await asyncio.sleep(0.1)
-
-        logger.warning(f"⏰ {provider} 等待限流许可超时")
-        return False
+    def on_rate_limited(self, provider: str, retry_after: Optional[float] = None) -> None:
+        """提供商返回429时调用"""
+        self.get_limiter(provider).on_rate_limited(provider, retry_after)
 
     def record_request_result(self, provider: str, success: bool,
-                            response_time: float, endpoint: str = ""):
+                              response_time: float, endpoint: str = ""):
         """记录请求结果"""
         if provider in self.limiters:
             self.limiters[provider].record_request(provider, success, response_time, endpoint)
 
     def get_all_stats(self) -> Dict[str, Any]:
         """获取所有限流器的统计"""
-        all_stats = {}
-        for provider, limiter in self.limiters.items():
-            all_stats[provider] = limiter.get_stats()
-        return all_stats
+        return {provider: limiter.get_stats() for provider, limiter in self.limiters.items()}
 
     def reset_stats(self, provider: str = None):
         """重置统计"""
@@ -363,9 +343,16 @@ class MultiProviderRateLimiter:
             # 重置所有
             self._initialize_provider_limiters()
 
+
 # 全局限流器实例
 rate_limiter = MultiProviderRateLimiter()
 
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return 'rate limit' in message or 'too many requests' in message or '429' in message
+
+
 # 便捷的限流装饰器
 def rate_limit(provider: str, endpoint: str = "", timeout: float = 30.0):
     """限流装饰器"""
@@ -384,8 +371,8 @@ def rate_limit(provider: str, endpoint: str = "", timeout: float = 30.0):
                 return result
             except Exception as e:
                 # 判断是否是限流错误
-                if 'rate limit' in str(e).lower() or 'too many requests' in str(e).lower():
-                    rate_limiter.limiters[provider].last_error_time = time.time()
+                if _is_rate_limit_error(e):
+                    rate_limiter.on_rate_limited(provider)
                 raise
             finally:
                 # 记录请求结果
@@ -395,15 +382,18 @@ def rate_limit(provider: str, endpoint: str = "", timeout: float = 30.0):
         return wrapper
     return decorator
 
+
 # 向后兼容的函数
 async def check_rate_limit(provider: str) -> bool:
     """检查是否可以发送请求（向后兼容）"""
     return await rate_limiter.wait_for_permission(provider)
 
+
 def update_rate_limit_stats(provider: str, success: bool, response_time: float):
     """更新限流统计（向后兼容）"""
     rate_limiter.record_request_result(provider, success, response_time)
 
+
 def get_rate_limit_stats() -> Dict[str, Any]:
     """获取限流统计（向后兼容）"""
-    return rate_limiter.get_all_stats()
\ No newline at end of file
+    return rate_limiter.get_all_stats()
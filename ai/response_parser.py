@@ -0,0 +1,219 @@
+"""
+AI响应解析
+所有提供商共用的 chat/completions 响应解析：
+一次扫描找出回复文本中的平衡JSON对象（兼容代码块、前后夹杂的说明文字和思考过程），
+优先使用 orjson 解析（未安装时回退标准库 json），并按精简的信号模式校验字段。
+解析失败只记录一行截断后的样本，最近的失败样本保存在有界缓冲区中便于排查
+"""
+
+import json
+import re
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Iterator, Tuple, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+VALID_SIGNALS = ('BUY', 'SELL', 'HOLD')
+
+# 信心等级到数值的映射
+CONFIDENCE_MAP = {
+    'HIGH': 0.9,
+    'MEDIUM': 0.7,
+    'LOW': 0.5
+}
+DEFAULT_CONFIDENCE = 0.7
+
+# 扫描对象时只关心完整的字符串（含转义，其中的花括号不计）和花括号
+_TOKENS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]')
+
+
+def loads(data):
+    """解析JSON（优先使用orjson；orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，调用方无需区分）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_json_objects(text: str) -> Iterator[Tuple[int, int]]:
+    """按出现顺序给出文本中平衡的 {...} 片段位置 (start, end)
+
+    对象之外只查找左花括号，说明文字中的引号不会干扰扫描；
+    未闭合的左花括号（截断或说明文字中的孤立花括号）被跳过，从下一个左花括号继续
+    """
+    pos = text.find('{')
+    while pos != -1:
+        depth = 0
+        for match in _TOKENS.finditer(text, pos):
+            token = match.group()
+            if token == '{':
+                depth += 1
+            elif token == '}':
+                depth -= 1
+                if depth == 0:
+                    yield pos, match.end()
+                    break
+        pos = text.find('{', pos + 1)
+
+
+def validate_signal(parsed: Any) -> Optional[str]:
+    """按信号模式校验，返回错误说明（通过时为None）
+
+    signal: 必填，BUY/SELL/HOLD；confidence: 可选，HIGH/MEDIUM/LOW 或 0~1 的数值；reason: 可选，字符串
+    """
+    if not isinstance(parsed, dict):
+        return f"不是JSON对象: {type(parsed).__name__}"
+    signal = parsed.get('signal')
+    if not isinstance(signal, str) or signal.strip().upper() not in VALID_SIGNALS:
+        return f"signal无效: {signal!r}"
+    confidence = parsed.get('confidence')
+    if confidence is not None:
+        if isinstance(confidence, str):
+            if confidence.strip().upper() not in CONFIDENCE_MAP:
+                return f"confidence无效: {confidence!r}"
+        elif isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+            return f"confidence无效: {confidence!r}"
+    reason = parsed.get('reason')
+    if reason is not None and not isinstance(reason, str):
+        return f"reason类型错误: {type(reason).__name__}"
+    return None
+
+
+def extract_signal(text: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """从回复文本中提取第一个符合信号模式的JSON对象
+
+    Returns:
+        (信号字段, 失败原因)，成功时失败原因为None；信号字段中 signal/confidence 已统一为大写
+    """
+    text = _strip_reasoning(text)
+    error = '未找到JSON对象'
+    for start, end in iter_json_objects(text):
+        try:
+            parsed = loads(text[start:end])
+        except ValueError as e:
+            error = f"JSON解析失败: {e}"
+            continue
+        invalid = validate_signal(parsed)
+        if invalid:
+            error = invalid
+            continue
+        return _normalize(parsed), None
+    return None, error
+
+
+def _strip_reasoning(text: str) -> str:
+    """推理模型的思考过程中可能出现示例JSON，只保留思考结束之后的正式回复"""
+    text = text.strip()
+    if '</think>' in text:
+        text = text.rsplit('</think>', 1)[1].strip()
+    return text
+
+
+def _normalize(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    parsed['signal'] = parsed['signal'].strip().upper()
+    if isinstance(parsed.get('confidence'), str):
+        parsed['confidence'] = parsed['confidence'].strip().upper()
+    return parsed
+
+
+def confidence_value(confidence: Any) -> float:
+    """信心等级或数值 -> 0~1的数值"""
+    if isinstance(confidence, (int, float)) and not isinstance(confidence, bool):
+        return float(confidence)
+    return CONFIDENCE_MAP.get(str(confidence or 'MEDIUM').upper(), DEFAULT_CONFIDENCE)
+
+
+class AIResponseParser:
+    """chat/completions 响应解析器（带统计和失败样本缓冲区）"""
+
+    def __init__(self, max_samples: int = 20, sample_chars: int = 500):
+        self.sample_chars = sample_chars
+        self.failure_samples: deque = deque(maxlen=max_samples)
+        self.stats = {
+            'parsed': 0,
+            'fast_path': 0,  # 首尾花括号之间即为信号对象，无需扫描
+            'extracted': 0,  # 逐个扫描平衡对象提取（多个对象、孤立花括号等）
+            'failures': 0,
+            'failure_reasons': {},
+            'parse_time_total': 0.0
+        }
+
+    def parse(self, provider: str, response_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """解析完整响应，返回校验通过的信号字段，失败时返回None"""
+        if not isinstance(response_data, dict) or not response_data:
+            return self._fail(provider, '响应数据为空', repr(response_data))
+        choices = response_data.get('choices')
+        if not choices or not isinstance(choices, list) or not isinstance(choices[0], dict):
+            return self._fail(provider, '响应无choices或格式错误', repr(response_data))
+        message = choices[0].get('message')
+        if not isinstance(message, dict):
+            return self._fail(provider, '响应无message或格式错误', repr(response_data))
+        content = message.get('content')
+        if not content or not isinstance(content, str):
+            return self._fail(provider, '响应无content', repr(response_data))
+        return self.parse_content(provider, content)
+
+    def parse_content(self, provider: str, content: str) -> Optional[Dict[str, Any]]:
+        """解析回复文本"""
+        start = time.perf_counter()
+        parsed = None
+        text = _strip_reasoning(content)
+        # 快速路径：第一个左花括号到最后一个右花括号恰好是一个JSON对象（纯JSON、单个代码块、前后夹杂说明文字）
+        start_pos, end_pos = text.find('{'), text.rfind('}')
+        if 0 <= start_pos < end_pos:
+            try:
+                candidate = loads(text[start_pos:end_pos + 1])
+            except ValueError:
+                candidate = None
+            if validate_signal(candidate) is None:
+                parsed = _normalize(candidate)
+                self.stats['fast_path'] += 1
+        if parsed is None:
+            parsed, error = extract_signal(text)
+            if parsed is not None:
+                self.stats['extracted'] += 1
+        self.stats['parse_time_total'] += time.perf_counter() - start
+
+        if parsed is None:
+            return self._fail(provider, error, content)
+        self.stats['parsed'] += 1
+        return parsed
+
+    def _fail(self, provider: str, reason: str, sample: str) -> None:
+        self.stats['failures'] += 1
+        # 失败原因按类别计数（去掉具体内容）
+        category = reason.split(':')[0]
+        self.stats['failure_reasons'][category] = self.stats['failure_reasons'].get(category, 0) + 1
+        self.failure_samples.append({
+            'provider': provider,
+            'reason': reason,
+            'sample': sample[:self.sample_chars],
+            'time': time.time()
+        })
+        logger.warning(f"⚠️ {provider}响应解析失败（{reason}）: {sample[:200]!r}")
+        return None
+
+    def get_failure_samples(self) -> List[Dict[str, Any]]:
+        """最近的解析失败样本"""
+        return list(self.failure_samples)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats
+        attempts = stats['parsed'] + stats['failures']
+        return {
+            **{k: v for k, v in stats.items() if k != 'parse_time_total'},
+            'failure_reasons': dict(stats['failure_reasons']),
+            'failure_rate': stats['failures'] / attempts if attempts else 0.0,
+            'avg_parse_us': stats['parse_time_total'] / attempts * 1e6 if attempts else 0.0,
+            'orjson': orjson is not None
+        }
+
+
+# 全局响应解析器
+response_parser = AIResponseParser()
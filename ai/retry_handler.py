@@ -7,10 +7,13 @@ import asyncio
 import time
 import logging
 import random
+from collections import defaultdict
 from functools import wraps
 from typing import Callable, Any, Optional, Dict, List, Union
 from enum import Enum
 
+from utils.retry_budget import retry_budget
+
 logger = logging.getLogger(__name__)
 
 class RetryStrategy(Enum):
@@ -58,7 +61,8 @@ class RetryHandler:
             'successful_retries': 0,
             'failed_retries': 0,
             'retry_by_provider': defaultdict(int),
-            'retry_by_error_type': defaultdict(int)
+            'retry_by_error_type': defaultdict(int),
+            'budget_denied': 0
         }
 
     def should_retry(self, exception: Exception, condition: RetryCondition) -> bool:
@@ -133,7 +137,9 @@ class RetryHandler:
         """智能重试装饰器"""
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            provider = kwargs.get('provider', '') or args[0] if args else ''
+            provider = kwargs.get('provider') or (args[0] if args else '')
+            origin = f"retry_handler:{provider or func.__name__}"
+            retry_budget.record_request(origin)
 
             for attempt in range(self.config.max_attempts):
                 try:
@@ -154,6 +160,11 @@ class RetryHandler:
                             should_retry = True
                             break
 
+                    # 全局重试预算不足时同样放弃
+                    if should_retry and attempt < self.config.max_attempts - 1 and not retry_budget.try_acquire(origin):
+                        self.retry_stats['budget_denied'] += 1
+                        should_retry = False
+
                     if not should_retry or attempt == self.config.max_attempts - 1:
                         # 不重试或达到最大重试次数
                         self.retry_stats['failed_retries'] += 1
@@ -192,6 +203,7 @@ class RetryHandler:
             'failed_retries': self.retry_stats['failed_retries'],
             'retry_by_provider': dict(self.retry_stats['retry_by_provider']),
             'retry_by_error_type': dict(self.retry_stats['retry_by_error_type']),
+            'budget_denied': self.retry_stats['budget_denied'],
             'success_rate': (
                 self.retry_stats['successful_retries'] / self.retry_stats['total_retries']
                 if self.retry_stats['total_retries'] > 0 else 0
@@ -205,7 +217,8 @@ class RetryHandler:
             'successful_retries': 0,
             'failed_retries': 0,
             'retry_by_provider': defaultdict(int),
-            'retry_by_error_type': defaultdict(int)
+            'retry_by_error_type': defaultdict(int),
+            'budget_denied': 0
         }
 
 # 默认重试配置
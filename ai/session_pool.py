@@ -0,0 +1,149 @@
+"""
+AI提供商HTTP会话池
+每个提供商持有一个长连接会话（keep-alive），重复请求复用已建立的TCP/TLS连接，
+避免每次调用都重新进行DNS解析、TCP握手和TLS握手
+"""
+
+import asyncio
+import time
+import logging
+from typing import Dict, Any, Optional, Callable
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderSessionPool:
+    """按提供商划分的持久HTTP会话池
+
+    会话绑定创建时的事件循环：在另一个事件循环中取用时会丢弃旧会话并重新创建
+    （旧事件循环已关闭时其连接无法复用）。请求超时由调用方在每次请求时指定。
+    """
+
+    def __init__(self, limit_per_host: int = 10, keepalive_timeout: float = 60.0,
+                 ttl_dns_cache: int = 300, resolver_factory: Optional[Callable[[], AbstractResolver]] = None):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout  # 空闲连接保留时间（秒）
+        self.ttl_dns_cache = ttl_dns_cache
+        self.resolver_factory = resolver_factory  # 为每个连接器创建DNS解析器，为空使用aiohttp默认解析器
+
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._loops: Dict[str, asyncio.AbstractEventLoop] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def _stats_for(self, provider: str) -> Dict[str, Any]:
+        stats = self.stats.get(provider)
+        if stats is None:
+            stats = self.stats[provider] = {
+                'sessions_created': 0,
+                'requests': 0,
+                'new_connections': 0,
+                'reused_connections': 0,
+                'connect_ms_total': 0.0,
+                'warmups': 0
+            }
+        return stats
+
+    def _trace_config(self, provider: str) -> aiohttp.TraceConfig:
+        """通过aiohttp追踪钩子统计新建连接与复用连接"""
+        stats = self._stats_for(provider)
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            stats['requests'] += 1
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter()
+
+        async def on_connection_create_end(session, ctx, params):
+            stats['new_connections'] += 1
+            stats['connect_ms_total'] += (time.perf_counter() - getattr(ctx, 'connect_start', time.perf_counter())) * 1000
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats['reused_connections'] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def get_session(self, provider: str) -> aiohttp.ClientSession:
+        """获取提供商的持久会话（必须在事件循环中调用）"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(provider)
+        if session is not None and not session.closed and self._loops.get(provider) is loop:
+            return session
+
+        if session is not None and not session.closed:
+            # 旧会话属于其他（通常已关闭的）事件循环，无法在当前循环中等待关闭
+            try:
+                session.connector._close()
+            except Exception as e:
+                logger.debug(f"释放 {provider} 旧会话失败: {e}")
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit_per_host * 3,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.ttl_dns_cache,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+            enable_cleanup_closed=True,
+            resolver=self.resolver_factory() if self.resolver_factory else None
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            trace_configs=[self._trace_config(provider)]
+        )
+        self._sessions[provider] = session
+        self._loops[provider] = loop
+        self._stats_for(provider)['sessions_created'] += 1
+        logger.debug(f"🔌 创建 {provider} 持久会话")
+        return session
+
+    async def warmup(self, provider: str, url: str, timeout: float = 5.0) -> bool:
+        """预热连接：向提供商域名发送一个轻量请求，使TCP/TLS连接进入连接池"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        try:
+            session = self.get_session(provider)
+            async with session.head(origin, allow_redirects=False,
+                                    timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                await response.read()
+            self._stats_for(provider)['warmups'] += 1
+            return True
+        except Exception as e:
+            logger.debug(f"{provider} 连接预热失败: {type(e).__name__}: {e}")
+            return False
+
+    async def close(self) -> None:
+        """关闭所有会话"""
+        loop = asyncio.get_running_loop()
+        for provider, session in list(self._sessions.items()):
+            try:
+                if session.closed:
+                    continue
+                if self._loops.get(provider) is loop:
+                    await session.close()
+                else:
+                    session.connector._close()
+            except Exception as e:
+                logger.warning(f"关闭 {provider} 会话失败: {e}")
+        self._sessions.clear()
+        self._loops.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各提供商连接复用统计"""
+        result = {}
+        for provider, stats in self.stats.items():
+            acquired = stats['new_connections'] + stats['reused_connections']
+            result[provider] = {
+                **stats,
+                'connect_ms_total': round(stats['connect_ms_total'], 3),
+                'reuse_rate': stats['reused_connections'] / acquired if acquired > 0 else 0,
+                'open': provider in self._sessions and not self._sessions[provider].closed
+            }
+        return result
@@ -0,0 +1,154 @@
+"""
+市场状态信号索引
+把每次成功获取的AI信号连同当时的市场特征向量（RSI、MACD、ATR%、趋势、价格位置、持仓方向）存入索引，
+AI服务异常时按特征相似度查找最近邻的历史决策作为兜底，而不是简单返回最近一条高信心信号
+"""
+
+import math
+import time
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 特征名称与权重（特征均归一化到[0, 1]）
+FEATURES = ('rsi', 'macd', 'atr', 'trend', 'price_position', 'position_side')
+FEATURE_WEIGHTS = np.array([1.0, 1.0, 1.0, 1.0, 1.0, 2.0])  # 持仓方向不同的状态应基本不相似
+
+_MA_TREND_VALUES = {'多头排列': 1.0, '空头排列': 0.0, '震荡排列': 0.5}
+_MACD_STATUS_VALUES = {'金叉看涨': 0.75, '死叉看跌': 0.25, '中性震荡': 0.5}
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        return None
+    return result if math.isfinite(result) else None
+
+
+def market_features(market_data: Dict[str, Any]) -> np.ndarray:
+    """提取归一化的市场特征向量，缺失的指标取中性值0.5"""
+    technical_data = market_data.get('technical_data') or {}
+    price = _as_float(market_data.get('price')) or 0.0
+
+    rsi = _as_float(technical_data.get('rsi'))
+    rsi_feature = min(max(rsi / 100, 0.0), 1.0) if rsi is not None else 0.5
+
+    # MACD柱状图按价格归一化（万分之一为单位），无数值时使用MACD状态
+    histogram = _as_float(technical_data.get('macd_histogram'))
+    if histogram is not None and price > 0:
+        macd_feature = (math.tanh(histogram / price * 1e4 / 5) + 1) / 2
+    else:
+        macd_feature = _MACD_STATUS_VALUES.get(technical_data.get('macd'), 0.5)
+
+    atr_pct = _as_float(market_data.get('atr_pct', technical_data.get('atr_pct')))
+    atr_feature = min(max(atr_pct, 0.0), 5.0) / 5 if atr_pct is not None else 0.5
+
+    # 趋势：均线排列优先，其次为数值型趋势强度（-1~1）
+    ma_trend = (market_data.get('trend_analysis') or {}).get('overall', technical_data.get('ma_trend'))
+    if ma_trend in _MA_TREND_VALUES:
+        trend_feature = _MA_TREND_VALUES[ma_trend]
+    else:
+        trend_strength = _as_float(market_data.get('trend_strength'))
+        trend_feature = (min(max(trend_strength, -1.0), 1.0) + 1) / 2 if trend_strength is not None else 0.5
+
+    # 价格在最近20根K线区间中的位置
+    price_position = 0.5
+    price_history = market_data.get('price_history') or []
+    if len(price_history) >= 20 and price > 0:
+        recent = price_history[-20:]
+        low, high = min(recent), max(recent)
+        if high > low:
+            price_position = min(max((price - low) / (high - low), 0.0), 1.0)
+
+    position = market_data.get('position') or {}
+    side = position.get('side') if (_as_float(position.get('size')) or 0) > 0 else None
+    side_feature = 1.0 if side == 'long' else 0.0 if side == 'short' else 0.5
+
+    return np.array([rsi_feature, macd_feature, atr_feature, trend_feature, price_position, side_feature])
+
+
+class MarketStateIndex:
+    """历史信号的k近邻索引
+
+    特征向量存放在预分配的环形矩阵中，查询时对全部有效行做一次向量化的加权欧氏距离计算，
+    容量为数百条时单次查询只需数十微秒。相似度 = 1 - 距离/最大可能距离，取值[0, 1]。
+    """
+
+    def __init__(self, capacity: int = 500, max_age: float = 7200.0, min_confidence: float = 0.7):
+        self.capacity = capacity
+        self.max_age = max_age  # 只复用该时间内的信号（秒）
+        self.min_confidence = min_confidence  # 只复用信心足够高的信号
+
+        self._vectors = np.zeros((capacity, len(FEATURES)))
+        self._timestamps = np.zeros(capacity)
+        self._confidences = np.zeros(capacity)
+        self._signals: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._next = 0
+        self._size = 0
+        self._max_distance = math.sqrt(FEATURE_WEIGHTS.sum())
+
+        self.stats = {'added': 0, 'queries': 0, 'matches': 0}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, market_data: Dict[str, Any], signal_data: Dict[str, Any]) -> None:
+        """记录信号及其对应的市场特征"""
+        try:
+            vector = market_features(market_data)
+        except Exception as e:
+            logger.debug(f"提取市场特征失败，跳过索引: {e}")
+            return
+
+        slot = self._next
+        self._vectors[slot] = vector
+        self._timestamps[slot] = time.time()
+        self._confidences[slot] = _as_float(signal_data.get('confidence')) or 0.0
+        self._signals[slot] = signal_data
+        self._next = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.stats['added'] += 1
+
+    def query(self, market_data: Dict[str, Any], k: int = 5,
+              threshold: float = 0.8) -> List[Tuple[float, Dict[str, Any]]]:
+        """查找最相似的k个历史信号（相似度不低于阈值），按相似度降序返回 (相似度, 信号)"""
+        self.stats['queries'] += 1
+        if self._size == 0:
+            return []
+
+        vector = market_features(market_data)
+        size = self._size
+        diff = self._vectors[:size] - vector
+        similarity = 1 - np.sqrt((diff * diff) @ FEATURE_WEIGHTS) / self._max_distance
+
+        eligible = (
+            (similarity >= threshold) &
+            (time.time() - self._timestamps[:size] < self.max_age) &
+            (self._confidences[:size] > self.min_confidence)
+        )
+        candidates = np.flatnonzero(eligible)
+        if candidates.size == 0:
+            return []
+
+        if candidates.size > k:
+            top = np.argpartition(-similarity[candidates], k - 1)[:k]
+            candidates = candidates[top]
+        order = candidates[np.argsort(-similarity[candidates], kind='stable')]
+
+        self.stats['matches'] += 1
+        return [(float(similarity[i]), self._signals[i]) for i in order]
+
+    def nearest(self, market_data: Dict[str, Any], threshold: float = 0.8) -> Optional[Dict[str, Any]]:
+        """最相似的历史信号（副本，附带相似度），无足够相似的信号时返回None"""
+        matches = self.query(market_data, k=1, threshold=threshold)
+        if not matches:
+            return None
+        similarity, signal = matches[0]
+        return {**signal, 'similarity': similarity}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'size': self._size, 'capacity': self.capacity}
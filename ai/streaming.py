@@ -0,0 +1,177 @@
+"""
+流式（SSE）chat/completions 响应处理
+逐块读取增量内容并增量解析JSON，signal 和 confidence 字段完整后即可做出决策，
+无需等待完整的分析理由生成完毕
+"""
+
+import asyncio
+import json
+import re
+import time
+import logging
+from typing import Dict, Any, Optional
+
+import aiohttp
+
+from .response_parser import extract_signal, loads, validate_signal, _normalize, _strip_reasoning
+
+logger = logging.getLogger(__name__)
+
+# 决策所需字段（值为完整的JSON字符串后即视为可用）
+REQUIRED_FIELDS = ('signal', 'confidence')
+
+_FIELD_PATTERNS = {
+    name: re.compile(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % name)
+    for name in ('signal', 'confidence', 'reason', 'risk')
+}
+# confidence 也可以是数值（如 0.8），数值后出现分隔符即为完整
+_NUMERIC_CONFIDENCE = re.compile(r'"confidence"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)(?=[\s,}])')
+_PARTIAL_REASON = re.compile(r'"reason"\s*:\s*"((?:[^"\\]|\\.)*)$')
+
+
+class IncrementalSignalParser:
+    """增量JSON字段解析器
+
+    每次追加文本后只扫描尚未完成的字段；字段值遇到未转义的结束引号即为完整。
+    推理模型的思考过程（<think>...</think>）中的示例字段不参与匹配。
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.fields: Dict[str, Any] = {}
+
+    def feed(self, delta: str) -> None:
+        self.text += delta
+        answer = self._answer_text()
+        if not answer:
+            return
+        for name, pattern in _FIELD_PATTERNS.items():
+            if name not in self.fields:
+                match = pattern.search(answer)
+                if match:
+                    self.fields[name] = _unescape(match.group(1))
+        if 'confidence' not in self.fields:
+            match = _NUMERIC_CONFIDENCE.search(answer)
+            if match:
+                self.fields['confidence'] = float(match.group(1))
+
+    def _answer_text(self) -> str:
+        """思考过程之后的正式回复（思考尚未结束时为空）"""
+        if '<think>' in self.text and '</think>' not in self.text:
+            return ''
+        return _strip_reasoning(self.text)
+
+    def has(self, name: str) -> bool:
+        return name in self.fields
+
+    @property
+    def decided(self) -> bool:
+        """决策字段是否已全部完整"""
+        return all(name in self.fields for name in REQUIRED_FIELDS)
+
+    def partial_reason(self) -> Optional[str]:
+        """reason 尚未结束时已生成的部分"""
+        if 'reason' in self.fields:
+            return self.fields['reason']
+        match = _PARTIAL_REASON.search(self._answer_text())
+        if match:
+            # 截掉可能被切断的转义序列
+            return _unescape(match.group(1).rstrip('\\'))
+        return None
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """解析结果：完整JSON优先，否则使用增量提取的字段；未通过信号模式校验时为None"""
+        parsed, _ = extract_signal(self._answer_text())
+        if parsed is not None:
+            return parsed
+
+        fields = dict(self.fields)
+        invalid = validate_signal(fields)
+        if invalid:
+            logger.debug(f"增量字段未通过校验: {invalid}")
+            return None
+        if 'reason' not in fields:
+            partial = self.partial_reason()
+            if partial:
+                fields['reason'] = partial + '…'
+        return _normalize(fields)
+
+
+def _unescape(value: str) -> str:
+    try:
+        return json.loads(f'"{value}"')
+    except (json.JSONDecodeError, ValueError):
+        return value
+
+
+async def read_signal_stream(response: aiohttp.ClientResponse, reason_grace: float = 2.0) -> Dict[str, Any]:
+    """读取SSE流直到决策字段完整，之后最多再等待 reason_grace 秒补全理由
+
+    Returns:
+        {'fields': 解析出的字段（未通过校验时为None）, 'content': 已接收的文本, 'usage': 用量统计, 'stats': 时间统计}
+        usage 在流的最后一个数据块中返回，理由补全后提前结束读取时为None
+    """
+    parser = IncrementalSignalParser()
+    start = time.perf_counter()
+    decided_at: Optional[float] = None
+    chunks = 0
+    usage: Optional[Dict[str, Any]] = None
+    finished = False
+    lines = response.content.__aiter__()
+
+    try:
+        while True:
+            if decided_at is not None:
+                remaining = reason_grace - (time.perf_counter() - decided_at)
+                if parser.has('reason') or remaining <= 0:
+                    break
+                try:
+                    raw = await asyncio.wait_for(lines.__anext__(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                raw = await lines.__anext__()
+
+            line = raw.decode('utf-8', errors='ignore').strip()
+            if not line.startswith('data:'):
+                continue
+            data = line[5:].strip()
+            if data == '[DONE]':
+                finished = True
+                break
+
+            try:
+                chunk = loads(data)
+            except json.JSONDecodeError:
+                continue
+            choices = chunk.get('choices') or []
+            # usage 在最后一个数据块中返回（Kimi放在choices[0]中）
+            chunk_usage = chunk.get('usage') or (choices[0].get('usage') if choices else None)
+            if chunk_usage:
+                usage = chunk_usage
+            delta = (choices[0].get('delta') or {}).get('content') if choices else None
+            if delta:
+                chunks += 1
+                parser.feed(delta)
+                if decided_at is None and parser.decided:
+                    decided_at = time.perf_counter()
+    except StopAsyncIteration:
+        finished = True
+
+    if not finished:
+        # 提前结束：关闭连接，停止服务端继续生成
+        response.close()
+
+    end = time.perf_counter()
+    return {
+        'fields': parser.result(),
+        'content': parser.text,
+        'usage': usage,
+        'stats': {
+            'time_to_signal': (decided_at - start) if decided_at is not None else None,
+            'time_total': end - start,
+            'chunks': chunks,
+            'reason_complete': parser.has('reason'),
+            'completed': finished
+        }
+    }
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AI决策阶段基准测试
+在本地模拟AI服务（benchmarks/mock_llm.py）上运行完整的AI阶段：
+AIClient.get_multi_ai_signals（提示词构建、限流、对冲、重试、超时、流式解析）+ fuse_signals，
+报告每次决策的 p50/p95/p99 延迟与吞吐量，以及注入的错误/429/超时的分布。不产生任何API费用。
+
+用法:
+    python benchmarks/bench_ai_pipeline.py --decisions 50 --latency-ms 800 --error-rate 0.05
+    python benchmarks/bench_ai_pipeline.py --stream --quorum 2 --timeout-rate 0.05 --hang-seconds 20
+    python benchmarks/bench_ai_pipeline.py --profile profiles.json --concurrency 4
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_llm import MockLLMServer, ProviderProfile, load_profiles
+
+PROVIDERS = ['deepseek', 'kimi', 'qwen', 'openai']
+
+
+def _market_data(decision: int) -> dict:
+    """构造与交易周期结构一致的市场数据（价格逐次变化，避免命中请求缓存）"""
+    price = 50000 + decision * 7.3
+    return {
+        'price': price,
+        'trend_strength': '震荡',
+        'volatility': 'normal',
+        'atr_pct': 1.2,
+        'price_change_pct': 0.35,
+        'position': {'size': 0.01, 'entry_price': 49800, 'unrealized_pnl': 2.1},
+        'technical_data': {'rsi': 42.5 + decision % 10, 'macd': 'bullish', 'ma_status': 'MA5>MA20'},
+        'trend_analysis': {'overall': 'up'},
+        'price_history': [price - 200 + i * 10 for i in range(100)],
+        'signal_history': [{'signal': 'HOLD', 'confidence': 0.7}]
+    }
+
+
+def _percentile(ordered: list, p: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, int(len(ordered) * p + 0.5) - 1))]
+
+
+def _configure_environment(server: MockLLMServer, args: argparse.Namespace) -> None:
+    """导入 ai 模块前设置环境变量：提供商指向模拟服务，其余开关按参数设置"""
+    os.environ['AI_MOCK_URL'] = server.url
+    for provider in PROVIDERS:
+        env_key = f"{provider.upper()}_API_KEY"
+        if provider in args.providers:
+            os.environ[env_key] = 'mock-key'
+        else:
+            os.environ.pop(env_key, None)
+    os.environ['AI_STREAMING'] = 'true' if args.stream else 'false'
+    os.environ['AI_QUORUM'] = str(args.quorum)
+    os.environ['AI_FANOUT_DEADLINE'] = str(args.deadline)
+    os.environ['AI_REQUEST_CACHE'] = 'true' if args.cache else 'false'
+    os.environ['AI_REQUEST_CACHE_PATH'] = ''
+    os.environ['AI_RATE_LIMIT'] = 'true' if args.rate_limit else 'false'
+    os.environ['AI_HEDGE_ENABLED'] = 'false' if args.no_hedge else 'true'
+    os.environ['AI_CIRCUIT_BREAKER'] = 'false' if args.no_breaker else 'true'
+    # 配置校验需要交易所凭据，基准测试不会访问交易所
+    for key in ('OKX_API_KEY', 'OKX_SECRET', 'OKX_PASSWORD'):
+        os.environ.setdefault(key, 'bench')
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from ai import ai_client
+
+    latencies = []
+    signal_counts = []
+    early_returns = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def decide(decision: int) -> None:
+        market_data = _market_data(decision)
+        async with semaphore:
+            start = time.perf_counter()
+            signals = await ai_client.get_multi_ai_signals(market_data, args.providers)
+            ai_client.fuse_signals(signals, market_data)
+            latencies.append(time.perf_counter() - start)
+        signal_counts.append(len(signals))
+        reason = ai_client.last_fanout.get('early_return') or 'all'
+        early_returns[reason] = early_returns.get(reason, 0) + 1
+
+    await ai_client.warmup_sessions()
+    # 预热：排除首次连接建立和对冲延迟样本不足的影响
+    for decision in range(args.warmup):
+        await ai_client.get_multi_ai_signals(_market_data(-1 - decision), args.providers)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(decide(decision) for decision in range(args.decisions)))
+    wall_time = time.perf_counter() - start
+
+    result = {
+        'latencies': latencies,
+        'wall_time': wall_time,
+        'signal_counts': signal_counts,
+        'early_returns': early_returns,
+        'hedge': ai_client.get_hedge_stats(),
+        'rate_limit': ai_client.get_rate_limit_stats(),
+        'connections': ai_client.get_connection_stats(),
+        'breakers': ai_client.get_circuit_breaker_stats(),
+        'retry_budget': ai_client.get_retry_budget_stats(),
+        'parser': ai_client.get_response_parser_stats()
+    }
+    await ai_client.cleanup()
+    return result
+
+
+def _report(args: argparse.Namespace, server: MockLLMServer, result: dict) -> None:
+    ordered = sorted(result['latencies'])
+    fallbacks = sum(1 for count in result['signal_counts'] if count == 0)
+    print(f"\n📊 AI决策阶段（{len(ordered)} 次决策，并发 {args.concurrency}）")
+    print(f"延迟  平均={statistics.mean(ordered) * 1000:8.1f}ms "
+          f"p50={_percentile(ordered, 0.50) * 1000:8.1f}ms "
+          f"p95={_percentile(ordered, 0.95) * 1000:8.1f}ms "
+          f"p99={_percentile(ordered, 0.99) * 1000:8.1f}ms "
+          f"最大={ordered[-1] * 1000:8.1f}ms")
+    print(f"吞吐  {len(ordered) / result['wall_time']:.2f} 次决策/秒（总耗时 {result['wall_time']:.2f}s）")
+    print(f"信号  平均每次 {statistics.mean(result['signal_counts']):.2f}/{len(args.providers)} 个，"
+          f"无信号回退 {fallbacks} 次，返回方式 {result['early_returns']}")
+
+    print("\n🧪 模拟服务请求结果")
+    for provider, outcomes in sorted(server.get_stats().items()):
+        total = sum(outcomes.values())
+        print(f"{provider:<9} 请求={total:<5} " + ' '.join(f"{k}={v}" for k, v in sorted(outcomes.items())))
+
+    hedge = result['hedge']
+    print(f"\n🪝 对冲: 发出={hedge['hedges_issued']} 胜出={hedge['hedges_won']} 预算拒绝={hedge['budget_denied']}")
+    for provider, stats in sorted(result['rate_limit'].items()):
+        if stats.get('throttled') or stats.get('rate_limit_hits'):
+            print(f"🚦 {provider:<9} 排队={stats['throttled']}次 平均排队={stats['avg_queue_delay_ms']:.0f}ms "
+                  f"429={stats['rate_limit_hits']}次")
+    budget = result['retry_budget']
+    print(f"🪫 重试预算: 首次请求={budget['requests']} 重试放行={budget['retries_granted']} "
+          f"拒绝={budget['retries_denied']} 重试比例={budget['retry_ratio']:.1%}")
+    parser = result['parser']
+    if parser['parsed'] or parser['failures']:
+        print(f"🧾 响应解析: 成功={parser['parsed']} 快速路径={parser['fast_path']} 失败={parser['failures']} "
+              f"平均={parser['avg_parse_us']:.1f}µs")
+    for provider, stats in sorted(result['breakers'].items()):
+        if stats['opened'] or stats['rejected']:
+            print(f"⚡ {provider:<9} 熔断器={stats['state']} 熔断={stats['opened']}次 跳过={stats['rejected']}次 "
+                  f"探测={stats['probes']}次")
+    for provider, stats in sorted(result['connections'].items()):
+        print(f"🔌 {provider:<9} 新建连接={stats['new_connections']} 复用={stats['reused_connections']} "
+              f"复用率={stats['reuse_rate']:.0%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='AI决策阶段延迟与吞吐基准（本地模拟AI服务）')
+    parser.add_argument('--decisions', type=int, default=50, help='计时的决策次数')
+    parser.add_argument('--warmup', type=int, default=3, help='不计时的预热决策次数')
+    parser.add_argument('--concurrency', type=int, default=1, help='同时进行的决策数')
+    parser.add_argument('--providers', default=','.join(PROVIDERS), help='参与的提供商，逗号分隔')
+    parser.add_argument('--profile', help='提供商配置JSON文件（覆盖下列延迟/错误参数）')
+    parser.add_argument('--latency-ms', type=float, default=800.0, help='首字节延迟中位数（毫秒）')
+    parser.add_argument('--jitter', type=float, default=0.3, help='延迟对数正态分布sigma')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='500错误注入概率')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='429注入概率')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='挂起（超时）注入概率')
+    parser.add_argument('--hang-seconds', type=float, default=30.0, help='挂起时长（秒）')
+    parser.add_argument('--stream', action='store_true', help='使用流式响应')
+    parser.add_argument('--quorum', type=int, default=0, help='法定人数，0为等待全部')
+    parser.add_argument('--deadline', type=float, default=40.0, help='每次决策的硬截止时间（秒）')
+    parser.add_argument('--cache', action='store_true', help='启用AI请求缓存')
+    parser.add_argument('--rate-limit', action='store_true', help='启用客户端限流（按真实提供商的速率限制）')
+    parser.add_argument('--no-hedge', action='store_true', help='关闭对冲请求')
+    parser.add_argument('--no-breaker', action='store_true', help='关闭提供商熔断')
+    parser.add_argument('--seed', type=int, default=42, help='模拟服务随机种子')
+    parser.add_argument('--verbose', action='store_true', help='输出AI模块日志')
+    args = parser.parse_args()
+    args.providers = [p.strip() for p in args.providers.split(',') if p.strip()]
+
+    default_profile = ProviderProfile(
+        latency_ms=args.latency_ms, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds
+    )
+    profiles = load_profiles(args.profile) if args.profile else None
+    server = MockLLMServer(profiles=profiles, default_profile=default_profile, seed=args.seed).start()
+    print(f"🧪 本地模拟AI服务: {server.url} 提供商={args.providers} "
+          f"延迟中位数={args.latency_ms:.0f}ms 流式={'是' if args.stream else '否'}")
+
+    _configure_environment(server, args)
+    if not args.verbose:
+        from utils.logging import trading_logger
+        trading_logger.logger.setLevel(logging.CRITICAL)
+        logging.getLogger('ai').setLevel(logging.CRITICAL)
+
+    try:
+        result = asyncio.run(run(args))
+        _report(args, server, result)
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+交易所后端基准测试
+对比同步ccxt与ccxt.async_support后端在本地OKX桩服务上的交易周期耗时。
+
+一个模拟周期 = 获取市场数据(行情/持仓/余额/K线) 与 AI并发请求 同时进行，
+同步后端会阻塞事件循环，使交易所I/O与AI I/O串行化。
+
+用法:
+    python benchmarks/bench_exchange_backend.py --cycles 10 --latency 0.05 --ai-latency 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+
+from benchmarks.okx_stub import OKXStubServer
+
+
+async def _simulated_ai_fanout(session: aiohttp.ClientSession, url: str, providers: int) -> None:
+    """模拟多AI并发请求"""
+    async def one():
+        async with session.post(f"{url}/v1/chat/completions", json={'messages': []}) as resp:
+            await resp.read()
+    await asyncio.gather(*(one() for _ in range(providers)))
+
+
+async def run_backend(backend: str, stub: OKXStubServer, cycles: int, providers: int,
+                      ccxt_throttle: bool) -> list:
+    """运行指定后端的若干周期，返回每周期耗时（秒）"""
+    os.environ['TEST_MODE'] = 'false'  # 走真实请求路径（指向本地桩服务）
+
+    from trading.exchange import ExchangeManager
+    from trading.models import ExchangeConfig
+
+    manager = ExchangeManager(ExchangeConfig(
+        api_key='bench_key', secret='bench_secret', password='bench_password',
+        sandbox=False, symbol='BTC/USDT:USDT', backend=backend, rest_url=stub.url,
+        enable_rate_limit=ccxt_throttle
+    ))
+    if not await manager.initialize():
+        raise RuntimeError(f"{backend} 后端初始化失败")
+
+    durations = []
+    async with aiohttp.ClientSession() as ai_session:
+        # 预热一次，排除首个请求的连接建立开销
+        await asyncio.gather(manager.get_market_data(), _simulated_ai_fanout(ai_session, stub.url, providers))
+
+        for _ in range(cycles):
+            start = time.perf_counter()
+            market_data, _ = await asyncio.gather(
+                manager.get_market_data(),
+                _simulated_ai_fanout(ai_session, stub.url, providers)
+            )
+            durations.append(time.perf_counter() - start)
+            if 'error' in market_data:
+                raise RuntimeError(f"{backend} 后端获取市场数据失败: {market_data['error']}")
+
+    await manager.cleanup()
+    return durations
+
+
+def _report(backend: str, durations: list) -> None:
+    ordered = sorted(durations)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{backend:<6} 周期数={len(durations):<4} "
+          f"平均={statistics.mean(durations) * 1000:8.1f}ms "
+          f"p50={statistics.median(durations) * 1000:8.1f}ms "
+          f"p95={p95 * 1000:8.1f}ms "
+          f"最小={ordered[0] * 1000:8.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='交易所同步/异步后端周期耗时对比')
+    parser.add_argument('--cycles', type=int, default=10, help='每个后端运行的周期数')
+    parser.add_argument('--latency', type=float, default=0.05, help='桩服务交易所接口延迟（秒）')
+    parser.add_argument('--ai-latency', type=float, default=0.3, help='桩服务AI接口延迟（秒）')
+    parser.add_argument('--providers', type=int, default=2, help='每周期并发AI请求数')
+    parser.add_argument('--ccxt-throttle', action='store_true',
+                        help='启用ccxt内置节流（默认关闭，仅保留ExchangeManager自身限流，以便对比纯I/O差异）')
+    args = parser.parse_args()
+
+    stub = OKXStubServer(latency=args.latency, ai_latency=args.ai_latency).start()
+    print(f"🧪 本地OKX桩服务: {stub.url} (交易所延迟 {args.latency * 1000:.0f}ms, AI延迟 {args.ai_latency * 1000:.0f}ms)")
+
+    try:
+        results = {}
+        for backend in ('sync', 'async'):
+            results[backend] = asyncio.run(run_backend(
+                backend, stub, args.cycles, args.providers, args.ccxt_throttle))
+
+        print("\n📊 周期耗时对比")
+        for backend, durations in results.items():
+            _report(backend, durations)
+
+        speedup = statistics.mean(results['sync']) / statistics.mean(results['async'])
+        print(f"\n⚡ 异步后端平均提速: {speedup:.2f}x")
+        print(f"📈 桩服务请求计数: {dict(stub.request_counts)}")
+    finally:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
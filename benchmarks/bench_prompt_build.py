@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+提示词构建基准测试
+对比每个提供商单独渲染全部市场数据（不共享）与每周期渲染一次、各提供商共享的构建耗时，
+并报告各提供商提示词（系统提示 + 用户提示）的字节数、估算token数及跨周期不变的可缓存前缀占比。
+
+用法:
+    python benchmarks/bench_prompt_build.py --cycles 2000 --retries 1
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.prompts import PromptCompiler, prompt_size
+
+PROVIDERS = ['deepseek', 'kimi', 'qwen', 'openai']
+
+
+def _market_data(cycle: int) -> dict:
+    """构造与交易周期结构一致的市场数据"""
+    price = 50000 + (cycle % 50) * 10
+    return {
+        'price': price,
+        'trend_strength': '震荡',
+        'volatility': 'normal',
+        'atr_pct': 1.2,
+        'price_change_pct': 0.35,
+        'position': {'size': 0.01, 'entry_price': 49800, 'unrealized_pnl': 2.1},
+        'technical_data': {'rsi': 42.5, 'macd': 'bullish', 'ma_status': 'MA5>MA20'},
+        'trend_analysis': {'overall': 'up'},
+        'price_history': [price - 200 + i * 10 for i in range(100)],
+        'signal_history': [{'signal': 'HOLD', 'confidence': 0.7}]
+    }
+
+
+def run(shared: bool, cycles: int, retries: int) -> list:
+    """返回每周期为所有提供商构建提示词的耗时（微秒）"""
+    compiler = PromptCompiler()
+    durations = []
+    for cycle in range(cycles):
+        market_data = _market_data(cycle)
+        start = time.perf_counter()
+        if shared:
+            compiler.prepare(market_data)
+        for provider in PROVIDERS:
+            for _ in range(1 + retries):
+                if not shared:
+                    compiler.prepare(market_data)  # 不共享：每次请求都重新渲染
+                compiler.build(provider, market_data)
+        durations.append((time.perf_counter() - start) * 1e6)
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='提示词构建耗时与大小报告')
+    parser.add_argument('--cycles', type=int, default=2000, help='模拟周期数')
+    parser.add_argument('--retries', type=int, default=1, help='每个提供商每周期的重试/对冲次数')
+    args = parser.parse_args()
+
+    print(f"🧪 每周期 {len(PROVIDERS)} 个提供商 × {1 + args.retries} 次请求，共 {args.cycles} 个周期")
+    print("\n⏱️ 每周期提示词构建耗时")
+    results = {}
+    for label, shared in (('不共享', False), ('共享', True)):
+        durations = run(shared, args.cycles, args.retries)
+        results[label] = statistics.mean(durations)
+        ordered = sorted(durations)
+        print(f"{label:<4} 平均={results[label]:8.1f}µs "
+              f"p50={ordered[len(ordered) // 2]:8.1f}µs "
+              f"p99={ordered[int(len(ordered) * 0.99) - 1]:8.1f}µs")
+    print(f"⚡ 共享渲染提速: {results['不共享'] / results['共享']:.2f}x")
+
+    print("\n📏 提示词大小（系统提示 + 用户提示，token为估算值）")
+    compiler = PromptCompiler()
+    market_data = _market_data(0)
+    for provider in PROVIDERS:
+        system_size = prompt_size(compiler.system_prompt(provider))
+        user_size = prompt_size(compiler.build(provider, market_data))
+        prefix_size = prompt_size(compiler.system_prompt(provider) + compiler.stable_prefix(provider))
+        total_tokens = system_size['tokens'] + user_size['tokens']
+        print(f"{provider:<9} 系统={system_size['bytes']:5d}B/{system_size['tokens']:4d}tok "
+              f"用户={user_size['bytes']:5d}B/{user_size['tokens']:4d}tok "
+              f"合计={system_size['bytes'] + user_size['bytes']:5d}B/{total_tokens:4d}tok "
+              f"可缓存前缀={prefix_size['tokens']:4d}tok ({prefix_size['tokens'] / total_tokens:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AI响应解析基准测试
+在提供商回复语料上对比旧解析方式（按 ```json 切分 + json.loads）与共用解析器（ai/response_parser.py，
+分别使用标准库 json 和 orjson）的解析成功率与每条耗时，并列出两者结果不同的样本。
+
+语料为JSONL，每行可以是 {"provider": ..., "kind": ..., "content": 回复文本}，
+也可以是录制的完整 chat/completions 响应体（含 choices）。默认使用 benchmarks/ai_response_corpus.jsonl
+（按各提供商常见输出形式整理：纯JSON、代码块、夹杂说明文字、思考过程、截断、拒答等）。
+
+用法:
+    python benchmarks/bench_response_parser.py --rounds 2000
+    python benchmarks/bench_response_parser.py --corpus recorded_responses.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_response_corpus.jsonl')
+
+
+def load_corpus(path: str) -> list:
+    """加载语料，返回 [(提供商, 类别, 回复文本)]"""
+    samples = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'choices' in record:
+                content = ((record['choices'] or [{}])[0].get('message') or {}).get('content') or ''
+                samples.append((record.get('provider', record.get('model', 'unknown')), 'recorded', content))
+            else:
+                samples.append((record.get('provider', 'unknown'), record.get('kind', ''), record['content']))
+    return samples
+
+
+def legacy_parse(content: str):
+    """旧解析方式（各提供商实现中重复的代码）"""
+    content = content.strip()
+    if '```json' in content:
+        content = content.split('```json')[1].split('```')[0]
+    elif '```' in content:
+        content = content.split('```')[1]
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def run(parse, samples: list, rounds: int) -> tuple:
+    """返回 (每条样本的解析结果, 每轮平均每条耗时µs列表)"""
+    results = [parse(content) for _, _, content in samples]
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _, _, content in samples:
+            parse(content)
+        durations.append((time.perf_counter() - start) / len(samples) * 1e6)
+    return results, durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='AI响应解析成功率与耗时对比')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='回复语料JSONL文件')
+    parser.add_argument('--rounds', type=int, default=2000, help='计时轮数（每轮解析全部语料）')
+    args = parser.parse_args()
+
+    # 配置校验需要交易所凭据，基准测试不会访问交易所
+    for key in ('OKX_API_KEY', 'OKX_SECRET', 'OKX_PASSWORD'):
+        os.environ.setdefault(key, 'bench')
+    from utils.logging import trading_logger
+    trading_logger.logger.setLevel(logging.CRITICAL)
+    logging.getLogger('ai').setLevel(logging.CRITICAL)
+    import ai.response_parser as response_parser_module
+    from ai.response_parser import AIResponseParser
+
+    samples = load_corpus(args.corpus)
+    print(f"🧪 语料 {len(samples)} 条（{args.corpus}），{args.rounds} 轮")
+
+    orjson_module = response_parser_module.orjson
+    parsers = [('旧解析', legacy_parse)]
+
+    def shared_parser(use_orjson: bool):
+        instance = AIResponseParser()
+
+        def parse(content: str):
+            response_parser_module.orjson = orjson_module if use_orjson else None
+            return instance.parse_content('bench', content)
+        return parse
+
+    parsers.append(('共用解析(json)', shared_parser(False)))
+    if orjson_module is not None:
+        parsers.append(('共用解析(orjson)', shared_parser(True)))
+    else:
+        print("⚠️ orjson 未安装，跳过 orjson 对比")
+
+    print("\n⏱️ 每条回复解析耗时")
+    outcomes = {}
+    for label, parse in parsers:
+        results, durations = run(parse, samples, args.rounds)
+        outcomes[label] = results
+        ordered = sorted(durations)
+        succeeded = sum(1 for result in results if result is not None)
+        print(f"{label:<14} 成功={succeeded:3d}/{len(samples)} 平均={statistics.mean(durations):7.2f}µs "
+              f"p50={ordered[len(ordered) // 2]:7.2f}µs p99={ordered[int(len(ordered) * 0.99) - 1]:7.2f}µs")
+    response_parser_module.orjson = orjson_module
+
+    print("\n🔍 结果不同的样本（旧解析 → 共用解析）")
+    shared_label = parsers[-1][0]
+    for (provider, kind, content), old, new in zip(samples, outcomes['旧解析'], outcomes[shared_label]):
+        old_signal = str(old.get('signal', 'HOLD')).upper() if old else None
+        new_signal = new.get('signal') if new else None
+        if old_signal != new_signal:
+            print(f"{provider:<9} {kind:<15} {str(old_signal):<5} → {str(new_signal):<5} {content[:60]!r}")
+
+
+if __name__ == '__main__':
+    main()
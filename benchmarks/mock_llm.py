@@ -0,0 +1,272 @@
+"""
+本地OpenAI兼容模拟AI服务
+按提供商路径（/{provider}/v1/chat/completions）模拟各AI提供商：可配置的延迟分布（对数正态）、
+错误/429/超时注入、SSE流式响应，以及固定轮换或脚本生成的JSON信号。
+在独立线程的事件循环中运行，服务端调度不占用被测客户端的事件循环，
+用于离线基准测试和联调 AIClient 的多AI并发、重试、超时与融合流程（AI_MOCK_URL 指向本服务即可）
+
+用法:
+    python benchmarks/mock_llm.py --port 18080 --profile profiles.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, fields
+from typing import Dict, Any, List, Optional, Callable
+
+from aiohttp import web
+
+# 默认轮换的信号
+DEFAULT_SIGNALS = [
+    {'signal': 'BUY', 'confidence': 'HIGH', 'reason': '均线多头排列，RSI未超买，趋势延续概率较高'},
+    {'signal': 'HOLD', 'confidence': 'MEDIUM', 'reason': '价格处于区间中部，等待突破确认'},
+    {'signal': 'SELL', 'confidence': 'MEDIUM', 'reason': 'MACD死叉且价格接近上轨，短线回调风险上升'},
+]
+
+
+@dataclass
+class ProviderProfile:
+    """单个模拟提供商的行为配置"""
+    latency_ms: float = 800.0  # 首字节延迟中位数（毫秒）
+    jitter: float = 0.3  # 对数正态分布的sigma，0为固定延迟
+    error_rate: float = 0.0  # 返回500的概率
+    rate_limit_rate: float = 0.0  # 返回429的概率
+    retry_after: float = 1.0  # 429响应的Retry-After（秒）
+    timeout_rate: float = 0.0  # 挂起不响应的概率（模拟超时）
+    hang_seconds: float = 60.0  # 挂起时长（秒）
+    chunk_ms: float = 20.0  # 流式响应每个数据块的间隔（毫秒）
+    chunk_chars: int = 12  # 流式响应每个数据块的字符数
+    signals: List[Dict[str, Any]] = field(default_factory=lambda: list(DEFAULT_SIGNALS))  # 轮换返回的信号
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ProviderProfile':
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+# 脚本函数：(提供商, 该提供商的请求序号, 请求体) -> 信号字典
+SignalScript = Callable[[str, int, Dict[str, Any]], Dict[str, Any]]
+
+
+class MockLLMServer:
+    """本地OpenAI兼容模拟AI服务"""
+
+    def __init__(self, profiles: Optional[Dict[str, ProviderProfile]] = None,
+                 default_profile: Optional[ProviderProfile] = None,
+                 script: Optional[SignalScript] = None,
+                 host: str = '127.0.0.1', port: int = 0, seed: int = 42):
+        self.profiles = profiles or {}
+        self.default_profile = default_profile or ProviderProfile()
+        self.script = script  # 设置后由脚本生成信号，优先于配置中的固定信号
+        self.host = host
+        self.port = port
+        self.random = random.Random(seed)
+
+        self.request_counts: Dict[str, int] = defaultdict(int)
+        self.outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def provider_url(self, provider: str) -> str:
+        """提供商的chat/completions地址"""
+        return f"{self.url}/{provider}/v1/chat/completions"
+
+    def profile(self, provider: str) -> ProviderProfile:
+        return self.profiles.get(provider, self.default_profile)
+
+    def start(self) -> 'MockLLMServer':
+        """在后台线程启动服务"""
+        self._thread = threading.Thread(target=self._run, name='mock-llm', daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=10)
+        return self
+
+    def stop(self) -> None:
+        """停止服务"""
+        if self._loop and self._runner:
+            future = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            try:
+                future.result(timeout=10)
+            except Exception:
+                pass
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {provider: dict(outcomes) for provider, outcomes in self.outcomes.items()}
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._start_site())
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _start_site(self) -> None:
+        app = web.Application()
+        app.router.add_post('/{provider}/v1/chat/completions', self._handle_chat)
+        app.router.add_post('/v1/chat/completions', self._handle_chat)
+        app.router.add_route('*', '/{tail:.*}', self._handle_other)  # 连接预热的HEAD请求等
+        self._runner = web.AppRunner(app, shutdown_timeout=0.1)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # 端口为0时取系统分配的实际端口
+        self.port = self._runner.addresses[0][1]
+
+    async def _shutdown(self) -> None:
+        """关闭站点，并取消、等待仍在处理中的请求（挂起/流式响应），避免停止事件循环时遗留未完成的任务"""
+        await self._runner.cleanup()
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _handle_other(self, request: web.Request) -> web.Response:
+        return web.Response(text='ok')
+
+    def _sample_latency(self, profile: ProviderProfile) -> float:
+        """按对数正态分布采样延迟（秒），中位数为 latency_ms"""
+        if profile.jitter <= 0:
+            return profile.latency_ms / 1000
+        return profile.latency_ms / 1000 * math.exp(self.random.gauss(0.0, profile.jitter))
+
+    def _pick_outcome(self, profile: ProviderProfile) -> str:
+        roll = self.random.random()
+        for outcome, rate in (('timeout', profile.timeout_rate), ('rate_limited', profile.rate_limit_rate),
+                              ('error', profile.error_rate)):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return 'ok'
+
+    def _signal_for(self, provider: str, profile: ProviderProfile, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request_no = self.request_counts[provider]
+        if self.script:
+            return self.script(provider, request_no, payload)
+        return profile.signals[(request_no - 1) % len(profile.signals)]
+
+    async def _handle_chat(self, request: web.Request) -> web.StreamResponse:
+        provider = request.match_info.get('provider', 'default')
+        profile = self.profile(provider)
+        self.request_counts[provider] += 1
+        payload = await request.json()
+
+        outcome = self._pick_outcome(profile)
+        self.outcomes[provider][outcome] += 1
+        if outcome == 'timeout':
+            await asyncio.sleep(profile.hang_seconds)
+            return web.json_response({'error': {'message': 'mock hang'}}, status=504)
+
+        await asyncio.sleep(self._sample_latency(profile))
+        if outcome == 'rate_limited':
+            return web.json_response({'error': {'message': 'Rate limit exceeded', 'type': 'rate_limit'}},
+                                     status=429, headers={'Retry-After': str(profile.retry_after)})
+        if outcome == 'error':
+            return web.json_response({'error': {'message': 'mock internal error'}}, status=500)
+
+        content = json.dumps(self._signal_for(provider, profile, payload), ensure_ascii=False)
+        usage = self._usage(payload, content)
+        model = payload.get('model', 'mock')
+        if payload.get('stream'):
+            return await self._stream(request, profile, model, content, usage)
+
+        return web.json_response({
+            'id': f"mock-{provider}-{self.request_counts[provider]}", 'object': 'chat.completion',
+            'created': int(time.time()), 'model': model,
+            'choices': [{
+                'index': 0, 'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': content}
+            }],
+            'usage': usage
+        })
+
+    async def _stream(self, request: web.Request, profile: ProviderProfile, model: str,
+                      content: str, usage: Dict[str, Any]) -> web.StreamResponse:
+        """SSE流式响应：按 chunk_chars 切分内容，最后发送usage数据块和[DONE]"""
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+
+        def event(data: Dict[str, Any]) -> bytes:
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+        try:
+            for i in range(0, len(content), profile.chunk_chars):
+                if i:
+                    await asyncio.sleep(profile.chunk_ms / 1000)
+                await response.write(event({
+                    'object': 'chat.completion.chunk', 'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': content[i:i + profile.chunk_chars]},
+                                 'finish_reason': None}]
+                }))
+            await response.write(event({'object': 'chat.completion.chunk', 'model': model,
+                                        'choices': [], 'usage': usage}))
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            pass  # 客户端拿到决策字段后提前断开
+        return response
+
+    @staticmethod
+    def _usage(payload: Dict[str, Any], content: str) -> Dict[str, Any]:
+        """按字符数粗略估算token用量"""
+        prompt_chars = sum(len(str(m.get('content', ''))) for m in payload.get('messages') or [])
+        prompt_tokens = max(1, prompt_chars // 2)
+        completion_tokens = max(1, len(content) // 2)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'prompt_tokens_details': {'cached_tokens': 0}
+        }
+
+
+def load_profiles(path: str) -> Dict[str, ProviderProfile]:
+    """从JSON文件加载提供商配置：{"deepseek": {"latency_ms": 600, "error_rate": 0.05}, ...}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {provider: ProviderProfile.from_dict(settings) for provider, settings in data.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='本地OpenAI兼容模拟AI服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--profile', help='提供商配置JSON文件')
+    parser.add_argument('--latency-ms', type=float, default=800.0, help='默认首字节延迟中位数（毫秒）')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        profiles=load_profiles(args.profile) if args.profile else None,
+        default_profile=ProviderProfile(latency_ms=args.latency_ms),
+        host=args.host, port=args.port, seed=args.seed
+    ).start()
+    print(f"🧪 模拟AI服务: {server.url}/{{provider}}/v1/chat/completions（设置 AI_MOCK_URL={server.url}）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📈 请求结果统计: {server.get_stats()}")
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
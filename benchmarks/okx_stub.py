@@ -0,0 +1,167 @@
+"""
+本地OKX REST桩服务
+在独立线程的事件循环中运行，模拟OKX v5 REST接口的网络延迟和响应格式，
+用于基准测试和离线联调（同步ccxt客户端会阻塞调用方事件循环，因此桩服务不能与其共用循环）
+"""
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+from aiohttp import web
+
+
+class OKXStubServer:
+    """本地OKX REST桩服务"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.05, ai_latency: float = 0.3,
+                 base_price: float = 100000.0):
+        self.host = host
+        self.port = port
+        self.latency = latency  # 交易所接口模拟往返延迟（秒）
+        self.ai_latency = ai_latency  # 模拟AI接口延迟（秒）
+        self.base_price = base_price
+        self.request_counts: Dict[str, int] = defaultdict(int)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> 'OKXStubServer':
+        """在后台线程启动桩服务"""
+        self._thread = threading.Thread(target=self._run, name='okx-stub', daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=10)
+        return self
+
+    def stop(self) -> None:
+        """停止桩服务"""
+        if self._loop and self._runner:
+            future = asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop)
+            future.result(timeout=10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._start_site())
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _start_site(self) -> None:
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # 端口为0时取系统分配的实际端口
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        path = request.path
+        self.request_counts[path] += 1
+
+        if path.startswith('/v1/chat/completions'):
+            await asyncio.sleep(self.ai_latency)
+            return web.json_response(self._chat_completion())
+
+        await asyncio.sleep(self.latency)
+        handler = {
+            '/api/v5/public/instruments': self._instruments,
+            '/api/v5/market/ticker': self._ticker,
+            '/api/v5/market/candles': self._candles,
+            '/api/v5/market/history-candles': self._candles,
+            '/api/v5/account/positions': self._positions,
+            '/api/v5/account/balance': self._balance,
+        }.get(path)
+
+        data = handler(request) if handler else []
+        return web.json_response({'code': '0', 'msg': '', 'data': data})
+
+    def _instruments(self, request: web.Request) -> List[Dict[str, Any]]:
+        if request.query.get('instType') != 'SWAP':
+            return []
+        return [{
+            'instType': 'SWAP', 'instId': 'BTC-USDT-SWAP', 'uly': 'BTC-USDT',
+            'instFamily': 'BTC-USDT', 'baseCcy': '', 'quoteCcy': '', 'settleCcy': 'USDT',
+            'ctVal': '0.01', 'ctMult': '1', 'ctValCcy': 'BTC', 'ctType': 'linear',
+            'lotSz': '1', 'tickSz': '0.1', 'minSz': '1', 'lever': '100',
+            'state': 'live', 'listTime': '1611916800000', 'expTime': '',
+            'maxLmtSz': '100000000', 'maxMktSz': '10000'
+        }]
+
+    def _ticker(self, request: web.Request) -> List[Dict[str, Any]]:
+        ts = int(time.time() * 1000)
+        price = self.base_price
+        return [{
+            'instType': 'SWAP', 'instId': request.query.get('instId', 'BTC-USDT-SWAP'),
+            'last': str(price), 'lastSz': '1',
+            'askPx': str(price + 0.1), 'askSz': '10', 'bidPx': str(price - 0.1), 'bidSz': '10',
+            'open24h': str(price * 0.99), 'high24h': str(price * 1.01), 'low24h': str(price * 0.98),
+            'volCcy24h': '12000', 'vol24h': '1200000',
+            'sodUtc0': str(price), 'sodUtc8': str(price), 'ts': str(ts)
+        }]
+
+    def _candles(self, request: web.Request) -> List[List[str]]:
+        """按 bar/before/after/limit 生成确定性的K线（OKX语义：after取更早、before取更新，最新在前）"""
+        limit = int(request.query.get('limit', 100))
+        bar_ms = self._bar_ms(request.query.get('bar', '15m'))
+        now_open = int(time.time() * 1000) // bar_ms * bar_ms
+
+        newest = now_open
+        if 'after' in request.query:
+            newest = min(newest, (int(request.query['after']) - 1) // bar_ms * bar_ms)
+        oldest = int(request.query['before']) + 1 if 'before' in request.query else None
+
+        candles = []
+        ts = newest
+        while len(candles) < limit and (oldest is None or ts >= oldest):
+            price = self.base_price + (ts // bar_ms % 7) * 10
+            candles.append([
+                str(ts), str(price), str(price + 50), str(price - 50),
+                str(price + 5), '1000', '10', '1000000', '0' if ts == now_open else '1'
+            ])
+            ts -= bar_ms
+        return candles
+
+    @staticmethod
+    def _bar_ms(bar: str) -> int:
+        unit_ms = {'m': 60 * 1000, 'H': 60 * 60 * 1000, 'D': 24 * 60 * 60 * 1000}
+        bar = bar.replace('utc', '')
+        return int(bar[:-1]) * unit_ms.get(bar[-1], 60 * 1000)
+
+    def _positions(self, request: web.Request) -> List[Dict[str, Any]]:
+        return []
+
+    def _balance(self, request: web.Request) -> List[Dict[str, Any]]:
+        ts = str(int(time.time() * 1000))
+        return [{
+            'totalEq': '10000', 'uTime': ts,
+            'details': [{
+                'ccy': 'USDT', 'eq': '10000', 'cashBal': '10000', 'availBal': '10000',
+                'availEq': '10000', 'frozenBal': '0', 'ordFrozen': '0', 'uTime': ts
+            }]
+        }]
+
+    def _chat_completion(self) -> Dict[str, Any]:
+        return {
+            'id': 'stub', 'object': 'chat.completion', 'created': int(time.time()),
+            'choices': [{
+                'index': 0, 'finish_reason': 'stop',
+                'message': {
+                    'role': 'assistant',
+                    'content': '{"signal": "HOLD", "confidence": "MEDIUM", "reason": "stub"}'
+                }
+            }]
+        }
@@ -0,0 +1,139 @@
+"""
+本地OKX WebSocket回放服务
+接受订阅后按顺序回放录制的推送消息（OKXPublicFeed 的 record_path 录制格式：每行一条原始JSON），
+用于离线验证行情订阅、断线重连和重新订阅逻辑；
+同时接受私有频道登录（不校验签名），可通过 push() 实时注入订单/持仓推送
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web, WSMsgType
+
+
+def synthetic_messages(inst_id: str = 'BTC-USDT-SWAP', timeframe_channel: str = 'candle5m',
+                       bar_ms: int = 5 * 60 * 1000, count: int = 100,
+                       base_price: float = 100000.0) -> List[str]:
+    """生成合成推送：每根K线一条candle推送和一条tickers推送，最后一根为当前K线"""
+    now_open = int(time.time() * 1000) // bar_ms * bar_ms
+    messages = []
+    for i in range(count):
+        ts = now_open - (count - 1 - i) * bar_ms
+        price = base_price + (i % 11) * 15
+        messages.append(json.dumps({
+            'arg': {'channel': timeframe_channel, 'instId': inst_id},
+            'data': [[str(ts), str(price), str(price + 40), str(price - 40), str(price + 10),
+                      '100', '1', '100000', '0' if i == count - 1 else '1']]
+        }))
+        messages.append(json.dumps({
+            'arg': {'channel': 'tickers', 'instId': inst_id},
+            'data': [{'instId': inst_id, 'last': str(price + 10), 'bidPx': str(price + 9.9),
+                      'askPx': str(price + 10.1), 'high24h': str(price + 500), 'low24h': str(price - 500),
+                      'vol24h': '100000', 'ts': str(ts + bar_ms // 2)}]
+        }))
+    return messages
+
+
+class OKXWSReplayServer:
+    """本地WebSocket回放服务（与调用方共用事件循环）"""
+
+    def __init__(self, messages: Optional[List[str]] = None, path: Optional[str] = None,
+                 host: str = '127.0.0.1', port: int = 0, interval: float = 0.0,
+                 drop_after: Optional[int] = None):
+        if path:
+            with open(path, 'r', encoding='utf-8') as f:
+                messages = [line.strip() for line in f if line.strip()]
+        self.messages = messages or []
+        self.host = host
+        self.port = port
+        self.interval = interval  # 每条消息间隔（秒）
+        self.drop_after = drop_after  # 首个连接发送N条后主动断开，用于测试重连
+
+        self.connections = 0
+        self.logins = 0
+        self.subscriptions: List[Dict[str, Any]] = []
+        self.sent = 0
+        self._clients: Dict[web.WebSocketResponse, set] = {}  # 已订阅连接 -> 频道
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/ws/v5/public"
+
+    async def start(self) -> 'OKXWSReplayServer':
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def push(self, message: Dict[str, Any]) -> int:
+        """向订阅了对应频道的连接实时推送一条消息，返回送达连接数"""
+        channel = message.get('arg', {}).get('channel')
+        raw = json.dumps(message)
+        delivered = 0
+        for ws, channels in list(self._clients.items()):
+            if channel in channels and not ws.closed:
+                await ws.send_str(raw)
+                delivered += 1
+        return delivered
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        connection_no = self.connections
+
+        channels = set()
+        replay_task: Optional[asyncio.Task] = None
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            if msg.data == 'ping':
+                await ws.send_str('pong')
+                continue
+
+            request_data = json.loads(msg.data)
+            if request_data.get('op') == 'login':
+                self.logins += 1
+                await ws.send_json({'event': 'login', 'code': '0', 'msg': '', 'connId': str(connection_no)})
+            elif request_data.get('op') == 'subscribe':
+                for arg in request_data.get('args', []):
+                    self.subscriptions.append(arg)
+                    channels.add(arg.get('channel'))
+                    await ws.send_json({'event': 'subscribe', 'arg': arg})
+                self._clients[ws] = channels
+                if replay_task is None:
+                    # 重连后从头回放，由客户端的时间戳/连续性校验去重
+                    drop_after = self.drop_after if connection_no == 1 else None
+                    replay_task = asyncio.create_task(self._replay(ws, channels, drop_after))
+
+        self._clients.pop(ws, None)
+        if replay_task:
+            replay_task.cancel()
+        return ws
+
+    async def _replay(self, ws: web.WebSocketResponse, channels: set, drop_after: Optional[int]) -> None:
+        sent = 0
+        for raw in self.messages:
+            channel = json.loads(raw).get('arg', {}).get('channel')
+            if channel not in channels:
+                continue
+            if drop_after is not None and sent >= drop_after:
+                await ws.close()
+                return
+            await ws.send_str(raw)
+            sent += 1
+            self.sent += 1
+            if self.interval:
+                await asyncio.sleep(self.interval)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+模拟交易所回测/基准驱动
+在确定性模拟交易所上按交易周期运行 ExchangeManager + OrderManager 的真实代码路径：
+每周期推进一根K线、获取市场快照、按均线交叉下市价单，输出账户结果和每周期耗时。
+同一种子（或同一回放文件）两次运行的结果应完全一致。
+
+用法:
+    python benchmarks/sim_backtest.py --cycles 500
+    python benchmarks/sim_backtest.py --replay data_json/candles/BTC-USDT_USDT_5m.csv --check
+    python benchmarks/sim_backtest.py --latency-ms 20 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading.exchange import ExchangeManager
+from trading.models import ExchangeConfig
+from trading.order_manager import OrderManager, OrderConfig
+from trading.simulated_exchange import SimulatedClock
+
+# 合成行情回测的固定起点，保证与运行时刻无关
+SYNTHETIC_START_MS = 1704067200000  # 2024-01-01 00:00 UTC
+
+
+async def run_backtest(args) -> dict:
+    """运行一次回测，返回账户状态和耗时统计"""
+    os.environ['TEST_MODE'] = 'true'
+    manager = ExchangeManager(ExchangeConfig(
+        symbol='BTC/USDT:USDT', timeframe=args.timeframe, leverage=10,
+        sim_seed=args.seed, sim_replay_path=args.replay,
+        sim_latency_ms=args.latency_ms, sim_error_rate=args.error_rate,
+        enable_rate_limit=args.rate_limit
+    ))
+    if not await manager.initialize():
+        raise RuntimeError("模拟交易所初始化失败")
+    if not args.replay:
+        manager.exchange.set_clock(SimulatedClock(SYNTHETIC_START_MS))
+
+    order_config = OrderConfig()
+    order_config.max_order_size = 1.0
+    orders = OrderManager(manager, order_config)
+    await orders.initialize()
+
+    durations = []
+    errors = 0
+    for cycle in range(1, args.cycles + 1):
+        # 回放模式由 begin_cycle 推进时钟，合成行情在这里推进
+        if not args.replay:
+            manager.exchange.advance()
+        manager.begin_cycle(cycle)
+        start = time.perf_counter()
+        try:
+            snapshot = await manager.get_market_snapshot(ohlcv_limit=args.slow)
+        except Exception:
+            errors += 1
+            continue
+        closes = [c['close'] for c in snapshot.ohlcv]
+        position = sum(p.size if p.side == 'long' else -p.size for p in snapshot.positions)
+
+        if len(closes) >= args.slow:
+            fast = sum(closes[-args.fast:]) / args.fast
+            slow = sum(closes) / len(closes)
+            target = args.size if fast > slow else -args.size
+            delta = round(target - position, 3)
+            if abs(delta) >= 0.001:
+                await orders.place_market_order('BUY' if delta > 0 else 'SELL', abs(delta))
+        durations.append((time.perf_counter() - start) * 1000)
+
+    state = manager.exchange.get_state()
+    balance = await manager.fetch_balance()
+    await manager.cleanup()
+    return {
+        'final_equity': round(balance.total, 6),
+        'position': state['position'],
+        'trades': state['trades'],
+        'errors': errors,
+        'calls': state['calls'],
+        'cycle_ms': {
+            'p50': statistics.median(durations) if durations else 0,
+            'p95': sorted(durations)[int(len(durations) * 0.95) - 1] if durations else 0,
+            'max': max(durations) if durations else 0
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模拟交易所回测/基准')
+    parser.add_argument('--cycles', type=int, default=300, help='交易周期数')
+    parser.add_argument('--timeframe', default='15m', help='K线周期')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--replay', default=None, help='回放的K线文件（CSV/JSON）')
+    parser.add_argument('--fast', type=int, default=5, help='快均线周期')
+    parser.add_argument('--slow', type=int, default=20, help='慢均线周期')
+    parser.add_argument('--size', type=float, default=0.01, help='目标持仓（BTC）')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='模拟调用延迟（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='网络错误注入概率')
+    parser.add_argument('--rate-limit', action='store_true', help='启用OKX接口限流（按实盘速率运行）')
+    parser.add_argument('--check', action='store_true', help='运行两次并校验结果一致')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_backtest(args))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.check:
+        again = asyncio.run(run_backtest(args))
+        keys = ('final_equity', 'position', 'trades', 'errors', 'calls')
+        same = all(result[k] == again[k] for k in keys)
+        print(f"可复现: {'是' if same else '否'}")
+        sys.exit(0 if same else 1)
+
+
+if __name__ == '__main__':
+    main()
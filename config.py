@@ -83,7 +83,23 @@ class ConfigManager:
             'sandbox': os.getenv('OKX_SANDBOX', 'false').lower() == 'true',  # 沙盒模式 - true为测试环境，false为真实交易
             'symbol': 'BTC/USDT:USDT',  # 交易对 - BTC永续合约
             'timeframe': '5m',  # K线周期 - 5分钟K线（可改为1m,15m,1h等）
-            'contract_size': 0.01  # 合约乘数 - 每份合约代表0.01个BTC
+            'contract_size': 0.01,  # 合约乘数 - 每份合约代表0.01个BTC
+            'backend': os.getenv('EXCHANGE_BACKEND', 'sync').lower(),  # 客户端后端 - sync同步ccxt，async使用ccxt.async_support不阻塞事件循环
+            'rest_url': os.getenv('OKX_REST_URL') or None,  # 自定义REST地址 - 为空使用OKX官方地址，可指向本地桩服务或代理
+            'candle_store_dir': os.getenv('CANDLE_STORE_DIR', 'data_json/candles'),  # 本地K线存储目录 - 每周期只拉取增量K线，置空则关闭
+            'read_cache_ttl': float(os.getenv('EXCHANGE_READ_CACHE_TTL', '1.0')),  # 行情/持仓/余额读取复用时间（秒） - 同一周期内多处读取只请求一次，下单/成交后失效
+            'metadata_cache_path': os.getenv('MARKET_CACHE_PATH', 'data_json/cache/market_metadata.json'),  # 市场信息/杠杆缓存文件 - 重启时跳过全量合约下载，置空则关闭
+            'metadata_cache_ttl': float(os.getenv('MARKET_CACHE_TTL', '86400')),  # 市场信息缓存有效期（秒） - 过期后先用缓存启动再后台刷新
+            'ws_enabled': os.getenv('OKX_WS_ENABLED', 'false').lower() == 'true',  # WebSocket行情 - true时行情/K线由推送维护，读取不走网络
+            'ws_public_url': os.getenv('OKX_WS_PUBLIC_URL') or None,  # WebSocket公共频道地址 - 为空使用OKX官方地址
+            'ws_business_url': os.getenv('OKX_WS_BUSINESS_URL') or None,  # WebSocket K线频道地址 - 为空使用OKX官方地址
+            'ws_private_enabled': os.getenv('OKX_WS_PRIVATE_ENABLED', 'false').lower() == 'true',  # WebSocket私有频道 - true时订单成交/持仓/余额由推送维护，不再轮询
+            'ws_private_url': os.getenv('OKX_WS_PRIVATE_URL') or None,  # WebSocket私有频道地址 - 为空按沙盒模式选择OKX官方地址
+            'sim_seed': int(os.getenv('SIM_SEED', '42')),  # 模拟交易所随机种子 - TEST_MODE下行情可复现
+            'sim_replay_path': os.getenv('SIM_REPLAY_PATH') or None,  # 模拟交易所回放K线文件 - 为空使用合成行情，设置后每个周期推进一根K线
+            'sim_initial_balance': float(os.getenv('SIM_INITIAL_BALANCE', '10000')),  # 模拟账户初始USDT
+            'sim_latency_ms': float(os.getenv('SIM_LATENCY_MS', '0')),  # 模拟交易所调用延迟（毫秒）
+            'sim_error_rate': float(os.getenv('SIM_ERROR_RATE', '0'))  # 模拟交易所网络错误注入概率（0-1）
         }
     
     def _load_trading_config(self) -> Dict[str, Any]:
@@ -100,6 +116,8 @@ class ConfigManager:
             'min_trade_amount': float(os.getenv('MIN_TRADE_AMOUNT', '0.0005')),  # 降低最小交易量到0.0005，允许低信心信号交易
             'leverage': int(os.getenv('LEVERAGE', '10')),  # 杠杆倍数 - 10倍杠杆（谨慎调整）
             'cycle_minutes': int(os.getenv('CYCLE_MINUTES', '15')),  # 交易周期 - 每15分钟执行一次交易检查
+            'prewarm_enabled': os.getenv('PREWARM_ENABLED', 'true').lower() == 'true',  # 周期前预热 - 周期开始前解析测速并建立AI/交易所TLS连接
+            'prewarm_lead_seconds': float(os.getenv('PREWARM_LEAD_SECONDS', '5')),  # 预热提前量（秒） - 在下个周期开始前多少秒预热
             'margin_mode': 'cross',  # 保证金模式 - cross为全仓，isolated为逐仓
             'position_mode': 'one_way',  # 持仓模式 - one_way为单向持仓，hedge为双向持仓
             'allow_short_selling': os.getenv('ALLOW_SHORT_SELLING', 'false').lower() == 'true'  # 允许做空 - true可开空仓，false只能做多
@@ -425,6 +443,28 @@ class ConfigManager:
                 'models': valid_models,
                 'fallback_enabled': os.getenv('AI_FALLBACK_ENABLED', 'true').lower() == 'true',
                 'similarity_threshold': float(os.getenv('AI_SIMILARITY_THRESHOLD', '0.8')),
+                'session_keepalive': float(os.getenv('AI_SESSION_KEEPALIVE', '60')),  # AI连接空闲保留时间（秒） - 周期内重复请求复用TCP/TLS连接
+                'quorum': int(os.getenv('AI_QUORUM', '0')),  # 法定人数 - K个提供商返回或融合结果已确定即融合，0为等待全部
+                'fanout_deadline': float(os.getenv('AI_FANOUT_DEADLINE', '40')),  # 多AI请求每周期硬截止时间（秒） - 超时后用已返回的信号融合
+                'straggler_policy': os.getenv('AI_STRAGGLER_POLICY', 'cancel'),  # 未返回提供商处理 - cancel取消，background后台完成仅记统计
+                'hedge_enabled': os.getenv('AI_HEDGE_ENABLED', 'true').lower() == 'true',  # 对冲请求开关 - 超过延迟分位数未返回时再发一个相同请求
+                'hedge_percentile': float(os.getenv('AI_HEDGE_PERCENTILE', '0.95')),  # 对冲触发分位数 - 0.9/0.95，基于各提供商近期延迟
+                'hedge_budget': float(os.getenv('AI_HEDGE_BUDGET', '0.1')),  # 对冲预算 - 对冲请求最多占主请求的10%
+                'hedge_min_samples': int(os.getenv('AI_HEDGE_MIN_SAMPLES', '10')),  # 对冲最少样本 - 延迟样本不足时不对冲
+                'streaming': os.getenv('AI_STREAMING', 'false').lower() == 'true',  # 流式响应开关 - signal/confidence到达即决策，无需等待完整理由
+                'stream_reason_grace': float(os.getenv('AI_STREAM_REASON_GRACE', '2.0')),  # 理由补全时间（秒） - 决策后最多再等待多久接收reason
+                'request_cache_enabled': os.getenv('AI_REQUEST_CACHE', 'true').lower() == 'true',  # AI请求缓存开关 - 提示词与参数完全相同时复用上次信号
+                'request_cache_size': int(os.getenv('AI_REQUEST_CACHE_SIZE', '1000')),  # AI请求缓存容量 - 超出后淘汰最久未使用的条目
+                'request_cache_ttl': float(os.getenv('AI_REQUEST_CACHE_TTL', '300')),  # AI请求缓存有效期（秒） - 回测重放可调大
+                'request_cache_path': os.getenv('AI_REQUEST_CACHE_PATH', ''),  # AI请求缓存持久化文件（JSONL） - 重启/回测间复用，置空只缓存在内存
+                'rate_limit_enabled': os.getenv('AI_RATE_LIMIT', 'true').lower() == 'true',  # AI请求限流开关 - 按提供商限制每秒/分钟/小时请求数，遇429自动降速
+                'rate_limit_max_wait': float(os.getenv('AI_RATE_LIMIT_MAX_WAIT', '5.0')),  # 限流最长排队时间（秒） - 超过则放弃本次请求
+                'breaker_enabled': os.getenv('AI_CIRCUIT_BREAKER', 'true').lower() == 'true',  # 提供商熔断开关 - 持续失败的提供商在并发请求前直接跳过
+                'breaker_failure_rate': float(os.getenv('AI_BREAKER_FAILURE_RATE', '0.5')),  # 熔断失败率阈值 - 最近20次请求失败比例达到该值即熔断
+                'breaker_min_requests': int(os.getenv('AI_BREAKER_MIN_REQUESTS', '4')),  # 熔断最少样本 - 请求数不足时不熔断
+                'breaker_slow_seconds': float(os.getenv('AI_BREAKER_SLOW_SECONDS', '20')),  # 慢请求阈值（秒） - 80%请求超过该耗时也熔断，0为不按延迟熔断
+                'breaker_open_seconds': float(os.getenv('AI_BREAKER_OPEN_SECONDS', '120')),  # 熔断冷却时间（秒） - 之后后台探测，探测失败冷却时间加倍
+                'mock_url': os.getenv('AI_MOCK_URL', ''),  # 本地模拟AI服务地址 - 设置后所有提供商请求发往 {地址}/{提供商}/v1/chat/completions，置空使用真实API
                 'cache_levels': {
                     'memory': True,
                     'price_bucket': True,
@@ -445,6 +485,28 @@ class ConfigManager:
                 'models': {},
                 'fallback_enabled': True,
                 'similarity_threshold': 0.8,
+                'session_keepalive': 60.0,
+                'quorum': 0,
+                'fanout_deadline': 40.0,
+                'straggler_policy': 'cancel',
+                'hedge_enabled': True,
+                'hedge_percentile': 0.95,
+                'hedge_budget': 0.1,
+                'hedge_min_samples': 10,
+                'streaming': False,
+                'stream_reason_grace': 2.0,
+                'request_cache_enabled': True,
+                'request_cache_size': 1000,
+                'request_cache_ttl': 300.0,
+                'request_cache_path': '',
+                'rate_limit_enabled': True,
+                'rate_limit_max_wait': 5.0,
+                'breaker_enabled': True,
+                'breaker_failure_rate': 0.5,
+                'breaker_min_requests': 4,
+                'breaker_slow_seconds': 20.0,
+                'breaker_open_seconds': 120.0,
+                'mock_url': '',
                 'cache_levels': {
                     'memory': True,
                     'price_bucket': True,
@@ -463,9 +525,14 @@ class ConfigManager:
         return {
             'max_history_length': 100,  # 最大历史长度 - 保留最近100条历史记录
             'log_level': os.getenv('LOG_LEVEL', 'INFO'),  # 日志级别 - DEBUG/INFO/WARNING/ERROR
+            'use_uvloop': os.getenv('USE_UVLOOP', 'true').lower() == 'true',  # uvloop开关 - true且已安装uvloop时使用uvloop事件循环
             'monitoring_enabled': True,  # 监控开关 - true启用系统监控
             'memory_cleanup_interval': 3600,  # 内存清理间隔 - 每小时清理一次内存
             'heartbeat_interval': 60,  # 心跳间隔 - 每60秒发送一次心跳信号
+            'retry_budget_enabled': os.getenv('RETRY_BUDGET_ENABLED', 'true').lower() == 'true',  # 全局重试预算开关 - AI请求、交易所只读请求、重试处理器与错误恢复共用一个重试令牌桶
+            'retry_budget_ratio': float(os.getenv('RETRY_BUDGET_RATIO', '0.2')),  # 重试比例上限 - 重试流量最多为首次请求的20%
+            'retry_budget_min_per_minute': float(os.getenv('RETRY_BUDGET_MIN_PER_MINUTE', '0.2')),  # 保底重试速率 - 每分钟补充的重试次数，低流量（每周期仅数次请求）时仍允许少量重试
+            'retry_budget_burst': float(os.getenv('RETRY_BUDGET_BURST', '5')),  # 突发重试上限 - 令牌桶容量
             'web_interface': {
                 'enabled': os.getenv('WEB_ENABLED', 'false').lower() == 'true',  # Web界面开关 - true启用Streamlit监控界面
                 'port': int(os.getenv('WEB_PORT', '8501'))  # Web端口 - Streamlit监控界面端口8501
@@ -4,11 +4,11 @@ Alpha Pilot Bot OKX - 重构版主程序
 实现AI驱动的自动化交易策略执行
 """
 
+import math
 import time
 import threading
 import json
 import numpy as np
-import concurrent.futures
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
@@ -84,6 +84,8 @@ def save_trade_record(trade_record: Dict[str, Any]) -> None:
     except Exception as e:
         log_error(f"保存交易记录失败: {e}")
 from ai import ai_client as ai
+from ai import MarketStateIndex
+from ai.dns_manager import dns_manager, PreferredIPResolver, url_endpoint
 
 @dataclass
 class BotState:
@@ -100,6 +102,17 @@ class BotState:
         if self.signal_cache is None:
             self.signal_cache = {}
 
+def _get_event_loop_factory():
+    """选择事件循环实现：USE_UVLOOP=true 且已安装uvloop时使用uvloop，否则使用标准asyncio"""
+    if not config.get('system', 'use_uvloop', True):
+        return None
+    try:
+        import uvloop
+        log_info("⚡ 使用uvloop事件循环")
+        return uvloop.new_event_loop
+    except ImportError:
+        return None
+
 class AlphaArenaBot:
     """Alpha Pilot Bot OKX 交易机器人主类
     
@@ -109,29 +122,22 @@ class AlphaArenaBot:
     - 交易决策执行
     - 风险管理和系统维护
     """
-    
+
+    # 外层超时相对多AI截止时间的余量（秒） - 用于融合、缓存与回退
+    AI_DEADLINE_MARGIN = 5.0
+
     def __init__(self):
         """初始化交易机器人"""
         self.state = BotState()
         self.data_manager = DataManager()
         self.strategy_selector = None
+        self.signal_index = MarketStateIndex()  # 历史信号的市场状态近邻索引（AI异常时兜底）
 
         log_info("🚀 Alpha Pilot Bot OKX 交易机器人初始化中...")
         self._display_startup_info()
 
-        # 初始化策略选择器 - 显示INVESTMENT_TYPE配置
-        log_info("🎯 初始化策略选择器...")
+        # 策略选择器在事件循环启动后初始化（见 run_async）
         self.strategy_selector = StrategySelector()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            success = loop.run_until_complete(self.strategy_selector.initialize())
-            if success:
-                log_info("✅ 策略选择器初始化完成")
-            else:
-                log_warning("⚠️ 策略选择器初始化失败，使用默认策略")
-        finally:
-            loop.close()
 
         # 初始化数据管理
         self._initialize_data_management()
@@ -222,10 +228,10 @@ class AlphaArenaBot:
             import traceback
             log_error(f"数据管理初始化堆栈:\n{traceback.format_exc()}")
     
-    def get_ai_signal(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def get_ai_signal(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """获取AI交易信号（增强版）
         
-        使用多线程方式安全地执行异步AI信号获取，提供完整的错误处理和回退机制
+        在机器人的事件循环中直接获取，复用AI连接池和缓存，提供完整的错误处理和回退机制
         
         Args:
             market_data: 市场数据字典，包含价格、趋势、波动率等信息
@@ -233,36 +239,26 @@ class AlphaArenaBot:
         Returns:
             Dict[str, Any]: AI信号数据，包含signal、confidence、reason等字段
         """
+        # 外层超时由多AI截止时间推导，保证AI_FANOUT_DEADLINE先生效、已返回的信号不被丢弃
+        timeout = self._ai_fanout_deadline() + 2 * self.AI_DEADLINE_MARGIN
         try:
-            # 使用线程安全的方式运行异步函数
-            import threading
-            
-            # 尝试导入nest_asyncio，如果失败则使用替代方案
-            try:
-                import nest_asyncio
-                # 应用nest_asyncio以允许嵌套事件循环
-                try:
-                    nest_asyncio.apply()
-                except:
-                    pass  # 如果已应用则忽略
-            except ImportError:
-                log_warning("⚠️ nest_asyncio模块未安装，使用替代方案")
-                # 没有nest_asyncio也能运行，只是可能会有警告
-            
-            # 使用线程池执行异步函数
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(
-                    lambda: asyncio.run(self._get_ai_signal_async(market_data))
-                )
-                return future.result(timeout=30)
-                
+            return await asyncio.wait_for(self._get_ai_signal_async(market_data), timeout=timeout)
+
+        except asyncio.TimeoutError:
+            log_warning(f"⚠️ AI信号获取超过外层超时({timeout:.0f}秒 = AI_FANOUT_DEADLINE + {2 * self.AI_DEADLINE_MARGIN:.0f}秒)，使用应急回退信号")
+            return self._create_emergency_fallback_signal(market_data)
+
         except Exception as e:
             log_error(f"AI信号获取失败: {type(e).__name__}: {e}")
             import traceback
             log_error(f"AI信号获取堆栈:\n{traceback.format_exc()}")
-            # 注意：这里不能直接调用异步方法，需要改为同步版本
             return self._create_emergency_fallback_signal(market_data)
     
+    @staticmethod
+    def _ai_fanout_deadline() -> float:
+        """多AI请求每周期硬截止时间（AI_FANOUT_DEADLINE）"""
+        return float(config.get('ai', 'fanout_deadline', 40.0))
+
     async def _get_ai_signal_async(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """异步获取AI交易信号
         
@@ -287,6 +283,7 @@ class AlphaArenaBot:
             
             # 记录信号
             memory_manager.add_to_history('signals', signal_data)
+            self.signal_index.add(market_data, signal_data)
             system_monitor.increment_counter('api_calls')
             
             log_info("✅ 成功获取最新AI信号")
@@ -299,7 +296,7 @@ class AlphaArenaBot:
             
             # AI服务出现问题时，才使用缓存作为兜底
             log_warning("⚠️ AI服务异常，尝试使用缓存信号...")
-            cached_signal = await self._get_cached_signal(cache_key)
+            cached_signal = await self._get_cached_signal(cache_key, market_data)
             if cached_signal:
                 log_info("📊 使用缓存的AI信号作为兜底")
                 # 标记这是缓存信号，降低信心度
@@ -401,15 +398,15 @@ class AlphaArenaBot:
         # 包含价格、成交量、持仓状态的特征组合
         position_hash = f"{position.get('side', 'none')}_{position.get('size', 0):.4f}" if position else "none_0"
         
-        # 价格区间化（每0.1%为一个区间）
-        price_bucket = int(price * 1000) / 1000
+        # 价格区间化（每0.1%为一个区间，按对数刻度划分）
+        price_bucket = int(math.log(price) / math.log1p(0.001)) if price > 0 else 0
         
         # 成交量区间化
         volume_bucket = int(volume / 1000) * 1000 if volume > 0 else 0
         
         return f"signal_{price_bucket}_{volume_bucket}_{position_hash}"
     
-    async def _get_cached_signal(self, cache_key: str) -> Optional[Dict[str, Any]]:
+    async def _get_cached_signal(self, cache_key: str, market_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """获取多层缓存的信号"""
         # 第一层：内存缓存
         cached = cache_manager.get(cache_key)
@@ -417,7 +414,7 @@ class AlphaArenaBot:
             return cached
         
         # 第二层：历史信号缓存（基于相似市场状态）
-        similar_signal = await self._find_similar_market_state(cache_key)
+        similar_signal = await self._find_similar_market_state(market_data)
         if similar_signal:
             return similar_signal
         
@@ -469,34 +466,17 @@ class AlphaArenaBot:
             log_warning(f"缓存验证异常: {e}")
             return False
     
-    async def _find_similar_market_state(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """基于相似市场状态查找历史信号"""
-        # 获取历史信号
-        history = memory_manager.get_history('signals', limit=50)
-        
-        if not history:
-            return None
-        
-        # 查找最近的有效信号
-        for signal in reversed(history):
-            timestamp = signal.get('timestamp', '')
-            if not timestamp:
-                continue
-                
-            try:
-                signal_time = datetime.fromisoformat(timestamp)
-                age_seconds = (datetime.now() - signal_time).total_seconds()
-                
-                # 只考虑2小时内的信号
-                if age_seconds < 7200:
-                    # 检查信号质量
-                    if signal.get('confidence', 0) > 0.7:
-                        return signal
-            except ValueError:
-                # 跳过无效的时间戳格式
-                continue
-        
-        return None
+    async def _find_similar_market_state(self, market_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """基于相似市场状态查找历史信号
+
+        在信号索引中按特征向量（RSI、MACD、ATR%、趋势、价格位置、持仓方向）查找最近邻，
+        只复用2小时内、信心>0.7且相似度达到 AI_SIMILARITY_THRESHOLD 的信号
+        """
+        threshold = float(config.get('ai', 'similarity_threshold', 0.8))
+        similar = self.signal_index.nearest(market_data, threshold=threshold)
+        if similar:
+            log_info(f"🔍 找到相似市场状态的历史信号: {similar.get('signal')} (相似度: {similar['similarity']:.2f})")
+        return similar
     
     async def _cache_signal(self, cache_key: str, signal_data: Dict[str, Any]) -> None:
         """增强缓存信号"""
@@ -543,19 +523,18 @@ class AlphaArenaBot:
 
         log_info(f"使用AI提供商: {available_providers} (配置: {fusion_providers_str})")
 
-        # 获取信号，设置总超时（比原来更宽松，因为内部已经有超时控制）
+        # 获取信号：get_multi_ai_signals在AI_FANOUT_DEADLINE时返回已收到的信号，总超时仅作保险
         signals = []
+        timeout = self._ai_fanout_deadline() + self.AI_DEADLINE_MARGIN
         try:
             signals = await asyncio.wait_for(
                 ai.get_multi_ai_signals(market_data, available_providers),
-                timeout=45.0  # 从30秒增加到45秒，给更多时间获取信号
+                timeout=timeout
             )
             log_info(f"✅ 多AI信号获取完成，成功获取 {len(signals)} 个信号")
 
         except asyncio.TimeoutError:
-            log_warning(f"⚠️ 多AI信号获取总超时(45秒)，但可能已有部分成功信号")
-            # 重要：即使总超时，也要检查是否已经有部分成功的信号
-            # 因为get_multi_ai_signals内部是并行执行的，可能已经完成了部分
+            log_warning(f"⚠️ 多AI信号获取超过总超时({timeout:.0f}秒 = AI_FANOUT_DEADLINE + {self.AI_DEADLINE_MARGIN:.0f}秒)，已返回的信号被丢弃")
 
         except Exception as e:
             log_error(f"🚨 多AI信号获取异常: {e}")
@@ -567,11 +546,16 @@ class AlphaArenaBot:
 
             # 使用增强的信号融合算法
             signal_data = ai.fuse_signals(signals)
+            # 记录计入融合的提供商（法定人数模式下可能少于配置的提供商）
+            signal_data['counted_providers'] = [s.provider for s in signals]
+            signal_data['fanout'] = dict(ai.last_fanout)
 
             log_info("📊 【多AI融合信号分析】")
             log_info(f"   📈 最终信号: {signal_data['signal']}")
             log_info(f"   💡 融合信心: {signal_data['confidence']:.1f}")
             log_info(f"   📊 参与融合的信号数: {len(signals)} (总共: {len(available_providers)})")
+            if ai.last_fanout.get('stragglers'):
+                log_info(f"   ⚡ 未计入的提供商: {ai.last_fanout['stragglers']} ({ai.last_fanout.get('early_return')})")
 
             # 显示详细的融合分析信息
             fusion_analysis = signal_data.get('fusion_analysis', {})
@@ -1264,6 +1248,8 @@ class AlphaArenaBot:
         """
         try:
             self.state.current_cycle += 1
+            # 本周期内各阶段共享同一份K线快照
+            get_trading_engine().begin_cycle(self.state.current_cycle)
             log_info(f"{'='*60}")
             log_info(f"🔄 第 {self.state.current_cycle} 轮交易周期开始")
             log_info(f"⏰ 当前时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -1379,7 +1365,7 @@ class AlphaArenaBot:
             try:
                 # 准备增强的AI市场数据，包含完整的技术指标
                 enhanced_market_data = await self._prepare_ai_market_data(market_data, market_state)
-                signal_data = self.get_ai_signal(enhanced_market_data)
+                signal_data = await self.get_ai_signal(enhanced_market_data)
                 
                 # 增强的AI信号日志 - 包含详细的决策分析
                 signal = signal_data.get('signal', 'HOLD')
@@ -1572,6 +1558,12 @@ class AlphaArenaBot:
             except Exception as e:
                 log_error(f"系统维护失败: {e}")
             
+            fetch_stats = get_trading_engine().get_cycle_fetch_stats()
+            log_info(f"📦 本轮K线请求: {fetch_stats['fetches']} 次，快照命中: {fetch_stats['hits']} 次")
+            rate_limit_stats = fetch_stats.get('rate_limit', {})
+            if rate_limit_stats.get('throttled'):
+                log_info(f"⏳ 本轮限流等待: {rate_limit_stats['throttled']} 次，共 {rate_limit_stats['wait_ms']:.0f}ms")
+            
             log_info(f"{'='*60}")
             log_info(f"✅ 第 {self.state.current_cycle} 轮交易周期完成")
             log_info(f"{'='*60}")
@@ -2161,22 +2153,45 @@ class AlphaArenaBot:
     def run(self) -> None:
         """运行交易机器人
 
-        启动交易机器人的主循环，处理交易周期和异常恢复
+        在单个长期运行的事件循环中启动交易机器人（已安装uvloop时优先使用），
+        交易周期调度、AI并发请求、交易所I/O和后台任务共享同一个事件循环
         """
+        loop_factory = _get_event_loop_factory()
         try:
-            # 初始化交易引擎
+            with asyncio.Runner(loop_factory=loop_factory) as runner:
+                runner.run(self.run_async())
+        except KeyboardInterrupt:
+            log_info("🛑 收到停止信号，正在关闭...")
+            self.state.is_running = False
+        except Exception as e:
+            log_error(f"启动失败: {e}")
+            raise
+
+    async def run_async(self) -> None:
+        """交易机器人主循环（异步）
+
+        初始化策略选择器和交易引擎，然后按整点周期执行交易，处理异常恢复；
+        退出时关闭交易所连接和AI会话
+        """
+        try:
+            # 初始化策略选择器 - 显示INVESTMENT_TYPE配置
+            log_info("🎯 初始化策略选择器...")
+            if await self.strategy_selector.initialize():
+                log_info("✅ 策略选择器初始化完成")
+            else:
+                log_warning("⚠️ 策略选择器初始化失败，使用默认策略")
+
+            # 初始化交易引擎（异步后端连接池优先连接预热测速选出的IP）
             log_info("🔄 初始化交易引擎...")
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                success = loop.run_until_complete(get_trading_engine().initialize())
-                if not success:
-                    raise Exception("交易引擎初始化失败")
-            finally:
-                loop.close()
+            get_trading_engine().exchange_manager.set_resolver(PreferredIPResolver(dns_manager))
+            success = await get_trading_engine().initialize()
+            if not success:
+                raise Exception("交易引擎初始化失败")
             log_info("✅ 交易引擎初始化完成")
 
+            # 预热AI与交易所连接（后台进行，不阻塞首个交易周期）
+            self._warmup_task = asyncio.create_task(self._prewarm_connections())
+
             # 在启动时明确显示当前模式
             test_mode = config.get('trading', 'test_mode')
             if test_mode:
@@ -2191,13 +2206,7 @@ class AlphaArenaBot:
             
             while self.state.is_running:
                 try:
-                    # 使用 asyncio 运行异步的交易周期
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        loop.run_until_complete(self.execute_trading_cycle())
-                    finally:
-                        loop.close()
+                    await self.execute_trading_cycle()
                     
                     # 计算下一个整点执行时间
                     wait_seconds = self._calculate_next_cycle_time()
@@ -2208,19 +2217,65 @@ class AlphaArenaBot:
                     seconds = int(wait_seconds % 60)
                     log_info(f"⏰ 等待 {minutes}分{seconds}秒 到下一个15分钟整点执行...")
                     
-                    time.sleep(wait_seconds)
+                    # 等待期间WebSocket推送、后台刷新等任务继续运行
+                    await self._wait_with_prewarm(wait_seconds)
                     
-                except KeyboardInterrupt:
-                    log_info("🛑 收到停止信号，正在关闭...")
-                    self.state.is_running = False
-                    break
                 except Exception as e:
                     log_error(f"交易循环异常: {e}")
-                    time.sleep(60)  # 等待1分钟后重试
-                    
+                    await asyncio.sleep(60)  # 等待1分钟后重试
+
+        finally:
+            await self._shutdown()
+
+    async def _wait_with_prewarm(self, wait_seconds: float) -> None:
+        """等待到下个周期开始；开始前 prewarm_lead_seconds 秒执行连接预热，
+        周期的首批AI与交易所请求直接使用已完成DNS解析和TLS握手的连接
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait_seconds
+        lead = float(config.get('trading', 'prewarm_lead_seconds', 5))
+
+        if config.get('trading', 'prewarm_enabled', True) and lead > 0 and wait_seconds > lead:
+            await asyncio.sleep(wait_seconds - lead)
+            try:
+                # 预热超时不推迟周期开始
+                await asyncio.wait_for(self._prewarm_connections(), timeout=max(deadline - loop.time(), 0.1))
+            except asyncio.TimeoutError:
+                log_warning("⚠️ 连接预热未在周期开始前完成")
+            except Exception as e:
+                log_warning(f"⚠️ 连接预热失败: {e}")
+
+        await asyncio.sleep(max(deadline - loop.time(), 0))
+
+    async def _prewarm_connections(self) -> None:
+        """连接预热：并发解析AI提供商与交易所域名并测速选出最快的IP，
+        然后并发向每个已启用的AI提供商和交易所建立TCP/TLS连接放入连接池
+        """
+        start = time.perf_counter()
+        exchange_manager = get_trading_engine().exchange_manager
+        endpoints = ai.provider_endpoints()
+        exchange_endpoint = url_endpoint(exchange_manager.rest_url or '')
+        if exchange_endpoint:
+            endpoints.setdefault(*exchange_endpoint)
+
+        if endpoints:
+            await dns_manager.pre_resolve_all(list(endpoints), probe=True, ports=endpoints)
+
+        ai_warmed, exchange_warmed = await asyncio.gather(ai.warmup_sessions(), exchange_manager.warmup())
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        log_info(f"🔥 连接预热完成: AI {sum(ai_warmed.values())}/{len(ai_warmed)}，"
+                 f"交易所 {'✅' if exchange_warmed else '—'}，耗时 {elapsed_ms:.0f}ms")
+
+    async def _shutdown(self) -> None:
+        """关闭交易引擎（交易所连接、WebSocket订阅）和AI会话"""
+        try:
+            await get_trading_engine().cleanup()
         except Exception as e:
-            log_error(f"启动失败: {e}")
-            raise
+            log_error(f"交易引擎清理失败: {e}")
+        try:
+            await ai.cleanup()
+        except Exception as e:
+            log_error(f"AI会话关闭失败: {e}")
     
     def stop(self) -> None:
         """停止交易机器人
@@ -7,7 +7,7 @@ from .models import (
     OrderResult, PositionInfo, TradeResult, ExchangeConfig,
     OrderStatus, TradeSide, RiskAssessmentResult,
     MarketOrderRequest, LimitOrderRequest, TPSLRequest,
-    ExchangeProtocol, TickerData, PositionData, BalanceData
+    ExchangeProtocol, TickerData, PositionData, BalanceData, MarketSnapshot
 )
 from .engine import TradingEngine, TradingEngineConfig
 from .exchange import ExchangeManager
@@ -21,7 +21,7 @@ __all__ = [
     'OrderResult', 'PositionInfo', 'TradeResult', 'ExchangeConfig',
     'OrderStatus', 'TradeSide', 'RiskAssessmentResult',
     'MarketOrderRequest', 'LimitOrderRequest', 'TPSLRequest',
-    'ExchangeProtocol', 'TickerData', 'PositionData', 'BalanceData',
+    'ExchangeProtocol', 'TickerData', 'PositionData', 'BalanceData', 'MarketSnapshot',
 
     # 交易引擎
     'TradingEngine', 'TradingEngineConfig',
@@ -72,11 +72,28 @@ def initialize_trading_engine():
             password=config.get('exchange', 'password', ''),
             sandbox=config.get('exchange', 'sandbox', True),
             symbol=config.get('exchange', 'symbol', 'BTC/USDT:USDT'),
+            timeframe=config.get('exchange', 'timeframe', '15m'),
             leverage=config.get('trading', 'leverage', 10),
             margin_mode=config.get('trading', 'margin_mode', 'cross'),
             timeout=30,
             rate_limit=100,
-            enable_rate_limit=True
+            enable_rate_limit=True,
+            backend=config.get('exchange', 'backend', 'sync'),
+            rest_url=config.get('exchange', 'rest_url', None),
+            candle_store_dir=config.get('exchange', 'candle_store_dir', None) or None,
+            read_cache_ttl=config.get('exchange', 'read_cache_ttl', 1.0),
+            metadata_cache_path=config.get('exchange', 'metadata_cache_path', None) or None,
+            metadata_cache_ttl=config.get('exchange', 'metadata_cache_ttl', 86400.0),
+            ws_enabled=config.get('exchange', 'ws_enabled', False),
+            ws_public_url=config.get('exchange', 'ws_public_url', None),
+            ws_business_url=config.get('exchange', 'ws_business_url', None),
+            ws_private_enabled=config.get('exchange', 'ws_private_enabled', False),
+            ws_private_url=config.get('exchange', 'ws_private_url', None),
+            sim_seed=config.get('exchange', 'sim_seed', 42),
+            sim_replay_path=config.get('exchange', 'sim_replay_path', None),
+            sim_initial_balance=config.get('exchange', 'sim_initial_balance', 10000.0),
+            sim_latency_ms=config.get('exchange', 'sim_latency_ms', 0.0),
+            sim_error_rate=config.get('exchange', 'sim_error_rate', 0.0)
         )
 
         order_config = OrderConfig()
@@ -0,0 +1,314 @@
+"""
+本地K线存储模块
+按交易对/周期持久化已收盘K线（追加写入、按时间戳去重），
+每次只向交易所请求最新增量，并检测、回补缺口
+"""
+
+import bisect
+import csv
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, Set
+
+from .market_cache import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+# 拉取函数: (since毫秒时间戳或None, 数量) -> 按时间升序的K线列表
+CandleFetcher = Callable[[Optional[int], int], Awaitable[List[Dict[str, Any]]]]
+
+_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+class CandleSeries:
+    """单个交易对/周期的K线序列
+
+    内存中保存按时间升序的已收盘K线，当前未收盘K线单独保存且不落盘。
+    磁盘文件只追加写入，加载时按时间戳去重排序，因此回补的旧K线可以直接追加。
+    """
+
+    def __init__(self, symbol: str, timeframe: str, path: Optional[Path] = None,
+                 page_size: int = 100, max_memory_candles: int = 10000):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_to_ms(timeframe)
+        self.path = path
+        self.page_size = page_size
+        self.max_memory_candles = max_memory_candles
+
+        self._timestamps: List[int] = []
+        self._candles: List[Dict[str, Any]] = []
+        self._live: Optional[Dict[str, Any]] = None  # 当前未收盘K线
+        self._pending: List[Dict[str, Any]] = []  # 待落盘的已收盘K线
+        self._unfillable: Set[Tuple[int, int]] = set()  # 交易所无数据的缺口（停盘等）
+        self._disk_count = 0
+
+        self.stats = {
+            'fetch_calls': 0,
+            'candles_fetched': 0,
+            'gaps_filled': 0,
+            'disk_loads': 0
+        }
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._candles)
+
+    @property
+    def last_closed_ts(self) -> Optional[int]:
+        return self._timestamps[-1] if self._timestamps else None
+
+    def window(self, limit: int) -> List[Dict[str, Any]]:
+        """返回最近limit根K线（含当前未收盘K线），按时间升序"""
+        if limit > len(self._candles) + 1 and self._disk_count > len(self._candles):
+            # 内存只保留尾部，更长窗口从磁盘加载
+            self._load()
+
+        closed_needed = limit - 1 if self._live else limit
+        window = self._candles[-closed_needed:] if closed_needed > 0 else []
+        if self._live:
+            window = window + [self._live]
+        return window
+
+    def find_gaps(self, start_ts: Optional[int] = None) -> List[Tuple[int, int]]:
+        """查找缺口，返回 [(缺口起始ts, 缺口结束ts)]（均为缺失的K线时间戳，闭区间）"""
+        begin = 0
+        if start_ts is not None:
+            begin = bisect.bisect_left(self._timestamps, start_ts)
+
+        gaps = []
+        for i in range(begin + 1, len(self._timestamps)):
+            prev_ts, ts = self._timestamps[i - 1], self._timestamps[i]
+            if ts - prev_ts > self.tf_ms:
+                gap = (prev_ts + self.tf_ms, ts - self.tf_ms)
+                if gap not in self._unfillable:
+                    gaps.append(gap)
+        return gaps
+
+    # ------------------------------------------------------------------
+    # 同步
+    # ------------------------------------------------------------------
+
+    async def sync(self, fetcher: CandleFetcher, limit: int) -> List[Dict[str, Any]]:
+        """与交易所同步并返回最近limit根K线
+
+        1. 本地为空或落后超过一个窗口时按窗口整体拉取；
+        2. 否则只拉取最后一根已收盘K线之后的增量（跨越多页时分页）；
+        3. 本地历史不足limit时向前回补；
+        4. 回补窗口内的缺口。
+        """
+        now_open = self._current_open_ts()
+
+        if self._candles and (now_open - self.last_closed_ts) // self.tf_ms <= limit:
+            await self._fetch_forward(fetcher, self.last_closed_ts + self.tf_ms, now_open)
+        else:
+            # 本地为空或落后超过一个窗口（如长时间停机）：直接拉取最新窗口，中间部分按缺口处理
+            await self._fetch_and_merge(fetcher, None, limit, now_open)
+
+        # 历史不足时向前回补
+        closed_needed = limit - 1 if self._live else limit
+        if 0 < len(self._candles) < closed_needed:
+            await self._backfill_head(fetcher, closed_needed - len(self._candles), now_open)
+
+        # 回补请求窗口内的缺口
+        if self._candles and closed_needed > 0:
+            window_start = self._timestamps[-min(closed_needed, len(self._timestamps))]
+            for gap_start, gap_end in self.find_gaps(window_start):
+                await self._fill_gap(fetcher, gap_start, gap_end, now_open)
+
+        self._flush()
+        return self.window(limit)
+
+    async def _fetch_forward(self, fetcher: CandleFetcher, since: int, now_open: int) -> None:
+        """从since开始向后分页拉取直到当前K线"""
+        while since <= now_open:
+            missing = (now_open - since) // self.tf_ms + 1
+            count = min(missing, self.page_size)
+            await self._fetch_and_merge(fetcher, since, count, now_open)
+            since += count * self.tf_ms
+
+    async def _backfill_head(self, fetcher: CandleFetcher, count: int, now_open: int) -> None:
+        """向前回补count根更早的K线"""
+        first_ts = self._timestamps[0]
+        while count > 0:
+            page = min(count, self.page_size)
+            await self._fetch_and_merge(fetcher, first_ts - page * self.tf_ms, page, now_open)
+            new_first_ts = self._timestamps[0]
+            if new_first_ts >= first_ts:
+                break  # 交易所没有更早的数据
+            count -= (first_ts - new_first_ts) // self.tf_ms
+            first_ts = new_first_ts
+
+    async def _fill_gap(self, fetcher: CandleFetcher, gap_start: int, gap_end: int, now_open: int) -> None:
+        """回补单个缺口"""
+        missing = (gap_end - gap_start) // self.tf_ms + 1
+        logger.info(f"🩹 检测到K线缺口: {self.symbol} {self.timeframe} 缺失 {missing} 根，开始回补")
+
+        since = gap_start
+        filled = 0
+        while since <= gap_end:
+            count = min((gap_end - since) // self.tf_ms + 1, self.page_size)
+            filled += await self._fetch_and_merge(fetcher, since, count, now_open)
+            since += count * self.tf_ms
+
+        if filled == 0:
+            # 交易所同样没有数据（如停盘维护），记录下来避免每个周期重复请求
+            self._unfillable.add((gap_start, gap_end))
+            logger.info(f"ℹ️ K线缺口无法回补，已忽略: {gap_start} - {gap_end}")
+        else:
+            self.stats['gaps_filled'] += 1
+
+    async def _fetch_and_merge(self, fetcher: CandleFetcher, since: Optional[int],
+                               limit: int, now_open: int) -> int:
+        """拉取并合并，返回新增/更新的K线数量"""
+        candles = await fetcher(since, limit)
+        self.stats['fetch_calls'] += 1
+        self.stats['candles_fetched'] += len(candles)
+        return self._merge(candles, now_open)
+
+    def _merge(self, candles: List[Dict[str, Any]], now_open: int) -> int:
+        """合并K线：已收盘的按时间戳去重插入，未收盘的单独保存"""
+        merged = 0
+        for candle in candles:
+            ts = int(candle['timestamp'])
+            if ts >= now_open:
+                self._live = candle
+                merged += 1
+                continue
+
+            index = bisect.bisect_left(self._timestamps, ts)
+            if index < len(self._timestamps) and self._timestamps[index] == ts:
+                continue  # 已收盘K线不会再变化
+
+            self._timestamps.insert(index, ts)
+            self._candles.insert(index, candle)
+            self._pending.append(candle)
+            merged += 1
+
+        if self._live and int(self._live['timestamp']) < now_open:
+            self._live = None  # 上一根未收盘K线已收盘
+
+        # 控制内存占用，旧数据仍可从磁盘读取
+        overflow = len(self._candles) - self.max_memory_candles
+        if overflow > 0:
+            del self._timestamps[:overflow]
+            del self._candles[:overflow]
+
+        return merged
+
+    def _current_open_ts(self) -> int:
+        return int(time.time() * 1000) // self.tf_ms * self.tf_ms
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        """从磁盘加载（去重并排序）"""
+        if not self.path or not self.path.exists():
+            return
+
+        try:
+            by_ts: Dict[int, Dict[str, Any]] = {}
+            rows = 0
+            with open(self.path, 'r', newline='', encoding='utf-8') as f:
+                for row in csv.reader(f):
+                    if len(row) < len(_FIELDS):
+                        continue  # 忽略写入中断产生的残行
+                    rows += 1
+                    ts = int(row[0])
+                    by_ts[ts] = {
+                        'timestamp': ts,
+                        'open': float(row[1]),
+                        'high': float(row[2]),
+                        'low': float(row[3]),
+                        'close': float(row[4]),
+                        'volume': float(row[5])
+                    }
+
+            merged = dict(zip(self._timestamps, self._candles))
+            for ts, candle in by_ts.items():
+                merged.setdefault(ts, candle)  # 内存中已有的保持不变
+            self._timestamps = sorted(merged)
+            self._candles = [merged[ts] for ts in self._timestamps]
+            self._disk_count = len(by_ts)
+
+            # 文件中存在重复或乱序行时重写一次
+            if rows != len(by_ts):
+                self._compact(by_ts)
+
+            self.stats['disk_loads'] += 1
+            logger.info(f"💾 加载本地K线: {self.symbol} {self.timeframe} 共 {len(self._candles)} 根")
+
+        except Exception as e:
+            logger.error(f"加载本地K线失败 {self.path}: {e}")
+
+    def _compact(self, by_ts: Dict[int, Dict[str, Any]]) -> None:
+        """按时间戳去重排序后重写文件"""
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for ts in sorted(by_ts):
+                writer.writerow([by_ts[ts][field] for field in _FIELDS])
+        tmp_path.replace(self.path)
+        logger.info(f"🧹 本地K线文件已去重: {self.path}")
+
+    def _flush(self) -> None:
+        """追加写入新收盘的K线"""
+        if not self.path or not self._pending:
+            self._pending.clear()
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                for candle in self._pending:
+                    writer.writerow([candle[field] for field in _FIELDS])
+            self._disk_count += len(self._pending)
+        except Exception as e:
+            logger.error(f"写入本地K线失败 {self.path}: {e}")
+        finally:
+            self._pending.clear()
+
+
+class CandleStore:
+    """本地K线存储 - 管理各交易对/周期的K线序列"""
+
+    def __init__(self, base_dir: Optional[str] = "data_json/candles", page_size: int = 100):
+        self.base_dir = Path(base_dir) if base_dir else None
+        self.page_size = page_size
+        self._series: Dict[Tuple[str, str], CandleSeries] = {}
+
+    def series(self, symbol: str, timeframe: str) -> CandleSeries:
+        """获取（必要时创建并从磁盘加载）K线序列"""
+        key = (symbol, timeframe)
+        if key not in self._series:
+            path = None
+            if self.base_dir:
+                safe_symbol = symbol.replace('/', '-').replace(':', '_')
+                path = self.base_dir / f"{safe_symbol}_{timeframe}.csv"
+            self._series[key] = CandleSeries(symbol, timeframe, path, self.page_size)
+        return self._series[key]
+
+    async def get_window(self, symbol: str, timeframe: str, limit: int,
+                         fetcher: CandleFetcher) -> List[Dict[str, Any]]:
+        """增量同步后返回最近limit根K线"""
+        return await self.series(symbol, timeframe).sync(fetcher, limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各序列统计"""
+        return {
+            f"{symbol} {timeframe}": {
+                'candles': len(series),
+                'last_closed_ts': series.last_closed_ts,
+                **series.stats
+            }
+            for (symbol, timeframe), series in self._series.items()
+        }
@@ -18,6 +18,7 @@ from .position import PositionManager, PositionConfig
 from .risk_assessment import MultiDimensionalRiskAssessment, RiskConfig
 from .execution import TradeExecutor, TradeConfig
 from .models import TradeResult, PositionInfo
+from .ws_private import OKXPrivateFeed
 
 logger = logging.getLogger(__name__)
 
@@ -116,6 +117,11 @@ class TradingEngine(BaseComponent):
                 success = await component.initialize()
                 if not success:
                     raise TradingError(f"{name}初始化失败")
+
+            # 私有频道持仓推送直接同步到仓位管理器
+            private_feed = self.exchange_manager.private_feed
+            if private_feed:
+                private_feed.add_position_listener(self._on_position_push)
             
             # 初始化统计信息
             self._initialize_stats()
@@ -131,6 +137,12 @@ class TradingEngine(BaseComponent):
             logger.error(f"交易引擎初始化失败: {e}")
             return False
     
+    def _on_position_push(self, item: Dict[str, Any]) -> None:
+        """处理OKX持仓推送"""
+        position = OKXPrivateFeed.to_position_data(item, self.exchange_manager.config.symbol)
+        mark_price = float(item.get('markPx') or item.get('last') or 0)
+        self.position_manager.apply_exchange_position(position, current_price=mark_price or None)
+
     async def cleanup(self) -> None:
         """清理交易引擎"""
         try:
@@ -430,6 +442,17 @@ class TradingEngine(BaseComponent):
             logger.error(f"获取市场数据失败: {e}")
             return {'error': str(e)}
     
+    def begin_cycle(self, cycle_id: int) -> None:
+        """开始新的交易周期"""
+        self.exchange_manager.begin_cycle(cycle_id)
+
+    def get_cycle_fetch_stats(self) -> Dict[str, Any]:
+        """获取本周期K线请求、限流等待和读取合并统计"""
+        stats = dict(self.exchange_manager.get_ohlcv_cache_stats()['current_cycle'])
+        stats['rate_limit'] = self.exchange_manager.get_rate_limit_cycle_stats()
+        stats['read_cache'] = self.exchange_manager.get_read_cache_stats()
+        return stats
+
     def get_position_info(self) -> Dict[str, Any]:
         """获取持仓信息"""
         try:
@@ -543,45 +566,7 @@ class TradingEngine(BaseComponent):
             logger.info(f"   交易所管理器初始化状态: {self.exchange_manager._initialized}")
             logger.info(f"   模拟模式状态: {self.exchange_manager._is_mock_mode}")
 
-            # 如果处于模拟模式，直接调用同步版本的方法
-            if self.exchange_manager._is_mock_mode:
-                logger.info("   模拟模式：直接生成模拟数据")
-                import random
-                import time
-
-                # 使用与exchange.py中相同的模拟数据生成逻辑
-                current_time = int(time.time())
-                random.seed(current_time // 3600)
-                base_price = random.randint(95000, 105000)
-
-                formatted_data = []
-                current_timestamp = int(time.time() * 1000)
-
-                for i in range(limit):
-                    time_offset = i * 0.001
-                    price_noise = random.randint(-2000, 2000) + int(time_offset * 100)
-
-                    open_price = base_price + price_noise
-                    close_price = open_price + random.randint(-1500, 1500)
-                    high_price = max(open_price, close_price) + random.randint(100, 800)
-                    low_price = min(open_price, close_price) - random.randint(100, 800)
-                    volume = random.randint(5000, 15000)
-
-                    formatted_data.append({
-                        'timestamp': current_timestamp - i * 60000 * 15,  # 15分钟间隔
-                        'open': float(open_price),
-                        'high': float(high_price),
-                        'low': float(low_price),
-                        'close': float(close_price),
-                        'volume': float(volume)
-                    })
-
-                # 反转顺序，使最新数据在前
-                formatted_data.reverse()
-                logger.info(f"   模拟数据生成完成: {len(formatted_data)} 条")
-                return formatted_data
-
-            # 非模拟模式，直接调用异步方法
+            # 模拟与实盘统一走交易所管理器（同一周期内共享K线快照）
             try:
                 result = await self.exchange_manager.fetch_ohlcv(timeframe, limit)
                 logger.info(f"   成功获取数据: {len(result)} 条")
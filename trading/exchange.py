@@ -4,7 +4,11 @@
 """
 
 import ccxt
+import ccxt.async_support as ccxt_async
+import aiohttp
+from aiohttp.abc import AbstractResolver
 import asyncio
+import inspect
 import time
 import os
 from typing import Dict, Any, Optional, List
@@ -14,7 +18,16 @@ import logging
 
 from core.base import BaseComponent, BaseConfig
 from core.exceptions import TradingError, NetworkError, APIError
-from .models import OrderResult, PositionData, TickerData, BalanceData, ExchangeConfig
+from .models import OrderResult, PositionData, TickerData, BalanceData, ExchangeConfig, MarketSnapshot
+from .market_cache import CycleOHLCVCache
+from .candle_store import CandleStore
+from .metadata_cache import MarketMetadataCache
+from .rate_limit import RateLimiter
+from .read_cache import SingleFlightCache
+from .simulated_exchange import SimulatedExchange
+from .ws_feed import OKXPublicFeed
+from .ws_private import OKXPrivateFeed, OKX_WS_PRIVATE_URL, OKX_WS_PRIVATE_DEMO_URL
+from utils.retry_budget import retry_budget
 
 logger = logging.getLogger(__name__)
 
@@ -85,7 +98,9 @@ class BalanceData:
 
 class ExchangeManager(BaseComponent):
     """交易所管理器"""
-    
+
+    READ_RETRY_DELAY = 0.5  # 只读请求网络错误后的重试等待（秒）
+
     def __init__(self, config: Optional[ExchangeConfig] = None):
         super().__init__(config or ExchangeConfig())
         self.config = config or ExchangeConfig()
@@ -93,6 +108,123 @@ class ExchangeManager(BaseComponent):
         self._market_info: Optional[Dict[str, Any]] = None
         self._rate_limiter = RateLimiter()
         self._is_mock_mode = False  # 模拟模式标志
+        self._http_session: Optional[aiohttp.ClientSession] = None  # 异步后端共享的HTTP会话
+        self._ohlcv_cache = CycleOHLCVCache()  # 交易周期内K线快照缓存
+        self._read_cache = SingleFlightCache()  # 行情/持仓/余额读取合并缓存
+        self._candle_store: Optional[CandleStore] = None  # 本地K线存储
+        self._ws_feed: Optional[OKXPublicFeed] = None  # WebSocket行情订阅
+        self._private_feed: Optional[OKXPrivateFeed] = None  # WebSocket订单/持仓/余额推送
+        self._metadata_cache: Optional[MarketMetadataCache] = None  # 市场信息/杠杆磁盘缓存
+        self._metadata_refresh_task: Optional[asyncio.Task] = None
+        self._resolver: Optional[AbstractResolver] = None  # 异步后端连接池使用的DNS解析器
+
+    @property
+    def is_async_backend(self) -> bool:
+        """是否使用异步ccxt后端"""
+        return str(getattr(self.config, 'backend', 'sync')).lower() == 'async'
+
+    def _create_exchange(self, api_key: str, secret: str, password: str, sandbox: bool) -> ccxt.Exchange:
+        """按配置的后端创建OKX客户端实例"""
+        params = {
+            'apiKey': api_key,
+            'secret': secret,
+            'password': password,
+            'sandbox': sandbox,
+            'timeout': self.config.timeout * 1000,  # ccxt使用毫秒
+            'enableRateLimit': getattr(self.config, 'enable_rate_limit', True),
+            'options': {
+                'defaultType': 'swap',
+            }
+        }
+
+        if self.is_async_backend:
+            # 异步后端：所有REST请求复用同一个aiohttp会话（keep-alive连接池）
+            if self._http_session is None or self._http_session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=20,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60,
+                    enable_cleanup_closed=True,
+                    resolver=self._resolver
+                )
+                self._http_session = aiohttp.ClientSession(connector=connector)
+            params['session'] = self._http_session
+            exchange = ccxt_async.okx(params)
+        else:
+            exchange = ccxt.okx(params)
+
+        # 自定义REST地址（本地桩服务/反向代理）
+        rest_url = getattr(self.config, 'rest_url', None)
+        if rest_url:
+            exchange.urls['api'] = {'rest': rest_url.rstrip('/')}
+
+        return exchange
+
+    def set_resolver(self, resolver: Optional[AbstractResolver]) -> None:
+        """设置异步后端连接池的DNS解析器（需在 initialize 之前调用）"""
+        self._resolver = resolver
+
+    @property
+    def rest_url(self) -> Optional[str]:
+        """REST接口地址，模拟模式下为None"""
+        if self._is_mock_mode or self.exchange is None:
+            return None
+        try:
+            api = self.exchange.urls.get('api')
+            url = api.get('rest') if isinstance(api, dict) else api
+            return self.exchange.implode_hostname(url) if isinstance(url, str) else None
+        except Exception:
+            return None
+
+    async def warmup(self) -> bool:
+        """预热REST连接：调用公共时间接口，使客户端连接池中保留一个已完成TLS握手的连接"""
+        if self._is_mock_mode or self.exchange is None:
+            return False
+        try:
+            await self.call_exchange('fetch_time')
+            return True
+        except Exception as e:
+            logger.debug(f"交易所连接预热失败: {type(e).__name__}: {e}")
+            return False
+
+    def _create_simulated_exchange(self) -> SimulatedExchange:
+        """按配置创建模拟交易所（配置了回放文件时回放录制K线）"""
+        kwargs = {
+            'seed': getattr(self.config, 'sim_seed', 42),
+            'initial_balance': getattr(self.config, 'sim_initial_balance', 10000.0),
+            'leverage': self.config.leverage,
+            'latency': getattr(self.config, 'sim_latency_ms', 0.0) / 1000,
+            'error_rate': getattr(self.config, 'sim_error_rate', 0.0)
+        }
+        replay_path = getattr(self.config, 'sim_replay_path', None)
+        if replay_path:
+            logger.info(f"🧪 模拟交易所回放K线: {replay_path}")
+            return SimulatedExchange.replay(replay_path, timeframe=self.config.timeframe, **kwargs)
+        return SimulatedExchange(symbol=self.config.symbol, timeframe=self.config.timeframe, **kwargs)
+
+    async def call_exchange(self, method: str, *args, **kwargs) -> Any:
+        """调用交易所客户端方法，兼容同步与异步后端
+
+        每次调用计入全局重试预算（来源 exchange:<方法名>）；只读方法（fetch_*/load_markets）遇到网络错误时
+        在预算内重试一次，下单/撤单等非幂等操作不重试
+        """
+        origin = f"exchange:{method}"
+        retry_budget.record_request(origin)
+        retryable = method.startswith('fetch') or method == 'load_markets'
+        try:
+            return await self._invoke_exchange(method, *args, **kwargs)
+        except ccxt.NetworkError as e:
+            if not retryable or not retry_budget.try_acquire(origin):
+                raise
+            logger.warning(f"🔁 {method} 网络错误，{self.READ_RETRY_DELAY:.1f}秒后重试: {e}")
+            await asyncio.sleep(self.READ_RETRY_DELAY)
+            return await self._invoke_exchange(method, *args, **kwargs)
+
+    async def _invoke_exchange(self, method: str, *args, **kwargs) -> Any:
+        result = getattr(self.exchange, method)(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
     
     async def initialize(self) -> bool:
         """初始化交易所连接"""
@@ -101,64 +233,51 @@ class ExchangeManager(BaseComponent):
             logger.info(f"   API密钥: {'已配置' if self.config.api_key else '未配置'}")
             logger.info(f"   沙盒模式: {self.config.sandbox}")
             logger.info(f"   测试模式: {os.getenv('TEST_MODE', 'true')}")
-
-            # 如果在测试模式，强制使用模拟数据
+            logger.info(f"   客户端后端: {'async' if self.is_async_backend else 'sync'}")
+            self._rate_limiter.enabled = getattr(self.config, 'enable_rate_limit', True)
+            self._read_cache.ttl = getattr(self.config, 'read_cache_ttl', 1.0)
+            metadata_cache_path = getattr(self.config, 'metadata_cache_path', None)
+            self._metadata_cache = MarketMetadataCache(
+                metadata_cache_path, getattr(self.config, 'metadata_cache_ttl', 86400.0)
+            ) if metadata_cache_path else None
+            candle_store_dir = getattr(self.config, 'candle_store_dir', None)
+            self._candle_store = CandleStore(candle_store_dir) if candle_store_dir else None
+
+            # 测试模式或未配置API凭据时使用确定性模拟交易所，其余代码路径与实盘一致
             if os.getenv('TEST_MODE', 'true').lower() == 'true':
-                logger.info("🧪 测试模式已启用，使用模拟市场数据")
-                self.exchange = ccxt.okx({
-                    'apiKey': 'test_key',
-                    'secret': 'test_secret',
-                    'password': 'test_password',
-                    'sandbox': True,  # 强制使用沙盒模式
-                    'timeout': self.config.timeout * 1000,
-                    'enableRateLimit': True,
-                    'options': {
-                        'defaultType': 'swap',
-                    }
-                })
+                logger.info("🧪 测试模式已启用，使用模拟交易所")
+                self.exchange = self._create_simulated_exchange()
                 self._is_mock_mode = True
-            # 检查是否提供了API凭据
             elif not self.config.api_key or self.config.api_key == "":
-                logger.warning("⚠️ 未配置API密钥，将使用模拟模式")
-                # 在模拟模式下，我们仍然创建一个交易所实例但不进行真实连接
-                self.exchange = ccxt.okx({
-                    'apiKey': 'test_key',
-                    'secret': 'test_secret',
-                    'password': 'test_password',
-                    'sandbox': True,  # 强制使用沙盒模式
-                    'timeout': self.config.timeout * 1000,
-                    'enableRateLimit': True,
-                    'options': {
-                        'defaultType': 'swap',
-                    }
-                })
-                # 设置模拟模式标志
+                logger.warning("⚠️ 未配置API密钥，将使用模拟交易所")
+                self.exchange = self._create_simulated_exchange()
                 self._is_mock_mode = True
             else:
                 # 创建交易所实例
                 if self.config.exchange.lower() == 'okx':
                     logger.info("💰 使用真实API凭据连接交易所")
-                    self.exchange = ccxt.okx({
-                        'apiKey': self.config.api_key,
-                        'secret': self.config.secret,
-                        'password': self.config.password,
-                        'sandbox': self.config.sandbox,
-                        'timeout': self.config.timeout * 1000,  # ccxt使用毫秒
-                        'enableRateLimit': True,
-                        'options': {
-                            'defaultType': 'swap',
-                        }
-                    })
+                    self.exchange = self._create_exchange(
+                        self.config.api_key, self.config.secret,
+                        self.config.password, self.config.sandbox
+                    )
                 else:
                     raise TradingError(f"不支持的交易所: {self.config.exchange}")
 
             logger.info(f"✅ 交易所实例创建完成，模拟模式: {self._is_mock_mode}")
             
             # 加载市场信息
-            self._load_market_info()
+            await self._load_market_info()
             
             # 设置杠杆
             await self._set_leverage()
+
+            # 启动WebSocket行情订阅（模拟模式下无真实行情，不启动）
+            if getattr(self.config, 'ws_enabled', False) and not self._is_mock_mode:
+                await self._start_ws_feed()
+
+            # 启动私有频道订阅（需要真实API凭据）
+            if getattr(self.config, 'ws_private_enabled', False) and not self._is_mock_mode:
+                await self._start_private_feed()
             
             logger.info(f"✅ {self.config.exchange} 交易所连接初始化完成")
             self._initialized = True
@@ -174,53 +293,128 @@ class ExchangeManager(BaseComponent):
     async def cleanup(self) -> None:
         """清理交易所连接"""
         try:
+            task = self._metadata_refresh_task
+            if task and not task.done() and not task.get_loop().is_closed():
+                task.cancel()
+            self._metadata_refresh_task = None
+
+            if self._ws_feed:
+                await self._ws_feed.stop()
+                self._ws_feed = None
+
+            if self._private_feed:
+                await self._private_feed.stop()
+                self._private_feed = None
+
             if self.exchange:
-                self.exchange.close()
+                await self.call_exchange('close')
                 self.exchange = None
+
+            # 共享会话由管理器持有，需在客户端关闭后单独释放
+            if self._http_session and not self._http_session.closed:
+                await self._http_session.close()
+            self._http_session = None
             
             self._initialized = False
             logger.info("🛑 交易所连接已清理")
         except Exception as e:
             logger.error(f"交易所连接清理失败: {e}")
     
-    def _load_market_info(self) -> None:
-        """加载市场信息"""
+    @property
+    def _metadata_key(self) -> str:
+        return MarketMetadataCache.make_key(self.config.exchange, self.config.sandbox, self.config.symbol)
+
+    def _use_metadata_cache(self) -> bool:
+        return self._metadata_cache is not None and not self._is_mock_mode
+
+    async def _load_market_info(self) -> None:
+        """加载市场信息（优先使用磁盘缓存，过期缓存先用后台刷新）"""
         try:
             logger.info(f"📊 加载 {self.config.symbol} 市场信息...")
 
-            # 如果在模拟模式，使用默认市场信息
-            if self._is_mock_mode:
-                logger.info("🧪 模拟模式：使用默认市场信息")
-                self._market_info = self._get_default_market_info()
-                return
-
-            # 获取市场数据
-            markets = self.exchange.load_markets()
-            market = markets.get(self.config.symbol)
-
-            if market:
-                self._market_info = {
-                    'symbol': market['symbol'],
-                    'base': market['base'],
-                    'quote': market['quote'],
-                    'contract_size': market.get('contractSize', 0.001),
-                    'precision': market.get('precision', {}),
-                    'limits': market.get('limits', {}),
-                    'taker': market.get('taker', 0.001),
-                    'maker': market.get('maker', 0.001),
-                    'type': market.get('type', 'swap')
-                }
-
-                logger.info(f"✅ 市场信息加载完成: {self.config.symbol}")
-                logger.info(f"   合约大小: {self._market_info['contract_size']}")
-                logger.info(f"   手续费 - 吃单: {self._market_info['taker']}, 挂单: {self._market_info['maker']}")
-            else:
-                logger.warning(f"⚠️ 未找到市场信息: {self.config.symbol}")
-                self._market_info = self._get_default_market_info()
+            if self._use_metadata_cache():
+                entry = self._metadata_cache.load(self._metadata_key)
+                cached = entry.get('markets') if entry else None
+                if cached and cached.get('markets'):
+                    # 注入缓存的market结构后ccxt不会再自动下载全量合约列表
+                    self.exchange.set_markets(cached['markets'])
+                    self._market_info = cached['market_info']
+                    age = self._metadata_cache.age(entry, 'markets')
+                    logger.info(f"⚡ 使用缓存的市场信息: {self.config.symbol}（{age / 3600:.1f} 小时前）")
+                    if not self._metadata_cache.is_fresh(entry, 'markets'):
+                        self._schedule_metadata_refresh()
+                    return
+
+            await self._fetch_market_info()
 
         except Exception as e:
             logger.error(f"加载市场信息失败: {e}")
             self._market_info = self._get_default_market_info()
+
+    async def _fetch_market_info(self, reload: bool = False) -> None:
+        """从交易所加载市场信息并写入缓存"""
+        await self._rate_limiter.acquire('load_markets')
+        if reload and not self.is_async_backend:
+            # 同步客户端的全量下载放到线程中，避免阻塞事件循环
+            markets = await asyncio.to_thread(self.exchange.load_markets, True)
+        else:
+            markets = await self.call_exchange('load_markets', reload)
+        market = markets.get(self.config.symbol)
+
+        if market:
+            self._market_info = {
+                'symbol': market['symbol'],
+                'base': market['base'],
+                'quote': market['quote'],
+                'contract_size': market.get('contractSize', 0.001),
+                'precision': market.get('precision', {}),
+                'limits': market.get('limits', {}),
+                'taker': market.get('taker', 0.001),
+                'maker': market.get('maker', 0.001),
+                'type': market.get('type', 'swap')
+            }
+
+            logger.info(f"✅ 市场信息加载完成: {self.config.symbol}")
+            logger.info(f"   合约大小: {self._market_info['contract_size']}")
+            logger.info(f"   手续费 - 吃单: {self._market_info['taker']}, 挂单: {self._market_info['maker']}")
+
+            if self._use_metadata_cache():
+                self._metadata_cache.save_markets(
+                    self._metadata_key, {self.config.symbol: market}, self._market_info
+                )
+        else:
+            logger.warning(f"⚠️ 未找到市场信息: {self.config.symbol}")
+            self._market_info = self._get_default_market_info()
+
+    def _schedule_metadata_refresh(self) -> None:
+        """后台刷新过期的市场信息和杠杆设置（同一时间只运行一个）"""
+        task = self._metadata_refresh_task
+        if task and not task.done() and not task.get_loop().is_closed():
+            return
+        try:
+            self._metadata_refresh_task = asyncio.get_running_loop().create_task(self._refresh_metadata())
+        except RuntimeError:
+            self._metadata_refresh_task = None  # 当前没有运行中的事件循环，下个周期再刷新
+
+    async def _refresh_metadata(self) -> None:
+        """后台刷新：重新加载市场信息并重新设置杠杆"""
+        try:
+            entry = self._metadata_cache.load(self._metadata_key)
+            if not self._metadata_cache.is_fresh(entry, 'markets'):
+                logger.info("🔄 后台刷新市场信息缓存...")
+                await self._fetch_market_info(reload=True)
+            if not self._metadata_cache.is_fresh(entry, 'leverage'):
+                await self._apply_leverage()
+        except Exception as e:
+            logger.warning(f"⚠️ 后台刷新市场信息失败，继续使用缓存: {e}")
+
+    def refresh_metadata_if_stale(self) -> None:
+        """缓存过期时触发后台刷新（在交易周期开始时调用）"""
+        if not self._use_metadata_cache() or not self._initialized:
+            return
+        entry = self._metadata_cache.load(self._metadata_key)
+        if not (self._metadata_cache.is_fresh(entry, 'markets') and self._metadata_cache.is_fresh(entry, 'leverage')):
+            self._schedule_metadata_refresh()
     
     def _get_default_market_info(self) -> Dict[str, Any]:
         """获取默认市场信息"""
@@ -237,45 +431,124 @@ class ExchangeManager(BaseComponent):
         }
     
     async def _set_leverage(self) -> None:
-        """设置杠杆"""
+        """设置杠杆（缓存中已记录相同设置时跳过，过期后由后台刷新重新设置）"""
         try:
             if not self.exchange:
                 return
 
-            # 模拟模式下跳过杠杆设置
-            if self._is_mock_mode:
-                logger.info(f"🧪 模拟模式：跳过杠杆设置 (使用 {self.config.leverage}x)")
-                return
+            if self._use_metadata_cache():
+                entry = self._metadata_cache.load(self._metadata_key)
+                cached = entry.get('leverage') if entry else None
+                if (cached and cached.get('leverage') == self.config.leverage
+                        and cached.get('margin_mode') == self.config.margin_mode):
+                    logger.info(f"⚡ 杠杆已设置为 {self.config.leverage}x（缓存），跳过设置请求")
+                    if not self._metadata_cache.is_fresh(entry, 'leverage'):
+                        self._schedule_metadata_refresh()
+                    return
 
-            logger.info(f"⚙️ 设置杠杆: {self.config.leverage}x")
+            await self._apply_leverage()
 
-            # 转换交易对格式
-            inst_id = self._convert_symbol_to_inst_id(self.config.symbol)
+        except Exception as e:
+            logger.error(f"设置杠杆异常: {e}")
 
-            try:
-                self.exchange.set_leverage(self.config.leverage, self.config.symbol)
-                logger.info(f"✅ 杠杆设置成功: {self.config.leverage}x")
-            except Exception as e:
-                error_msg = str(e)
-                if "59669" in error_msg:
-                    logger.info(f"ℹ️ 杠杆设置提示: 检测到现有止盈止损订单，杠杆调整被延迟")
-                else:
-                    logger.warning(f"⚠️ 设置杠杆失败: {e}")
+    async def _apply_leverage(self) -> None:
+        """向交易所设置杠杆，成功后写入缓存"""
+        logger.info(f"⚙️ 设置杠杆: {self.config.leverage}x")
 
+        try:
+            await self._rate_limiter.acquire('set_leverage')
+            await self.call_exchange('set_leverage', self.config.leverage, self.config.symbol,
+                                     {'marginMode': self.config.margin_mode})
+            logger.info(f"✅ 杠杆设置成功: {self.config.leverage}x")
+            if self._use_metadata_cache():
+                self._metadata_cache.save_leverage(self._metadata_key, self.config.leverage, self.config.margin_mode)
         except Exception as e:
-            logger.error(f"设置杠杆异常: {e}")
+            error_msg = str(e)
+            if "59669" in error_msg:
+                logger.info(f"ℹ️ 杠杆设置提示: 检测到现有止盈止损订单，杠杆调整被延迟")
+            else:
+                logger.warning(f"⚠️ 设置杠杆失败: {e}")
     
+    async def _start_ws_feed(self) -> None:
+        """启动WebSocket行情订阅，行情和K线读取优先使用推送数据"""
+        try:
+            kwargs = {}
+            if getattr(self.config, 'ws_public_url', None):
+                kwargs['public_url'] = self.config.ws_public_url
+            if getattr(self.config, 'ws_business_url', None):
+                kwargs['business_url'] = self.config.ws_business_url
+
+            self._ws_feed = OKXPublicFeed(
+                inst_id=self._convert_symbol_to_inst_id(self.config.symbol),
+                symbol=self.config.symbol,
+                timeframes=[self.config.timeframe],
+                **kwargs
+            )
+            await self._ws_feed.start()
+        except Exception as e:
+            logger.warning(f"⚠️ WebSocket行情订阅启动失败，继续使用REST: {e}")
+            self._ws_feed = None
+
+    @property
+    def ws_feed(self) -> Optional[OKXPublicFeed]:
+        """WebSocket行情订阅（未启用时为None）"""
+        return self._ws_feed
+
+    async def _start_private_feed(self) -> None:
+        """启动私有频道订阅，订单状态、持仓和余额优先使用推送数据"""
+        try:
+            if not self.config.api_key or not self.config.secret:
+                logger.warning("⚠️ 未配置API凭据，跳过WebSocket私有频道订阅")
+                return
+
+            url = getattr(self.config, 'ws_private_url', None)
+            if not url:
+                url = OKX_WS_PRIVATE_DEMO_URL if self.config.sandbox else OKX_WS_PRIVATE_URL
+
+            self._private_feed = OKXPrivateFeed(
+                api_key=self.config.api_key,
+                secret=self.config.secret,
+                passphrase=self.config.password,
+                inst_id=self._convert_symbol_to_inst_id(self.config.symbol),
+                symbol=self.config.symbol,
+                url=url
+            )
+            self._private_feed.add_order_listener(self._on_order_push)
+            await self._private_feed.start()
+        except Exception as e:
+            logger.warning(f"⚠️ WebSocket私有频道订阅启动失败，继续使用REST轮询: {e}")
+            self._private_feed = None
+
+    def _on_order_push(self, order: Dict[str, Any]) -> None:
+        """订单推送中有新成交时，REST读取的持仓/余额缓存已过时"""
+        if float(order.get('fillSz') or 0) > 0 or order.get('state') in ('filled', 'canceled'):
+            self.invalidate_account_cache()
+
+    @property
+    def private_feed(self) -> Optional[OKXPrivateFeed]:
+        """WebSocket私有频道订阅（未启用时为None）"""
+        return self._private_feed
+
     def _convert_symbol_to_inst_id(self, symbol: str) -> str:
         """转换交易对格式"""
         # BTC/USDT:USDT -> BTC-USDT-SWAP
         return symbol.replace('/USDT:USDT', '-USDT-SWAP').replace('/', '-')
     
     async def fetch_ticker(self) -> TickerData:
-        """获取最新行情"""
+        """获取最新行情（WebSocket推送新鲜时直接读取内存，否则经合并缓存请求REST）"""
+        if self._ws_feed:
+            ticker = self._ws_feed.get_ticker()
+            if ticker:
+                return ticker
+
+        return await self._read_cache.get('ticker', self._fetch_ticker_uncached)
+
+    async def _fetch_ticker_uncached(self) -> TickerData:
+        """直接向交易所请求行情"""
         try:
-            await self._rate_limiter.acquire()
+            await self._rate_limiter.acquire('fetch_ticker')
             
-            ticker = self.exchange.fetch_ticker(self.config.symbol)
+            ticker = await self.call_exchange('fetch_ticker', self.config.symbol)
             
             return TickerData(
                 symbol=ticker['symbol'],
@@ -293,11 +566,20 @@ class ExchangeManager(BaseComponent):
             raise NetworkError(f"获取行情失败: {e}", url=f"{self.config.exchange}/ticker")
     
     async def fetch_positions(self) -> List[PositionData]:
-        """获取持仓信息"""
+        """获取持仓信息（私有频道已收到快照时直接读取内存，否则经合并缓存请求REST）"""
+        if self._private_feed:
+            positions = self._private_feed.get_positions()
+            if positions is not None:
+                return positions
+
+        return await self._read_cache.get('positions', self._fetch_positions_uncached)
+
+    async def _fetch_positions_uncached(self) -> List[PositionData]:
+        """直接向交易所请求持仓"""
         try:
-            await self._rate_limiter.acquire()
+            await self._rate_limiter.acquire('fetch_positions')
             
-            positions = self.exchange.fetch_positions([self.config.symbol])
+            positions = await self.call_exchange('fetch_positions', [self.config.symbol])
             position_data = []
             
             for pos in positions:
@@ -320,11 +602,20 @@ class ExchangeManager(BaseComponent):
             raise NetworkError(f"获取持仓失败: {e}", url=f"{self.config.exchange}/positions")
     
     async def fetch_balance(self) -> BalanceData:
-        """获取账户余额"""
+        """获取账户余额（私有频道已收到快照时直接读取内存，否则经合并缓存请求REST）"""
+        if self._private_feed:
+            balance = self._private_feed.get_balance()
+            if balance is not None:
+                return balance
+
+        return await self._read_cache.get('balance', self._fetch_balance_uncached)
+
+    async def _fetch_balance_uncached(self) -> BalanceData:
+        """直接向交易所请求余额"""
         try:
-            await self._rate_limiter.acquire()
+            await self._rate_limiter.acquire('fetch_balance')
             
-            balance = self.exchange.fetch_balance()
+            balance = await self.call_exchange('fetch_balance')
             usdt_balance = balance.get('USDT', {})
             
             return BalanceData(
@@ -339,8 +630,69 @@ class ExchangeManager(BaseComponent):
             logger.error(f"获取余额失败: {e}")
             raise NetworkError(f"获取余额失败: {e}", url=f"{self.config.exchange}/balance")
     
+    def begin_cycle(self, cycle_id: int) -> None:
+        """开始新的交易周期，周期内的K线请求共享同一份快照"""
+        # 回放模式下每个交易周期推进一根K线
+        if self._is_mock_mode and isinstance(self.exchange, SimulatedExchange) and self.exchange.clock.is_manual:
+            self.exchange.advance()
+        self._ohlcv_cache.begin_cycle(cycle_id)
+        self._read_cache.invalidate()  # 每个周期从最新的账户状态开始
+        self.refresh_metadata_if_stale()
+        self._rate_limiter.begin_cycle()
+
+    async def acquire_rate_limit(self, endpoint: str, weight: int = 1) -> float:
+        """为直接调用的交易所接口获取限流许可（如算法订单），返回等待秒数"""
+        return await self._rate_limiter.acquire(endpoint, weight)
+
+    def get_rate_limit_cycle_stats(self) -> Dict[str, Any]:
+        """获取本周期限流等待统计"""
+        return self._rate_limiter.get_cycle_stats()
+
+    def invalidate_account_cache(self) -> None:
+        """下单/撤单/成交后使持仓和余额缓存失效，下次读取重新请求"""
+        self._read_cache.invalidate('positions', 'balance')
+
+    def get_read_cache_stats(self) -> Dict[str, Any]:
+        """获取行情/持仓/余额读取的命中和合并统计"""
+        return self._read_cache.get_stats()
+
+    def get_ohlcv_cache_stats(self) -> Dict[str, Any]:
+        """获取K线快照缓存统计"""
+        return self._ohlcv_cache.get_stats()
+
     async def fetch_ohlcv(self, timeframe: str = '15m', limit: int = 100) -> List[Dict[str, Any]]:
-        """获取K线数据"""
+        """获取K线数据（同一交易周期内经由快照缓存）"""
+        return await self._ohlcv_cache.get(
+            self.config.symbol, timeframe, limit,
+            lambda window: self._fetch_ohlcv_window(timeframe, window)
+        )
+
+    async def _fetch_ohlcv_window(self, timeframe: str, limit: int) -> List[Dict[str, Any]]:
+        """获取最近limit根K线
+
+        优先读取WebSocket推送的连续K线；否则经本地K线存储只请求增量（未启用时整体拉取），
+        并用拉取结果补齐WebSocket序列。
+        """
+        if self._ws_feed:
+            candles = self._ws_feed.get_candles(timeframe, limit)
+            if candles:
+                return candles
+
+        if self._candle_store is None or self._is_mock_mode:
+            data = await self._fetch_ohlcv_uncached(timeframe, limit)
+        else:
+            data = await self._candle_store.get_window(
+                self.config.symbol, timeframe, limit,
+                lambda since, count: self._fetch_ohlcv_uncached(timeframe, count, since)
+            )
+
+        if self._ws_feed:
+            self._ws_feed.seed_candles(timeframe, data)
+        return data
+
+    async def _fetch_ohlcv_uncached(self, timeframe: str, limit: int,
+                                    since: Optional[int] = None) -> List[Dict[str, Any]]:
+        """直接向交易所请求K线数据"""
         try:
             logger.debug(f"📊 开始获取K线数据: {self.config.symbol}, 时间周期: {timeframe}, 数量: {limit}")
 
@@ -349,48 +701,9 @@ class ExchangeManager(BaseComponent):
                 logger.error("❌ 交易所管理器未初始化，请先调用initialize()方法")
                 return []
 
-            # 如果在模拟模式，直接返回模拟数据
-            if self._is_mock_mode:
-                logger.info("🧪 模拟模式：生成模拟K线数据")
-                import random
-                import time
-
-                # 使用与get_market_data一致的价格范围
-                current_time = int(time.time())
-                random.seed(current_time // 3600)  # 每小时更新一次基础价格
-                base_price = random.randint(95000, 105000)  # BTC通常在95k-105k范围
+            await self._rate_limiter.acquire('fetch_ohlcv')
 
-                formatted_data = []
-                current_timestamp = int(time.time() * 1000)
-
-                for i in range(limit):
-                    # 添加时间序列的随机性，使价格走势更自然
-                    time_offset = i * 0.001
-                    price_noise = random.randint(-2000, 2000) + int(time_offset * 100)
-
-                    open_price = base_price + price_noise
-                    close_price = open_price + random.randint(-1500, 1500)
-                    high_price = max(open_price, close_price) + random.randint(100, 800)
-                    low_price = min(open_price, close_price) - random.randint(100, 800)
-                    volume = random.randint(5000, 15000)
-
-                    formatted_data.append({
-                        'timestamp': current_timestamp - i * 60000 * 15,  # 15分钟间隔
-                        'open': float(open_price),
-                        'high': float(high_price),
-                        'low': float(low_price),
-                        'close': float(close_price),
-                        'volume': float(volume)
-                    })
-
-                # 反转顺序，使最新数据在前
-                formatted_data.reverse()
-                logger.info(f"🧪 模拟K线数据生成完成: {len(formatted_data)} 条")
-                return formatted_data
-
-            await self._rate_limiter.acquire()
-
-            ohlcv = self.exchange.fetch_ohlcv(self.config.symbol, timeframe, limit=limit)
+            ohlcv = await self.call_exchange('fetch_ohlcv', self.config.symbol, timeframe, since=since, limit=limit)
 
             formatted_data = []
             for candle in ohlcv:
@@ -415,25 +728,19 @@ class ExchangeManager(BaseComponent):
                           params: Optional[Dict[str, Any]] = None) -> OrderResult:
         """创建订单"""
         try:
-            await self._rate_limiter.acquire()
-            
-            order_params = params or {}
-            order_params.update({
-                'symbol': self.config.symbol,
-                'side': side.lower(),
-                'type': type.lower(),
-                'amount': amount,
-                'price': price
-            })
+            await self._rate_limiter.acquire('create_order')
             
             # 标准化数量
             standardized_amount = self._standardize_amount(amount)
-            order_params['amount'] = standardized_amount
             
             logger.info(f"📤 创建订单: {side} {standardized_amount} @ {price or 'market'}")
             
-            # 创建订单
-            order = self.exchange.create_order(**order_params)
+            # 创建订单（reduceOnly等交易所参数通过params传递）
+            order = await self.call_exchange(
+                'create_order', self.config.symbol, type.lower(), side.lower(),
+                standardized_amount, price, dict(params or {})
+            )
+            self.invalidate_account_cache()
             
             return OrderResult(
                 success=True,
@@ -452,9 +759,10 @@ class ExchangeManager(BaseComponent):
     async def cancel_order(self, order_id: str) -> bool:
         """取消订单"""
         try:
-            await self._rate_limiter.acquire()
+            await self._rate_limiter.acquire('cancel_order')
             
-            result = self.exchange.cancel_order(order_id, self.config.symbol)
+            result = await self.call_exchange('cancel_order', order_id, self.config.symbol)
+            self.invalidate_account_cache()
             
             if result and result.get('status') == 'canceled':
                 logger.info(f"✅ 订单取消成功: {order_id}")
@@ -470,9 +778,9 @@ class ExchangeManager(BaseComponent):
     async def fetch_order(self, order_id: str) -> Optional[Dict[str, Any]]:
         """获取订单信息"""
         try:
-            await self._rate_limiter.acquire()
+            await self._rate_limiter.acquire('fetch_order')
             
-            order = self.exchange.fetch_order(order_id, self.config.symbol)
+            order = await self.call_exchange('fetch_order', order_id, self.config.symbol)
             return order
             
         except Exception as e:
@@ -482,9 +790,9 @@ class ExchangeManager(BaseComponent):
     async def fetch_open_orders(self) -> List[Dict[str, Any]]:
         """获取未成交订单"""
         try:
-            await self._rate_limiter.acquire()
+            await self._rate_limiter.acquire('fetch_open_orders')
             
-            orders = self.exchange.fetch_open_orders(self.config.symbol)
+            orders = await self.call_exchange('fetch_open_orders', self.config.symbol)
             return orders
             
         except Exception as e:
@@ -536,56 +844,52 @@ class ExchangeManager(BaseComponent):
                 logger.error("交易所未初始化")
                 return {'error': '交易所未初始化'}
 
-            # 如果在模拟模式，返回模拟数据
-            if self._is_mock_mode:
-                # 生成模拟市场数据 - 使用更真实的BTC价格范围
-                import random
-                import time
-
-                # 获取当前时间作为种子的一部分，使价格更动态
-                current_time = int(time.time())
-                random.seed(current_time // 3600)  # 每小时更新一次基础价格
-
-                # 使用更真实的BTC价格范围 (基于2024年价格)
-                base_price = random.randint(95000, 105000)  # BTC通常在95k-105k范围
-                price_variation = random.randint(-2000, 2000)  # ±2000的波动
-                price = base_price + price_variation
-
-                return {
-                    'price': price,
-                    'bid': price - random.randint(5, 15),
-                    'ask': price + random.randint(5, 15),
-                    'high': price + random.randint(100, 1000),
-                    'low': price - random.randint(100, 1000),
-                    'volume': random.randint(5000, 15000),
-                    'positions': [],
-                    'balance': {'total': 10000, 'used': 0, 'free': 10000},
-                    'price_history': []
-                }
-
-            # 获取实时行情数据
-            ticker = await self.fetch_ticker()
-            positions = await self.fetch_positions()
-            balance = await self.fetch_balance()
-
-            # 获取历史K线数据用于价格变化计算
-            ohlcv = await self.fetch_ohlcv(timeframe='15m', limit=20)
-
-            return {
-                'price': ticker.last if ticker.last else 0,
-                'bid': ticker.bid if ticker.bid else 0,
-                'ask': ticker.ask if ticker.ask else 0,
-                'high': ticker.high if ticker.high else 0,
-                'low': ticker.low if ticker.low else 0,
-                'volume': ticker.volume if ticker.volume else 0,
-                'positions': [pos.to_dict() for pos in positions],
-                'balance': balance.to_dict() if balance else {},
-                'price_history': ohlcv
-            }
+            # 并发获取行情、持仓、余额和K线快照
+            snapshot = await self.get_market_snapshot()
+            return snapshot.to_dict()
 
         except Exception as e:
             logger.error(f"获取市场数据失败: {e}")
             return {'error': str(e)}
+
+    async def get_market_snapshot(self, timeframe: Optional[str] = None, ohlcv_limit: int = 20) -> MarketSnapshot:
+        """并发获取市场快照
+
+        行情、持仓、余额和K线四个请求同时发出（每个请求仍各自经过速率限制器），
+        总耗时约等于最慢的单个请求；任一请求失败则整体抛出异常。
+        """
+        timeframe = timeframe or self.config.timeframe
+        latencies: Dict[str, float] = {}
+
+        async def timed(name: str, coro):
+            start = time.perf_counter()
+            try:
+                return await coro
+            finally:
+                latencies[name] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        ticker, positions, balance, ohlcv = await asyncio.gather(
+            timed('ticker', self.fetch_ticker()),
+            timed('positions', self.fetch_positions()),
+            timed('balance', self.fetch_balance()),
+            timed('ohlcv', self.fetch_ohlcv(timeframe=timeframe, limit=ohlcv_limit))
+        )
+        total_latency = (time.perf_counter() - start) * 1000
+
+        logger.debug(
+            f"📡 市场快照获取完成: 总耗时 {total_latency:.1f}ms "
+            f"({', '.join(f'{k}={v:.1f}ms' for k, v in latencies.items())})"
+        )
+
+        return MarketSnapshot(
+            ticker=ticker,
+            positions=tuple(positions),
+            balance=balance,
+            ohlcv=tuple(ohlcv),
+            latencies_ms=latencies,
+            total_latency_ms=total_latency
+        )
     
     def get_exchange_status(self) -> Dict[str, Any]:
         """获取交易所状态"""
@@ -595,52 +899,18 @@ class ExchangeManager(BaseComponent):
                 'initialized': self._initialized,
                 'symbol': self.config.symbol,
                 'sandbox': self.config.sandbox,
+                'backend': 'async' if self.is_async_backend else 'sync',
                 'market_info': self.get_market_info(),
+                'ohlcv_cache': self._ohlcv_cache.get_stats(),
+                'read_cache': self._read_cache.get_stats(),
+                'candle_store': self._candle_store.get_stats() if self._candle_store else {},
+                'ws_feed': self._ws_feed.get_stats() if self._ws_feed else {},
+                'private_feed': self._private_feed.get_stats() if self._private_feed else {},
                 'rate_limit_status': self._rate_limiter.get_status()
             }
         except Exception as e:
             logger.error(f"获取交易所状态失败: {e}")
             return {'error': str(e)}
 
-class RateLimiter:
-    """速率限制器"""
-    
-    def __init__(self, max_requests_per_second: int = 10):
-        self.max_requests_per_second = max_requests_per_second
-        self.request_times: List[float] = []
-        self._lock = asyncio.Lock()
-    
-    async def acquire(self):
-        """获取请求许可"""
-        async with self._lock:
-            current_time = time.time()
-            
-            # 清理过期的请求时间记录
-            self.request_times = [t for t in self.request_times if current_time - t < 1.0]
-            
-            # 检查是否超过速率限制
-            if len(self.request_times) >= self.max_requests_per_second:
-                # 计算需要等待的时间
-                oldest_request = min(self.request_times)
-                wait_time = 1.0 - (current_time - oldest_request)
-                if wait_time > 0:
-                    await asyncio.sleep(wait_time)
-                    current_time = time.time()
-                    self.request_times = [t for t in self.request_times if current_time - t < 1.0]
-            
-            # 记录当前请求时间
-            self.request_times.append(current_time)
-    
-    def get_status(self) -> Dict[str, Any]:
-        """获取速率限制器状态"""
-        current_time = time.time()
-        recent_requests = [t for t in self.request_times if current_time - t < 1.0]
-        
-        return {
-            'current_requests_per_second': len(recent_requests),
-            'max_requests_per_second': self.max_requests_per_second,
-            'available_capacity': self.max_requests_per_second - len(recent_requests)
-        }
-
 # 全局交易所管理器实例
 exchange_manager = ExchangeManager()
\ No newline at end of file
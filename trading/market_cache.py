@@ -0,0 +1,119 @@
+"""
+交易周期行情缓存模块
+同一交易周期内多处读取K线时只向交易所请求一次
+"""
+
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# K线周期单位对应的毫秒数
+_TIMEFRAME_UNIT_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """K线周期转换为毫秒，如 '15m' -> 900000"""
+    try:
+        unit = timeframe[-1].lower()
+        return int(timeframe[:-1]) * _TIMEFRAME_UNIT_MS[unit]
+    except (KeyError, ValueError, IndexError):
+        logger.warning(f"⚠️ 无法识别的K线周期: {timeframe}，按15m处理")
+        return 15 * _TIMEFRAME_UNIT_MS['m']
+
+
+class CycleOHLCVCache:
+    """交易周期K线快照缓存
+
+    缓存键为 (交易对, K线周期, 当前K线开盘时间戳)，仅在同一交易周期内有效。
+    周期内首次请求按已知最大窗口拉取一次，之后各处请求从快照切片返回；
+    周期内若有新K线收盘，键随之变化，自动重新拉取。
+    未调用 begin_cycle 时不做缓存，保持直接请求的行为。
+    """
+
+    def __init__(self, default_window: int = 50):
+        self._window_hint = default_window  # 拉取窗口，随历史最大请求量增长
+        self._cycle_id: Optional[int] = None
+        self._entries: Dict[Tuple[str, str, int], Tuple[int, List[Dict[str, Any]]]] = {}
+
+        # 统计计数
+        self._cycle_fetches = 0
+        self._cycle_hits = 0
+        self._last_cycle: Dict[str, Any] = {}
+        self.total_fetches = 0
+        self.total_hits = 0
+
+    def begin_cycle(self, cycle_id: int) -> None:
+        """开始新的交易周期，清空上一周期快照"""
+        if self._cycle_id is not None:
+            self._last_cycle = self.get_cycle_stats()
+        self._cycle_id = cycle_id
+        self._entries.clear()
+        self._cycle_fetches = 0
+        self._cycle_hits = 0
+
+    def get_cycle_stats(self) -> Dict[str, Any]:
+        """获取当前周期的K线请求统计"""
+        return {
+            'cycle': self._cycle_id,
+            'fetches': self._cycle_fetches,
+            'hits': self._cycle_hits,
+            'window': self._window_hint
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取累计统计"""
+        requests = self.total_fetches + self.total_hits
+        return {
+            'total_fetches': self.total_fetches,
+            'total_hits': self.total_hits,
+            'hit_rate': self.total_hits / requests if requests > 0 else 0,
+            'current_cycle': self.get_cycle_stats(),
+            'last_cycle': dict(self._last_cycle)
+        }
+
+    async def get(self, symbol: str, timeframe: str, limit: int,
+                  fetcher: Callable[[int], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """读取K线，周期内命中快照时直接切片返回
+
+        Args:
+            symbol: 交易对
+            timeframe: K线周期
+            limit: 需要的K线数量
+            fetcher: 实际拉取函数，参数为拉取数量，返回按时间升序的K线列表
+        """
+        if self._cycle_id is None:
+            self.total_fetches += 1
+            return await fetcher(limit)
+
+        key = (symbol, timeframe, self._current_candle_ts(timeframe))
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] >= limit:
+            self._cycle_hits += 1
+            self.total_hits += 1
+            return entry[1][-limit:]
+
+        window = max(limit, self._window_hint)
+        self._window_hint = window
+        data = await fetcher(window)
+        self._cycle_fetches += 1
+        self.total_fetches += 1
+
+        if self._cycle_fetches > 1:
+            logger.debug(f"📦 本周期第 {self._cycle_fetches} 次K线请求: {symbol} {timeframe} x{window}")
+
+        if data:
+            self._entries[key] = (window, data)
+        return data[-limit:]
+
+    @staticmethod
+    def _current_candle_ts(timeframe: str) -> int:
+        """当前K线的开盘时间戳（毫秒）"""
+        tf_ms = timeframe_to_ms(timeframe)
+        return int(time.time() * 1000) // tf_ms * tf_ms
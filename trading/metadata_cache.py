@@ -0,0 +1,115 @@
+"""
+交易所元数据磁盘缓存模块
+缓存交易对的市场信息（ccxt market结构）和杠杆设置状态，
+重启时直接从磁盘恢复，跳过 load_markets 的全量合约下载和重复的杠杆设置请求
+"""
+
+import json
+import os
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import ccxt
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本，结构变化时递增使旧缓存失效
+CACHE_VERSION = 1
+
+
+class MarketMetadataCache:
+    """市场元数据缓存
+
+    单个JSON文件，按 (交易所, 沙盒, 交易对) 区分；版本号或ccxt版本不一致时视为无缓存。
+    markets 与 leverage 两部分各自记录更新时间，超过ttl视为过期（仍可使用，但应后台刷新）。
+    """
+
+    def __init__(self, path: str = "data_json/cache/market_metadata.json", ttl: float = 86400.0):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._entry: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def make_key(exchange: str, sandbox: bool, symbol: str) -> str:
+        return f"{exchange}:{'sandbox' if sandbox else 'live'}:{symbol}"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，格式/版本/键不匹配时返回None"""
+        if self._entry is not None and self._entry.get('key') == key:
+            return self._entry
+        if not self.path.exists():
+            return None
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ 读取市场元数据缓存失败，忽略: {e}")
+            return None
+
+        if entry.get('version') != CACHE_VERSION or entry.get('ccxt_version') != ccxt.__version__:
+            logger.info("ℹ️ 市场元数据缓存版本不一致，重新加载")
+            return None
+        if entry.get('key') != key:
+            return None
+
+        self._entry = entry
+        return entry
+
+    def is_fresh(self, entry: Optional[Dict[str, Any]], section: str) -> bool:
+        """缓存的某一部分（markets/leverage）是否在有效期内"""
+        if not entry or section not in entry:
+            return False
+        return time.time() - entry[section].get('updated_at', 0) < self.ttl
+
+    def age(self, entry: Optional[Dict[str, Any]], section: str) -> Optional[float]:
+        if not entry or section not in entry:
+            return None
+        return time.time() - entry[section].get('updated_at', 0)
+
+    def save_markets(self, key: str, markets: Dict[str, Any], market_info: Dict[str, Any]) -> None:
+        """保存市场信息（只保存用到的交易对，避免缓存全量合约列表）"""
+        entry = self._current(key)
+        entry['markets'] = {
+            'updated_at': time.time(),
+            'markets': markets,
+            'market_info': market_info
+        }
+        self._write(entry)
+
+    def save_leverage(self, key: str, leverage: float, margin_mode: str) -> None:
+        """保存已成功设置的杠杆"""
+        entry = self._current(key)
+        entry['leverage'] = {
+            'updated_at': time.time(),
+            'leverage': leverage,
+            'margin_mode': margin_mode
+        }
+        self._write(entry)
+
+    def invalidate(self) -> None:
+        """删除缓存"""
+        self._entry = None
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _current(self, key: str) -> Dict[str, Any]:
+        entry = self.load(key) or {}
+        entry.update({'version': CACHE_VERSION, 'ccxt_version': ccxt.__version__, 'key': key})
+        return entry
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        """原子写入（先写临时文件再替换）"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.path)
+            self._entry = entry
+        except Exception as e:
+            logger.warning(f"⚠️ 写入市场元数据缓存失败: {e}")
@@ -3,8 +3,9 @@
 定义交易中使用的数据结构
 """
 
-from dataclasses import dataclass
-from typing import Dict, Any, Optional, List
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Tuple, Mapping
 from datetime import datetime
 from enum import Enum
 
@@ -80,6 +81,23 @@ class ExchangeConfig:
     timeout: int = 30
     rate_limit: int = 100
     enable_rate_limit: bool = True
+    timeframe: str = "15m"  # 行情快照使用的K线周期
+    backend: str = "sync"  # 客户端后端: sync(同步ccxt) / async(ccxt.async_support)
+    rest_url: Optional[str] = None  # 自定义REST地址（本地桩服务/反向代理），为空使用官方地址
+    candle_store_dir: Optional[str] = None  # 本地K线存储目录，为空不启用
+    ws_enabled: bool = False  # 启用WebSocket公共行情订阅
+    ws_public_url: Optional[str] = None  # 公共频道地址，为空使用OKX官方地址
+    ws_business_url: Optional[str] = None  # K线频道地址，为空使用OKX官方地址
+    ws_private_enabled: bool = False  # 启用WebSocket私有频道（订单/持仓/余额推送）
+    ws_private_url: Optional[str] = None  # 私有频道地址，为空按sandbox选择OKX官方地址
+    read_cache_ttl: float = 1.0  # 行情/持仓/余额REST读取结果复用时间（秒），并发读取始终合并为一次请求
+    metadata_cache_path: Optional[str] = None  # 市场信息/杠杆磁盘缓存文件，为空不启用
+    metadata_cache_ttl: float = 86400.0  # 市场信息缓存有效期（秒），过期后后台刷新
+    sim_seed: int = 42  # 模拟交易所随机种子（行情和延迟/错误注入）
+    sim_replay_path: Optional[str] = None  # 模拟交易所回放的K线文件，为空使用合成行情
+    sim_initial_balance: float = 10000.0  # 模拟账户初始USDT
+    sim_latency_ms: float = 0.0  # 模拟交易所每次调用的延迟（毫秒）
+    sim_error_rate: float = 0.0  # 模拟交易所网络错误注入概率
 
 
 @dataclass
@@ -195,6 +213,41 @@ class BalanceData:
         }
 
 
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """市场快照 - 单次并发拉取的行情、持仓、余额和K线（不可变）"""
+    ticker: TickerData
+    positions: Tuple[PositionData, ...]
+    balance: BalanceData
+    ohlcv: Tuple[Dict[str, Any], ...]
+    latencies_ms: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))  # 各请求耗时
+    total_latency_ms: float = 0.0  # 快照总耗时（并发时约等于最慢请求）
+    timestamp: datetime = field(default_factory=datetime.now)
+
+    def __post_init__(self):
+        # 冻结耗时字典，保证快照整体只读
+        if not isinstance(self.latencies_ms, MappingProxyType):
+            object.__setattr__(self, 'latencies_ms', MappingProxyType(dict(self.latencies_ms)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为get_market_data的字典格式"""
+        return {
+            'price': self.ticker.last or 0,
+            'bid': self.ticker.bid or 0,
+            'ask': self.ticker.ask or 0,
+            'high': self.ticker.high or 0,
+            'low': self.ticker.low or 0,
+            'volume': self.ticker.volume or 0,
+            'positions': [pos.to_dict() for pos in self.positions],
+            'balance': self.balance.to_dict() if self.balance else {},
+            'price_history': list(self.ohlcv),
+            'fetch_latency': {
+                'per_call_ms': dict(self.latencies_ms),
+                'total_ms': self.total_latency_ms
+            }
+        }
+
+
 from typing import Protocol, runtime_checkable
 
 @runtime_checkable
@@ -20,6 +20,16 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# OKX订单状态 -> 订单记录状态（与ccxt的 open/closed/canceled 保持一致）
+_OKX_ORDER_STATE_MAP = {
+    'live': 'open',
+    'partially_filled': 'open',
+    'filled': 'closed',
+    'canceled': 'canceled',
+    'mmp_canceled': 'canceled'
+}
+_FINAL_STATUSES = ('closed', 'canceled', 'expired')
+
 @dataclass
 class OrderResult:
     """订单执行结果"""
@@ -67,6 +77,9 @@ class OrderManager(BaseComponent):
         self.active_orders: Dict[str, Dict[str, Any]] = {}
         self.order_history: List[Dict[str, Any]] = []
         self._order_monitoring = False
+        self._push_subscribed = False
+        self._reconcile_task: Optional[asyncio.Task] = None  # 私有频道（重新）订阅后的REST对账
+        self._early_updates: Dict[str, Dict[str, Any]] = {}  # 下单接口返回前先到达的推送
     
     async def initialize(self) -> bool:
         """初始化订单管理器"""
@@ -93,12 +106,15 @@ class OrderManager(BaseComponent):
         """清理订单管理器"""
         try:
             self._stop_order_monitoring()
+            if self._reconcile_task and not self._reconcile_task.done():
+                self._reconcile_task.cancel()
             
             # 取消所有活跃订单
             await self.cancel_all_orders()
             
             self.active_orders.clear()
             self.order_history.clear()
+            self._early_updates.clear()
             
             self._initialized = False
             logger.info("🛑 订单管理器已清理")
@@ -258,7 +274,8 @@ class OrderManager(BaseComponent):
             }
             
             # 调用交易所的私有API
-            response = await self.exchange_manager.exchange.privatePostTradeOrderAlgo(algo_params)
+            await self.exchange_manager.acquire_rate_limit('create_algo_order')
+            response = await self.exchange_manager.call_exchange('privatePostTradeOrderAlgo', algo_params)
             
             if response and response.get('code') == '0':
                 algo_id = response.get('data', [{}])[0].get('algoId')
@@ -387,28 +404,107 @@ class OrderManager(BaseComponent):
             }
             
             self.active_orders[result.order_id] = order_record
+
+            # 推送可能早于下单接口返回
+            early_update = self._early_updates.pop(result.order_id, None)
+            if early_update:
+                self._apply_update(result.order_id, early_update)
             
         except Exception as e:
             logger.error(f"记录订单失败: {e}")
     
     def _start_order_monitoring(self) -> None:
-        """启动订单监控"""
+        """启动订单监控（私有频道可用时由推送驱动，否则按需轮询）"""
         if not self._order_monitoring:
             self._order_monitoring = True
-            # 这里可以启动后台任务来监控订单状态
-            logger.info("🔄 订单监控已启动")
-    
+            private_feed = getattr(self.exchange_manager, 'private_feed', None)
+            if private_feed and not self._push_subscribed:
+                private_feed.add_order_listener(self.apply_order_update)
+                private_feed.add_subscribe_listener(self._on_push_subscribed)
+                self._push_subscribed = True
+                logger.info("🔄 订单监控已启动（WebSocket推送）")
+            else:
+                logger.info("🔄 订单监控已启动")
+
+    def _push_active(self) -> bool:
+        """私有频道是否在线（在线时订单状态由推送保持最新）"""
+        if not self._push_subscribed:
+            return False
+        private_feed = getattr(self.exchange_manager, 'private_feed', None)
+        return bool(private_feed and private_feed.is_connected())
+
+    def _on_push_subscribed(self) -> None:
+        """私有频道（重新）订阅后用REST对账一次活跃订单（orders频道不推送快照）"""
+        if not self.active_orders or (self._reconcile_task and not self._reconcile_task.done()):
+            return
+        self._reconcile_task = asyncio.get_running_loop().create_task(self.reconcile_orders())
+
+    async def reconcile_orders(self) -> int:
+        """按REST查询结果更新所有活跃订单，返回成功查询的订单数"""
+        order_ids = list(self.active_orders)
+        updated = 0
+        for order_id in order_ids:
+            if await self.update_order_status(order_id, force=True):
+                updated += 1
+        logger.info(f"🔄 订单对账完成: {updated}/{len(order_ids)} 个活跃订单")
+        return updated
+
+    def apply_order_update(self, order: Dict[str, Any]) -> None:
+        """处理OKX订单推送，更新活跃订单（下单接口返回前到达的推送先缓存）"""
+        try:
+            order_id = order.get('ordId')
+            if not order_id:
+                return
+
+            status = _OKX_ORDER_STATE_MAP.get(order.get('state'), order.get('state', 'unknown'))
+            amount = float(order.get('sz') or 0)
+            filled = float(order.get('accFillSz') or 0)
+            update = {
+                'status': status,
+                'filled': filled,
+                'filled_amount': filled,
+                'remaining': max(amount - filled, 0.0),
+                'average_price': float(order.get('avgPx') or 0),
+                'last_update': datetime.now()
+            }
+
+            if order_id in self.active_orders:
+                self._apply_update(order_id, update)
+            else:
+                # 下单接口尚未返回，先缓存，记录订单时再应用
+                self._early_updates[order_id] = update
+                if len(self._early_updates) > 100:
+                    self._early_updates.pop(next(iter(self._early_updates)))
+
+        except Exception as e:
+            logger.error(f"处理订单推送失败: {e}")
+
+    def _apply_update(self, order_id: str, update: Dict[str, Any]) -> None:
+        """更新订单记录，已完成的订单移入历史"""
+        self.active_orders[order_id].update(update)
+
+        if update.get('status') in _FINAL_STATUSES:
+            completed_order = self.active_orders.pop(order_id)
+            completed_order['completion_time'] = datetime.now()
+            self.order_history.append(completed_order)
+            logger.info(f"📬 订单{'成交' if update['status'] == 'closed' else '结束'}: {order_id} "
+                        f"{completed_order.get('filled', 0)} @ {completed_order.get('average_price', 0)}")
+
     def _stop_order_monitoring(self) -> None:
         """停止订单监控"""
         if self._order_monitoring:
             self._order_monitoring = False
             logger.info("🛑 订单监控已停止")
     
-    async def update_order_status(self, order_id: str) -> bool:
-        """更新订单状态"""
+    async def update_order_status(self, order_id: str, force: bool = False) -> bool:
+        """更新订单状态（force为True时即使私有频道在线也查询REST）"""
         try:
             if order_id not in self.active_orders:
                 return False
+
+            # 私有频道在线时订单状态由推送实时更新，无需REST轮询
+            if self._push_active() and not force:
+                return True
             
             order_info = await self.get_order_status(order_id)
             if order_info:
@@ -422,6 +518,7 @@ class OrderManager(BaseComponent):
                 
                 # 如果订单已完成，移动到历史记录
                 if order_info.get('status') in ['closed', 'canceled', 'expired']:
+                    self.exchange_manager.invalidate_account_cache()
                     completed_order = self.active_orders.pop(order_id)
                     completed_order['completion_time'] = datetime.now()
                     self.order_history.append(completed_order)
@@ -10,6 +10,7 @@ import logging
 
 from core.base import BaseComponent, BaseConfig
 from core.exceptions import TradingError, ValidationError
+from .models import PositionData
 
 logger = logging.getLogger(__name__)
 
@@ -175,6 +176,30 @@ class PositionManager(BaseComponent):
             logger.error(f"仓位更新失败: {e}")
             return False
     
+    def apply_exchange_position(self, position: PositionData, current_price: Optional[float] = None) -> bool:
+        """按交易所推送同步仓位，数量为0表示已平仓"""
+        symbol = position.symbol
+        existing = self.positions.get(symbol)
+
+        if position.size == 0:
+            if existing:
+                self.positions.pop(symbol)
+                logger.info(f"📭 仓位已平仓: {symbol}")
+            return True
+
+        return self.update_position({
+            'side': position.side,
+            'size': position.size,
+            'entry_price': position.entry_price,
+            'current_price': current_price or (existing.current_price if existing else position.entry_price),
+            'unrealized_pnl': position.unrealized_pnl,
+            'realized_pnl': existing.realized_pnl if existing else 0.0,
+            'leverage': position.leverage,
+            'symbol': symbol,
+            'timestamp': position.timestamp,
+            'metadata': existing.metadata if existing else None
+        })
+
     def _validate_position(self, position: PositionInfo) -> bool:
         """验证仓位信息"""
         try:
@@ -0,0 +1,215 @@
+"""
+交易所请求限流模块
+按OKX接口分组的GCRA（通用信元速率算法）限流：每组只保存一个理论到达时间，
+获取许可为O(1)，先预约时间片再在锁外等待，调用方之间互不阻塞
+"""
+
+import asyncio
+import bisect
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# OKX v5 接口分组限额：(请求数, 时间窗口秒)，参考官方文档各接口的限速说明
+OKX_RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    'market_ticker': (20, 2.0),
+    'market_candles': (40, 2.0),
+    'account_positions': (10, 2.0),
+    'account_balance': (10, 2.0),
+    'trade_order': (60, 2.0),
+    'trade_cancel': (60, 2.0),
+    'trade_order_query': (60, 2.0),
+    'trade_orders_pending': (60, 2.0),
+    'trade_algo': (20, 2.0),
+    'account_leverage': (20, 2.0),
+    'public_instruments': (20, 2.0),
+}
+
+# 接口 -> (限额分组, 权重)，未列出的接口走 default 分组
+OKX_ENDPOINT_GROUPS: Dict[str, Tuple[str, int]] = {
+    'fetch_ticker': ('market_ticker', 1),
+    'fetch_ohlcv': ('market_candles', 1),
+    'fetch_positions': ('account_positions', 1),
+    'fetch_balance': ('account_balance', 1),
+    'create_order': ('trade_order', 1),
+    'cancel_order': ('trade_cancel', 1),
+    'fetch_order': ('trade_order_query', 1),
+    'fetch_open_orders': ('trade_orders_pending', 1),
+    'create_algo_order': ('trade_algo', 1),
+    'set_leverage': ('account_leverage', 1),
+    'load_markets': ('public_instruments', 1),
+}
+
+# 等待时间直方图分桶上界（毫秒），最后一档为溢出桶
+WAIT_BUCKETS_MS: List[float] = [0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+
+class WaitHistogram:
+    """固定分桶的等待时间直方图"""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        self.buckets_ms = list(buckets_ms or WAIT_BUCKETS_MS)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, wait_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets_ms, wait_ms)] += 1
+        self.count += 1
+        self.total_ms += wait_ms
+        if wait_ms > self.max_ms:
+            self.max_ms = wait_ms
+
+    def percentile(self, p: float) -> float:
+        """按分桶估算分位数（返回所在桶的上界）"""
+        if self.count == 0:
+            return 0.0
+        target = self.count * p
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            cumulative += c
+            if cumulative >= target:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={b:g}ms" for b in self.buckets_ms] + [f">{self.buckets_ms[-1]:g}ms"]
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': {label: c for label, c in zip(labels, self.counts) if c}
+        }
+
+
+class GCRABucket:
+    """单个限额分组的GCRA状态
+
+    等价于容量为 limit、每 period/limit 秒补充一个令牌的令牌桶。
+    只记录理论到达时间 tat，acquire 时直接把 tat 往后推，返回调用方需要等待的秒数。
+    """
+
+    def __init__(self, name: str, limit: int, period: float):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.interval = period / limit  # 每个令牌的补充间隔
+        self._tat = 0.0
+        self.histogram = WaitHistogram()
+        self.throttled = 0
+
+    def reserve(self, weight: int = 1, now: Optional[float] = None) -> float:
+        """预约weight个令牌，返回需要等待的秒数（0表示立即放行）"""
+        now = time.monotonic() if now is None else now
+        tat = max(self._tat, now) + self.interval * weight
+        self._tat = tat
+        return max(0.0, tat - self.period - now)
+
+    def available(self, now: Optional[float] = None) -> float:
+        """当前可立即使用的令牌数"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, (self.period - max(self._tat - now, 0.0)) / self.interval)
+
+
+class RateLimiter:
+    """交易所速率限制器
+
+    acquire 只做一次O(1)的时间片预约，等待在锁外进行，不同分组之间互不影响，
+    同一分组的并发请求按预约顺序依次放行。
+    """
+
+    def __init__(self, max_requests_per_second: int = 10,
+                 limits: Optional[Dict[str, Tuple[int, float]]] = None,
+                 endpoint_groups: Optional[Dict[str, Tuple[str, int]]] = None, enabled: bool = True):
+        self.max_requests_per_second = max_requests_per_second
+        self.enabled = enabled  # 关闭时直接放行（本地模拟交易所回测）
+        self.endpoint_groups = dict(OKX_ENDPOINT_GROUPS if endpoint_groups is None else endpoint_groups)
+
+        group_limits = dict(OKX_RATE_LIMITS if limits is None else limits)
+        group_limits.setdefault('default', (max_requests_per_second, 1.0))
+        self._buckets: Dict[str, GCRABucket] = {
+            name: GCRABucket(name, limit, period) for name, (limit, period) in group_limits.items()
+        }
+
+        self._cycle_wait_ms = 0.0
+        self._cycle_throttled = 0
+
+    async def acquire(self, endpoint: str = 'default', weight: int = 1) -> float:
+        """获取请求许可，返回实际等待的秒数
+
+        Args:
+            endpoint: 接口名（如 'fetch_ticker'）或限额分组名
+            weight: 本次请求消耗的令牌数
+        """
+        if not self.enabled:
+            return 0.0
+
+        bucket = self._bucket_for(endpoint)
+        if endpoint in self.endpoint_groups:
+            weight *= self.endpoint_groups[endpoint][1]
+
+        wait = bucket.reserve(weight)
+        wait_ms = wait * 1000
+        bucket.histogram.record(wait_ms)
+        if wait > 0:
+            bucket.throttled += 1
+            self._cycle_throttled += 1
+            self._cycle_wait_ms += wait_ms
+            if wait > 1.0:
+                logger.debug(f"⏳ 限流等待 {endpoint}: {wait_ms:.0f}ms")
+            await asyncio.sleep(wait)
+        return wait
+
+    def _bucket_for(self, endpoint: str) -> GCRABucket:
+        if endpoint in self._buckets:
+            return self._buckets[endpoint]
+        group = self.endpoint_groups.get(endpoint, ('default', 1))[0]
+        return self._buckets.get(group, self._buckets['default'])
+
+    def begin_cycle(self) -> None:
+        """开始新的交易周期，重置周期内等待统计"""
+        self._cycle_wait_ms = 0.0
+        self._cycle_throttled = 0
+
+    def get_cycle_stats(self) -> Dict[str, Any]:
+        """获取本周期限流等待统计"""
+        return {
+            'wait_ms': round(self._cycle_wait_ms, 3),
+            'throttled': self._cycle_throttled
+        }
+
+    def get_wait_histograms(self) -> Dict[str, Dict[str, Any]]:
+        """获取各分组的等待时间直方图（仅包含有请求的分组）"""
+        return {
+            name: bucket.histogram.to_dict()
+            for name, bucket in self._buckets.items()
+            if bucket.histogram.count
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取速率限制器状态"""
+        now = time.monotonic()
+        default = self._buckets['default']
+        return {
+            'enabled': self.enabled,
+            'max_requests_per_second': self.max_requests_per_second,
+            'available_capacity': int(default.available(now)),
+            'groups': {
+                name: {
+                    'limit': bucket.limit,
+                    'period': bucket.period,
+                    'available': round(bucket.available(now), 2),
+                    'throttled': bucket.throttled
+                }
+                for name, bucket in self._buckets.items()
+                if bucket.histogram.count
+            },
+            'wait_histograms': self.get_wait_histograms(),
+            'current_cycle': self.get_cycle_stats()
+        }
@@ -0,0 +1,103 @@
+"""
+交易所读接口合并缓存模块
+余额、持仓、行情在一个交易周期内会被多处读取（市场数据、持仓信息、风险评估、锁利检查等），
+并发或相隔很近的读取共享同一个进行中的请求（single-flight），结果在短TTL内直接复用
+"""
+
+import asyncio
+import time
+import logging
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightCache:
+    """单飞 + 短TTL读穿缓存
+
+    同一个键同时只有一个请求在途，其他调用方等待同一结果（合并）；
+    请求成功后结果保留 ttl 秒（命中）。请求失败不缓存，异常抛给所有等待方。
+    请求在独立任务中执行，任一调用方（包括发起方）被取消都不会取消请求本身。
+    invalidate 后在途请求的结果仍返回给已在等待的调用方，但不再写入缓存。
+    """
+
+    def __init__(self, ttl: float = 1.0, ttls: Optional[Dict[str, float]] = None):
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})  # 按键单独设置的TTL
+        self._entries: Dict[str, Tuple[float, Any]] = {}  # 键 -> (过期时间, 结果)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._generations: Dict[str, int] = {}  # 每次失效递增，丢弃失效前发出的请求结果
+
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _stats_for(self, key: str) -> Dict[str, int]:
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = {'fetches': 0, 'hits': 0, 'coalesced': 0, 'errors': 0, 'invalidations': 0}
+        return stats
+
+    async def get(self, key: str, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+        """读取键对应的结果：缓存有效直接返回，有在途请求则等待其结果，否则发起请求"""
+        stats = self._stats_for(key)
+        ttl = self.ttls.get(key, self.ttl)
+
+        if ttl > 0:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                stats['hits'] += 1
+                return entry[1]
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        # 在途请求属于已关闭的事件循环时不能复用
+        if task is not None and not task.done() and task.get_loop() is loop:
+            stats['coalesced'] += 1
+            return await asyncio.shield(task)
+
+        # 请求在独立任务中执行：发起方被取消（对冲失败方、法定人数取消等）时，其他等待方仍能拿到结果
+        stats['fetches'] += 1
+        task = loop.create_task(self._fetch(key, fetcher, ttl, stats))
+        task.add_done_callback(_retrieve_exception)
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, fetcher: Callable[[], Awaitable[Any]], ttl: float,
+                     stats: Dict[str, int]) -> Any:
+        generation = self._generations.get(key, 0)
+        try:
+            result = await fetcher()
+        except BaseException:
+            stats['errors'] += 1
+            raise
+        else:
+            if ttl > 0 and self._generations.get(key, 0) == generation:
+                self._entries[key] = (time.monotonic() + ttl, result)
+            return result
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    def invalidate(self, *keys: str) -> None:
+        """使指定键（未指定时为全部）的缓存失效"""
+        for key in keys or list(set(self._entries) | set(self._inflight)):
+            self._entries.pop(key, None)
+            self._inflight.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._stats_for(key)['invalidations'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各键的请求/命中/合并统计"""
+        result: Dict[str, Any] = {'ttl': self.ttl}
+        for key, stats in self.stats.items():
+            reads = stats['fetches'] + stats['hits'] + stats['coalesced']
+            result[key] = {
+                **stats,
+                'saved_rate': (stats['hits'] + stats['coalesced']) / reads if reads > 0 else 0
+            }
+        return result
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    """所有等待方都已取消时避免"exception was never retrieved"告警"""
+    if not task.cancelled():
+        task.exception()
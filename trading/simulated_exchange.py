@@ -0,0 +1,531 @@
+"""
+模拟交易所模块
+提供与ccxt客户端接口一致的确定性OKX模拟交易所（行情、K线、撮合、持仓、余额），
+TEST_MODE、回放回测和性能基准均通过 ExchangeManager 的真实代码路径离线运行
+"""
+
+import asyncio
+import csv
+import json
+import math
+import random
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import ccxt
+
+from .market_cache import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class SyntheticCandles:
+    """确定性合成K线
+
+    价格是时间的确定函数（多个正弦波叠加 + 按时间戳播种的噪声），同一种子下任意时刻、
+    任意周期的K线都可重复生成；上一根收盘价即下一根开盘价，不同周期之间相互一致。
+    不使用也不修改全局随机数状态。
+    """
+
+    def __init__(self, base_price: float = 100000.0, seed: int = 42, volatility: float = 0.02):
+        self.base_price = base_price
+        self.seed = seed
+        self.volatility = volatility
+        rng = random.Random(seed)
+        # (周期毫秒, 振幅, 相位)
+        self._waves = [
+            (period_h * 3600 * 1000, amplitude * volatility, rng.uniform(0, 2 * math.pi))
+            for period_h, amplitude in ((3, 0.15), (11, 0.3), (37, 0.6), (131, 1.0))
+        ]
+        self._minute_cache: Dict[int, float] = {}
+
+    def price_at(self, ts: int) -> float:
+        """ts时刻（毫秒）的价格，按分钟噪声连续插值"""
+        minute = ts // 60000
+        frac = (ts % 60000) / 60000
+        return self._minute_price(minute) * (1 - frac) + self._minute_price(minute + 1) * frac
+
+    def _minute_price(self, minute: int) -> float:
+        price = self._minute_cache.get(minute)
+        if price is None:
+            ts = minute * 60000
+            trend = sum(amp * math.sin(2 * math.pi * ts / period + phase) for period, amp, phase in self._waves)
+            noise = random.Random(self.seed * 1000003 + minute).gauss(0, self.volatility * 0.05)
+            price = self.base_price * (1 + trend + noise)
+            if len(self._minute_cache) > 100000:
+                self._minute_cache.clear()
+            self._minute_cache[minute] = price
+        return price
+
+    def candle(self, ts: int, tf_ms: int, until: Optional[int] = None) -> Dict[str, Any]:
+        """开盘时间为ts的K线；until早于收盘时间时为未收盘K线（收盘价取until时刻价格）"""
+        end = ts + tf_ms if until is None else min(ts + tf_ms, until)
+        open_price = self.price_at(ts)
+        close_price = self.price_at(end)
+        # 高低点按分钟价格采样（长周期按步长抽样，保证开销有界）
+        step = max(60000, (end - ts) // 60 // 60000 * 60000)
+        samples = [self.price_at(t) for t in range(ts, end, step)] + [open_price, close_price]
+        rng = random.Random(self.seed * 7919 + ts // 60000 + tf_ms)
+        return {
+            'timestamp': ts,
+            'open': round(open_price, 1),
+            'high': round(max(samples), 1),
+            'low': round(min(samples), 1),
+            'close': round(close_price, 1),
+            'volume': round(rng.uniform(50, 150) * tf_ms / 60000, 2)
+        }
+
+
+class ReplayCandles:
+    """回放录制的K线（CandleStore 的CSV格式或JSON列表），更长周期由基础周期聚合"""
+
+    def __init__(self, candles: List[Dict[str, Any]], timeframe: str):
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_to_ms(timeframe)
+        by_ts = {int(c['timestamp']): c for c in candles}
+        self._timestamps = sorted(by_ts)
+        self._candles = {ts: {
+            'timestamp': ts,
+            'open': float(by_ts[ts]['open']),
+            'high': float(by_ts[ts]['high']),
+            'low': float(by_ts[ts]['low']),
+            'close': float(by_ts[ts]['close']),
+            'volume': float(by_ts[ts]['volume'])
+        } for ts in self._timestamps}
+
+    @classmethod
+    def from_file(cls, path: str, timeframe: str) -> 'ReplayCandles':
+        """从CSV（timestamp,open,high,low,close,volume）或JSON文件加载"""
+        file_path = Path(path)
+        if file_path.suffix == '.json':
+            with open(file_path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+            candles = [dict(zip(('timestamp', 'open', 'high', 'low', 'close', 'volume'), r))
+                       if isinstance(r, list) else r for r in rows]
+        else:
+            with open(file_path, 'r', newline='', encoding='utf-8') as f:
+                candles = [dict(zip(('timestamp', 'open', 'high', 'low', 'close', 'volume'), row))
+                           for row in csv.reader(f) if len(row) >= 6 and row[0].isdigit()]
+        return cls(candles, timeframe)
+
+    @property
+    def start_ts(self) -> int:
+        return self._timestamps[0] if self._timestamps else 0
+
+    @property
+    def end_ts(self) -> int:
+        return self._timestamps[-1] + self.tf_ms if self._timestamps else 0
+
+    def price_at(self, ts: int) -> float:
+        """ts时刻的价格（所在K线开盘到收盘线性插值）"""
+        base_ts = ts // self.tf_ms * self.tf_ms
+        candle = self._candles.get(base_ts)
+        if candle is None:
+            # 超出数据范围时取最近的K线
+            if not self._timestamps:
+                return 0.0
+            nearest = self._timestamps[-1] if ts >= self._timestamps[-1] else self._timestamps[0]
+            return self._candles[nearest]['close']
+        frac = (ts - base_ts) / self.tf_ms
+        return candle['open'] + (candle['close'] - candle['open']) * frac
+
+    def candle(self, ts: int, tf_ms: int, until: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """聚合[ts, ts+tf_ms)内的基础K线，until之后的部分不计入"""
+        end = ts + tf_ms if until is None else min(ts + tf_ms, until)
+        parts = [self._candles[t] for t in range(ts, end, self.tf_ms) if t in self._candles]
+        if not parts:
+            return None
+        return {
+            'timestamp': ts,
+            'open': parts[0]['open'],
+            'high': max(c['high'] for c in parts),
+            'low': min(c['low'] for c in parts),
+            'close': parts[-1]['close'],
+            'volume': sum(c['volume'] for c in parts)
+        }
+
+
+class SimulatedClock:
+    """模拟时钟：默认跟随系统时间；回放时为手动时钟，由 advance() 推进"""
+
+    def __init__(self, start_ms: Optional[int] = None):
+        self._manual = start_ms is not None
+        self._now = start_ms or 0
+
+    def now_ms(self) -> int:
+        return self._now if self._manual else int(time.time() * 1000)
+
+    @property
+    def is_manual(self) -> bool:
+        return self._manual
+
+    def advance(self, ms: int) -> None:
+        if self._manual:
+            self._now += ms
+
+
+class SimulatedExchange:
+    """确定性OKX模拟交易所（ccxt客户端接口）
+
+    单向持仓模式；市价单按买一/卖一价立即成交，限价单和触发单在价格穿越时撮合
+    （使用上次撮合以来的最高/最低价判断）。订单数量按调用方的币数单位计算盈亏。
+    延迟和错误注入使用独立的随机数生成器，同一种子下结果可复现。
+    """
+
+    def __init__(self, symbol: str = 'BTC/USDT:USDT', timeframe: str = '15m',
+                 source: Optional[Any] = None, clock: Optional[SimulatedClock] = None,
+                 seed: int = 42, base_price: float = 100000.0, initial_balance: float = 10000.0,
+                 leverage: float = 10, taker_fee: float = 0.0005, maker_fee: float = 0.0002,
+                 spread_bps: float = 1.0, latency: float = 0.0, latency_jitter: float = 0.0,
+                 error_rate: float = 0.0):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_to_ms(timeframe)
+        self.source = source or SyntheticCandles(base_price=base_price, seed=seed)
+        self.clock = clock or SimulatedClock()
+        self.leverage = leverage
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.spread = spread_bps / 10000
+        self.latency = latency  # 每次调用的模拟延迟（秒）
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate  # 网络错误注入概率
+
+        self._rng = random.Random(seed)
+        self._next_id = 1
+        self._orders: Dict[str, Dict[str, Any]] = {}
+        self._algo_orders: Dict[str, Dict[str, Any]] = {}
+        self._position = 0.0  # 带符号的持仓数量，正为多
+        self._entry_price = 0.0
+        self._cash = initial_balance  # 已实现盈亏和手续费计入现金
+        self._last_match_ts = self.clock.now_ms()
+
+        self.call_counts: Dict[str, int] = {}
+        self.trades: List[Dict[str, Any]] = []
+
+    @classmethod
+    def replay(cls, path: str, timeframe: str = '15m', warmup_bars: int = 100, **kwargs) -> 'SimulatedExchange':
+        """从录制的K线文件创建回放交易所，时钟从第warmup_bars根K线开始"""
+        source = ReplayCandles.from_file(path, timeframe)
+        start = min(source.start_ts + warmup_bars * source.tf_ms, source.end_ts - source.tf_ms)
+        return cls(timeframe=timeframe, source=source, clock=SimulatedClock(start), **kwargs)
+
+    # ------------------------------------------------------------------
+    # 时钟与撮合
+    # ------------------------------------------------------------------
+
+    def set_clock(self, clock: SimulatedClock) -> None:
+        """切换时钟（如回测时改用从固定时刻开始的手动时钟）"""
+        self.clock = clock
+        self._last_match_ts = clock.now_ms()
+
+    def advance(self, bars: int = 1) -> None:
+        """推进回放时钟（系统时钟模式下无效）并撮合挂单"""
+        self.clock.advance(bars * self.tf_ms)
+        self._match()
+
+    def _last_price(self) -> float:
+        return self.source.price_at(self.clock.now_ms())
+
+    def _match(self) -> None:
+        """用上次撮合以来的价格区间撮合限价单和触发单"""
+        now = self.clock.now_ms()
+        start = self._last_match_ts
+        self._last_match_ts = now
+        if not self._orders and not self._algo_orders:
+            return
+
+        low, high = self._price_range(start, now)
+        last = self._last_price()
+
+        for order in list(self._orders.values()):
+            if order['status'] != 'open':
+                continue
+            price = order['price']
+            if (order['side'] == 'buy' and low <= price) or (order['side'] == 'sell' and high >= price):
+                self._fill(order, price, self.maker_fee)
+
+        for algo_id, algo in list(self._algo_orders.items()):
+            if algo_id not in self._algo_orders:
+                continue  # 同组的另一腿已触发
+            trigger = algo['trigger_price']
+            hit = low <= trigger if algo['direction'] == 'down' else high >= trigger
+            if hit:
+                # 止盈止损同组，一腿触发后另一腿撤销
+                for other_id in [k for k, v in self._algo_orders.items() if v['group'] == algo['group']]:
+                    del self._algo_orders[other_id]
+                order = self._new_order('market', algo['side'], algo['amount'], None, algo['reduce_only'])
+                self._fill(order, trigger if trigger > 0 else last, self.taker_fee)
+
+    def _price_range(self, start: int, end: int) -> tuple:
+        prices = [self.source.price_at(start), self.source.price_at(end)]
+        ts = start // 60000 * 60000 + 60000
+        step = max(60000, (end - start) // 240 // 60000 * 60000)
+        while ts < end:
+            prices.append(self.source.price_at(ts))
+            ts += step
+        return min(prices), max(prices)
+
+    def _new_order(self, order_type: str, side: str, amount: float, price: Optional[float],
+                   reduce_only: bool) -> Dict[str, Any]:
+        order_id = str(self._next_id)
+        self._next_id += 1
+        order = {
+            'id': order_id,
+            'symbol': self.symbol,
+            'type': order_type,
+            'side': side,
+            'amount': amount,
+            'price': price,
+            'status': 'open',
+            'filled': 0.0,
+            'remaining': amount,
+            'average': None,
+            'reduceOnly': reduce_only,
+            'timestamp': self.clock.now_ms(),
+            'fee': {'currency': 'USDT', 'cost': 0.0}
+        }
+        self._orders[order_id] = order
+        return order
+
+    def _fill(self, order: Dict[str, Any], price: float, fee_rate: float) -> None:
+        """按price成交订单并更新持仓和现金"""
+        amount = order['remaining']
+        signed = amount if order['side'] == 'buy' else -amount
+        if order['reduceOnly']:
+            # 只减仓：数量不超过当前反向持仓
+            if self._position == 0 or (signed > 0) == (self._position > 0):
+                order['status'] = 'canceled'
+                return
+            signed = math.copysign(min(abs(signed), abs(self._position)), signed)
+
+        fee = abs(signed) * price * fee_rate
+        self._cash -= fee
+        if self._position == 0 or (signed > 0) == (self._position > 0):
+            # 开仓或加仓
+            new_position = self._position + signed
+            self._entry_price = (self._entry_price * abs(self._position) + price * abs(signed)) / abs(new_position)
+            self._position = new_position
+        else:
+            # 减仓/平仓/反手
+            closed = min(abs(signed), abs(self._position))
+            direction = 1 if self._position > 0 else -1
+            self._cash += closed * (price - self._entry_price) * direction
+            self._position += signed
+            if abs(self._position) < 1e-12:
+                self._position = 0.0
+                self._entry_price = 0.0
+            elif (self._position > 0) != (direction > 0):
+                self._entry_price = price  # 反手后的新仓位
+
+        order.update({
+            'status': 'closed',
+            'filled': abs(signed),
+            'remaining': 0.0,
+            'average': price,
+            'fee': {'currency': 'USDT', 'cost': fee}
+        })
+        self.trades.append({'order_id': order['id'], 'side': order['side'], 'amount': abs(signed),
+                            'price': price, 'fee': fee, 'timestamp': self.clock.now_ms()})
+
+    async def _call(self, name: str) -> None:
+        """记录调用、注入延迟和错误，并撮合到当前时刻"""
+        self.call_counts[name] = self.call_counts.get(name, 0) + 1
+        if self.latency or self.latency_jitter:
+            await asyncio.sleep(self.latency + self._rng.uniform(0, self.latency_jitter))
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise ccxt.NetworkError(f"simulated network error: {name}")
+        self._match()
+
+    # ------------------------------------------------------------------
+    # ccxt 接口
+    # ------------------------------------------------------------------
+
+    async def load_markets(self, reload: bool = False, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        await self._call('load_markets')
+        base, quote = self.symbol.split('/')[0], 'USDT'
+        return {self.symbol: {
+            'symbol': self.symbol,
+            'base': base,
+            'quote': quote,
+            'contractSize': 0.001,
+            'precision': {'amount': 3, 'price': 1},
+            'limits': {'amount': {'min': 0.001, 'max': 1000}},
+            'taker': self.taker_fee,
+            'maker': self.maker_fee,
+            'type': 'swap'
+        }}
+
+    async def set_leverage(self, leverage: float, symbol: Optional[str] = None,
+                           params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        await self._call('set_leverage')
+        self.leverage = float(leverage)
+        return {'leverage': self.leverage}
+
+    async def fetch_ticker(self, symbol: Optional[str] = None) -> Dict[str, Any]:
+        await self._call('fetch_ticker')
+        now = self.clock.now_ms()
+        last = round(self._last_price(), 1)
+        day = [self.source.candle(ts, 3600 * 1000, until=now)
+               for ts in range(now // 3600000 * 3600000 - 23 * 3600000, now, 3600000)]
+        day = [c for c in day if c]
+        return {
+            'symbol': self.symbol,
+            'last': last,
+            'bid': round(last * (1 - self.spread / 2), 1),
+            'ask': round(last * (1 + self.spread / 2), 1),
+            'high': max((c['high'] for c in day), default=last),
+            'low': min((c['low'] for c in day), default=last),
+            'volume': sum(c['volume'] for c in day),
+            'timestamp': now
+        }
+
+    async def fetch_ohlcv(self, symbol: Optional[str] = None, timeframe: str = '15m',
+                          since: Optional[int] = None, limit: int = 100) -> List[List[float]]:
+        await self._call('fetch_ohlcv')
+        tf_ms = timeframe_to_ms(timeframe)
+        now = self.clock.now_ms()
+        current_open = now // tf_ms * tf_ms
+        if since is None:
+            start = current_open - (limit - 1) * tf_ms
+        else:
+            start = (since + tf_ms - 1) // tf_ms * tf_ms
+
+        rows = []
+        ts = start
+        while ts <= current_open and len(rows) < limit:
+            candle = self.source.candle(ts, tf_ms, until=now if ts == current_open else None)
+            if candle:
+                rows.append([candle['timestamp'], candle['open'], candle['high'],
+                             candle['low'], candle['close'], candle['volume']])
+            ts += tf_ms
+        return rows
+
+    async def fetch_positions(self, symbols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        await self._call('fetch_positions')
+        if self._position == 0:
+            return []
+        last = self._last_price()
+        size = abs(self._position)
+        direction = 1 if self._position > 0 else -1
+        return [{
+            'symbol': self.symbol,
+            'side': 'long' if direction > 0 else 'short',
+            'contracts': size,
+            'entryPrice': self._entry_price,
+            'markPrice': last,
+            'unrealizedPnl': size * (last - self._entry_price) * direction,
+            'leverage': self.leverage,
+            'marginMode': 'cross'
+        }]
+
+    async def fetch_balance(self) -> Dict[str, Any]:
+        await self._call('fetch_balance')
+        last = self._last_price()
+        unrealized = abs(self._position) * (last - self._entry_price) * (1 if self._position > 0 else -1)
+        used = abs(self._position) * self._entry_price / self.leverage
+        used += sum(o['remaining'] * o['price'] / self.leverage for o in self._orders.values()
+                    if o['status'] == 'open' and not o['reduceOnly'])
+        total = self._cash + unrealized
+        usdt = {'total': total, 'free': max(total - used, 0.0), 'used': used}
+        return {
+            'USDT': usdt,
+            'total': {'USDT': usdt['total']},
+            'free': {'USDT': usdt['free']},
+            'used': {'USDT': usdt['used']}
+        }
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float,
+                           price: Optional[float] = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        await self._call('create_order')
+        params = params or {}
+        if amount <= 0:
+            raise ccxt.InvalidOrder(f"simulated: invalid amount {amount}")
+
+        order = self._new_order(type, side, float(amount), price, bool(params.get('reduceOnly')))
+        last = self._last_price()
+        ask, bid = last * (1 + self.spread / 2), last * (1 - self.spread / 2)
+
+        if type == 'market':
+            self._fill(order, ask if side == 'buy' else bid, self.taker_fee)
+        elif type == 'limit':
+            if price is None:
+                raise ccxt.InvalidOrder("simulated: limit order requires price")
+            # 可立即成交的限价单按对手价吃单
+            if side == 'buy' and price >= ask:
+                self._fill(order, ask, self.taker_fee)
+            elif side == 'sell' and price <= bid:
+                self._fill(order, bid, self.taker_fee)
+        else:
+            raise ccxt.InvalidOrder(f"simulated: unsupported order type {type}")
+        return dict(order)
+
+    async def cancel_order(self, id: str, symbol: Optional[str] = None) -> Dict[str, Any]:
+        await self._call('cancel_order')
+        order = self._orders.get(id)
+        if order is None:
+            raise ccxt.OrderNotFound(f"simulated: order {id} not found")
+        if order['status'] == 'open':
+            order['status'] = 'canceled'
+        return dict(order)
+
+    async def fetch_order(self, id: str, symbol: Optional[str] = None) -> Dict[str, Any]:
+        await self._call('fetch_order')
+        order = self._orders.get(id)
+        if order is None:
+            raise ccxt.OrderNotFound(f"simulated: order {id} not found")
+        return dict(order)
+
+    async def fetch_open_orders(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        await self._call('fetch_open_orders')
+        return [dict(o) for o in self._orders.values() if o['status'] == 'open']
+
+    async def privatePostTradeOrderAlgo(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """OKX算法订单（trigger/conditional/oco），按触发价方向在价格穿越时以市价执行"""
+        await self._call('privatePostTradeOrderAlgo')
+        side = params.get('side', 'sell')
+        amount = float(params.get('sz', 0))
+        reduce_only = str(params.get('reduceOnly', '')).lower() in ('true', '1')
+        last = self._last_price()
+
+        triggers = [params.get(k) for k in ('triggerPx', 'slTriggerPx', 'tpTriggerPx') if params.get(k)]
+        if not triggers or amount <= 0:
+            return {'code': '51000', 'msg': 'simulated: parameter error', 'data': []}
+
+        group = f"algo-{self._next_id}"
+        self._next_id += 1
+        for i, trigger in enumerate(triggers):
+            algo_id = group if i == 0 else f"{group}-{i}"
+            trigger_price = float(trigger)
+            self._algo_orders[algo_id] = {
+                'group': group,
+                'side': side,
+                'amount': amount,
+                'trigger_price': trigger_price,
+                'direction': 'down' if trigger_price < last else 'up',
+                'reduce_only': reduce_only or params.get('ordType') in ('conditional', 'oco')
+            }
+        return {'code': '0', 'msg': '', 'data': [{'algoId': group, 'sCode': '0', 'sMsg': ''}]}
+
+    async def close(self) -> None:
+        return None
+
+    # ------------------------------------------------------------------
+    # 状态
+    # ------------------------------------------------------------------
+
+    def get_state(self) -> Dict[str, Any]:
+        """模拟账户状态（用于回测结果比对）"""
+        return {
+            'time': self.clock.now_ms(),
+            'price': self._last_price(),
+            'position': self._position,
+            'entry_price': self._entry_price,
+            'cash': self._cash,
+            'open_orders': sum(1 for o in self._orders.values() if o['status'] == 'open'),
+            'algo_orders': len(self._algo_orders),
+            'trades': len(self.trades),
+            'calls': dict(self.call_counts)
+        }
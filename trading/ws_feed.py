@@ -0,0 +1,354 @@
+"""
+OKX公共WebSocket行情模块
+订阅 tickers / candle 频道，在内存中维护最新行情和K线，
+支持断线重连、自动重新订阅以及时间戳顺序/K线连续性校验；
+连接维持部分（OKXWebSocketClient）与私有频道订阅共用
+"""
+
+import asyncio
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import aiohttp
+
+from .models import TickerData
+from .market_cache import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+OKX_WS_PUBLIC_URL = "wss://ws.okx.com:8443/ws/v5/public"
+OKX_WS_BUSINESS_URL = "wss://ws.okx.com:8443/ws/v5/business"  # K线频道所在地址
+
+
+def timeframe_to_channel(timeframe: str) -> str:
+    """K线周期转换为OKX频道名，如 '5m' -> 'candle5m'，'1h' -> 'candle1H'"""
+    unit = timeframe[-1]
+    if unit in ('h', 'd', 'w'):
+        return f"candle{timeframe[:-1]}{unit.upper()}"
+    return f"candle{timeframe}"
+
+
+class OKXWebSocketClient:
+    """OKX WebSocket连接基类
+
+    负责连接维持、心跳、断线指数退避重连、重连后重新订阅以及原始消息录制，
+    子类通过 _connections() 声明各连接的地址和订阅参数，通过 _dispatch() 处理频道推送。
+    """
+
+    name = "WebSocket"
+
+    def __init__(self, ping_interval: float = 20.0, record_path: Optional[str] = None):
+        self.ping_interval = ping_interval
+        self.record_path = record_path
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self._connected: Dict[str, bool] = {}
+
+        self.stats = {
+            'connects': 0,
+            'reconnects': 0,
+            'messages': 0,
+            'errors': 0
+        }
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def _connections(self) -> List[Tuple[str, List[Dict[str, str]]]]:
+        """返回 [(连接地址, 订阅参数)]，由子类实现"""
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        """启动订阅（后台任务）"""
+        self._stopping = False
+        self._session = aiohttp.ClientSession()
+        for url, args in self._connections():
+            self._tasks.append(asyncio.create_task(self._run_connection(url, args)))
+
+    async def stop(self) -> None:
+        """停止订阅"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        logger.info(f"🛑 {self.name}订阅已停止")
+
+    async def _run_connection(self, url: str, args: List[Dict[str, str]]) -> None:
+        """维持单条连接：断线后指数退避重连并重新订阅"""
+        backoff = 1.0
+        first = True
+        while not self._stopping:
+            try:
+                async with self._session.ws_connect(url, autoping=True) as ws:
+                    await self._on_connected(ws, args)
+                    self._connected[url] = True
+                    self.stats['connects'] += 1
+                    if not first:
+                        self.stats['reconnects'] += 1
+                        logger.info(f"🔁 {self.name}已重连并重新订阅: {url}")
+                    first = False
+                    backoff = 1.0
+                    await self._receive_loop(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"⚠️ {self.name}连接异常 {url}: {type(e).__name__}: {e}")
+            finally:
+                self._connected[url] = False
+
+            if self._stopping:
+                break
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _on_connected(self, ws: aiohttp.ClientWebSocketResponse, args: List[Dict[str, str]]) -> None:
+        """连接建立后发送订阅（私有频道需先登录）"""
+        await ws.send_json({'op': 'subscribe', 'args': args})
+
+    async def _receive_loop(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        """接收消息，空闲超过ping_interval发送ping，连续两次无响应则断开重连"""
+        awaiting_pong = False
+        while not self._stopping:
+            try:
+                msg = await ws.receive(timeout=self.ping_interval)
+            except asyncio.TimeoutError:
+                if awaiting_pong:
+                    logger.warning(f"⚠️ {self.name}心跳超时，准备重连")
+                    return
+                await ws.send_str('ping')
+                awaiting_pong = True
+                continue
+
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                awaiting_pong = False
+                self.handle_message(msg.data)
+            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.ERROR):
+                return
+
+    # ------------------------------------------------------------------
+    # 消息处理
+    # ------------------------------------------------------------------
+
+    def handle_message(self, text: str) -> None:
+        """处理一条原始推送消息"""
+        if text == 'pong':
+            return
+
+        self.stats['messages'] += 1
+        self._record(text)
+
+        try:
+            message = json.loads(text)
+        except json.JSONDecodeError:
+            self.stats['errors'] += 1
+            return
+
+        event = message.get('event')
+        if event:
+            if event == 'error':
+                self.stats['errors'] += 1
+                logger.error(f"❌ {self.name}订阅错误: {message.get('code')} {message.get('msg')}")
+            return
+
+        self._dispatch(message.get('arg', {}).get('channel', ''), message)
+
+    def _dispatch(self, channel: str, message: Dict[str, Any]) -> None:
+        """处理频道推送，由子类实现"""
+        raise NotImplementedError
+
+    def _record(self, text: str) -> None:
+        """录制原始推送，供本地回放测试使用"""
+        if not self.record_path:
+            return
+        try:
+            with open(self.record_path, 'a', encoding='utf-8') as f:
+                f.write(text.replace('\n', '') + '\n')
+        except Exception as e:
+            logger.error(f"录制WebSocket消息失败: {e}")
+            self.record_path = None
+
+    def is_connected(self) -> bool:
+        return bool(self._connected) and all(self._connected.values())
+
+
+class OKXPublicFeed(OKXWebSocketClient):
+    """OKX公共行情订阅
+
+    tickers 走 public 地址，candle 走 business 地址，各自维持一条连接。
+    行情时间戳回退的推送直接丢弃；K线时间戳跳跃视为缺口，清空本地K线等待REST重新补齐。
+    超过 stale_after 秒没有收到任何推送时视为不新鲜，读取方应回退到REST。
+    """
+
+    name = "WebSocket行情"
+
+    def __init__(self, inst_id: str, symbol: str, timeframes: List[str],
+                 public_url: str = OKX_WS_PUBLIC_URL, business_url: str = OKX_WS_BUSINESS_URL,
+                 max_candles: int = 500, stale_after: float = 30.0, ping_interval: float = 20.0,
+                 record_path: Optional[str] = None):
+        super().__init__(ping_interval=ping_interval, record_path=record_path)
+        self.inst_id = inst_id
+        self.symbol = symbol
+        self.timeframes = list(timeframes)
+        self.public_url = public_url
+        self.business_url = business_url
+        self.max_candles = max_candles
+        self.stale_after = stale_after
+
+        self._ticker: Optional[TickerData] = None
+        self._ticker_ts = 0
+        self._ticker_received_at = 0.0
+        self._candles: Dict[str, List[Dict[str, Any]]] = {tf: [] for tf in self.timeframes}
+        self._candles_received_at: Dict[str, float] = {tf: 0.0 for tf in self.timeframes}
+
+        self.stats.update({
+            'ticker_updates': 0,
+            'candle_updates': 0,
+            'out_of_order': 0,
+            'candle_gaps': 0
+        })
+
+    def _connections(self) -> List[Tuple[str, List[Dict[str, str]]]]:
+        ticker_args = [{'channel': 'tickers', 'instId': self.inst_id}]
+        candle_args = [{'channel': timeframe_to_channel(tf), 'instId': self.inst_id} for tf in self.timeframes]
+
+        if self.public_url == self.business_url:
+            return [(self.public_url, ticker_args + candle_args)]
+        connections = [(self.public_url, ticker_args)]
+        if candle_args:
+            connections.append((self.business_url, candle_args))
+        return connections
+
+    async def start(self) -> None:
+        """启动订阅（后台任务）"""
+        await super().start()
+        logger.info(f"📡 WebSocket行情订阅已启动: {self.inst_id} tickers + {', '.join(self.timeframes)}")
+
+    def _dispatch(self, channel: str, message: Dict[str, Any]) -> None:
+        for item in message.get('data', []):
+            if channel == 'tickers':
+                self._on_ticker(item)
+            elif channel.startswith('candle'):
+                timeframe = self._channel_to_timeframe(channel)
+                if timeframe:
+                    self._on_candle(timeframe, item)
+
+    def _on_ticker(self, item: Dict[str, Any]) -> None:
+        ts = int(item.get('ts', 0))
+        if ts < self._ticker_ts:
+            self.stats['out_of_order'] += 1
+            return
+
+        self._ticker_ts = ts
+        self._ticker_received_at = time.time()
+        self._ticker = TickerData(
+            symbol=self.symbol,
+            last=float(item.get('last') or 0),
+            bid=float(item.get('bidPx') or 0),
+            ask=float(item.get('askPx') or 0),
+            high=float(item.get('high24h') or 0),
+            low=float(item.get('low24h') or 0),
+            volume=float(item.get('vol24h') or 0),
+            timestamp=datetime.fromtimestamp(ts / 1000)
+        )
+        self.stats['ticker_updates'] += 1
+
+    def _on_candle(self, timeframe: str, row: List[Any]) -> None:
+        candle = {
+            'timestamp': int(row[0]),
+            'open': float(row[1]),
+            'high': float(row[2]),
+            'low': float(row[3]),
+            'close': float(row[4]),
+            'volume': float(row[5])
+        }
+        candles = self._candles[timeframe]
+        tf_ms = timeframe_to_ms(timeframe)
+        self._candles_received_at[timeframe] = time.time()
+        self.stats['candle_updates'] += 1
+
+        if not candles:
+            candles.append(candle)
+            return
+
+        last_ts = candles[-1]['timestamp']
+        ts = candle['timestamp']
+        if ts == last_ts:
+            candles[-1] = candle  # 当前K线更新
+        elif ts == last_ts + tf_ms:
+            candles.append(candle)  # 新K线开始
+        elif ts < last_ts:
+            self.stats['out_of_order'] += 1
+        else:
+            # 漏掉了中间的K线（断线期间），本地序列不再连续，等待REST重新补齐
+            self.stats['candle_gaps'] += 1
+            logger.warning(f"⚠️ WebSocket K线不连续: {timeframe} {last_ts} -> {ts}，等待重新补齐")
+            candles.clear()
+            candles.append(candle)
+
+        if len(candles) > self.max_candles:
+            del candles[:len(candles) - self.max_candles]
+
+    @staticmethod
+    def _channel_to_timeframe(channel: str) -> Optional[str]:
+        suffix = channel[len('candle'):]
+        if not suffix:
+            return None
+        return suffix[:-1] + suffix[-1].lower()
+
+    # ------------------------------------------------------------------
+    # 读取（零网络调用）
+    # ------------------------------------------------------------------
+
+    def get_ticker(self) -> Optional[TickerData]:
+        """获取最新行情，不新鲜时返回None"""
+        if self._ticker is None or time.time() - self._ticker_received_at > self.stale_after:
+            return None
+        return self._ticker
+
+    def get_candles(self, timeframe: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """获取最近limit根连续K线，数量不足或不新鲜时返回None"""
+        candles = self._candles.get(timeframe)
+        if not candles or len(candles) < limit:
+            return None
+        if time.time() - self._candles_received_at.get(timeframe, 0) > self.stale_after:
+            return None
+        return [dict(c) for c in candles[-limit:]]
+
+    def seed_candles(self, timeframe: str, history: List[Dict[str, Any]]) -> None:
+        """用REST拉取的历史K线补齐本地序列（推送数据更新，优先保留）"""
+        if timeframe not in self._candles or not history:
+            return
+
+        merged = {int(c['timestamp']): c for c in history}
+        for candle in self._candles[timeframe]:
+            merged[candle['timestamp']] = candle
+
+        tf_ms = timeframe_to_ms(timeframe)
+        ordered = sorted(merged)
+        # 只保留以最新K线结尾的连续部分
+        start = len(ordered) - 1
+        while start > 0 and ordered[start] - ordered[start - 1] == tf_ms:
+            start -= 1
+        self._candles[timeframe] = [dict(merged[ts], timestamp=ts) for ts in ordered[start:]][-self.max_candles:]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取订阅统计"""
+        return {
+            **self.stats,
+            'connected': self.is_connected(),
+            'ticker_age': time.time() - self._ticker_received_at if self._ticker else None,
+            'candles': {tf: len(c) for tf, c in self._candles.items()}
+        }
@@ -0,0 +1,232 @@
+"""
+OKX私有WebSocket模块
+登录后订阅 orders / positions / account 频道，订单成交、持仓和余额变化由推送驱动，
+取代按订单轮询REST查询状态
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import aiohttp
+
+from .models import PositionData, BalanceData
+from .ws_feed import OKXWebSocketClient
+
+logger = logging.getLogger(__name__)
+
+OKX_WS_PRIVATE_URL = "wss://ws.okx.com:8443/ws/v5/private"
+OKX_WS_PRIVATE_DEMO_URL = "wss://wspap.okx.com:8443/ws/v5/private?brokerId=9999"  # 模拟盘地址
+
+
+def sign_login(secret: str, timestamp: str) -> str:
+    """生成登录签名：base64(hmac_sha256(secret, timestamp + 'GET' + '/users/self/verify'))"""
+    message = f"{timestamp}GET/users/self/verify"
+    digest = hmac.new(secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('utf-8')
+
+
+class OKXPrivateFeed(OKXWebSocketClient):
+    """OKX私有频道订阅
+
+    每次（重新）连接都先登录再订阅。持仓和余额在连接后收到首个快照推送之前视为未就绪，
+    断线期间同样视为未就绪，读取方应回退到REST；订单推送逐条交给订单回调处理。
+    """
+
+    name = "WebSocket私有频道"
+
+    def __init__(self, api_key: str, secret: str, passphrase: str, inst_id: str, symbol: str,
+                 url: str = OKX_WS_PRIVATE_URL, currency: str = 'USDT',
+                 ping_interval: float = 20.0, login_timeout: float = 10.0,
+                 record_path: Optional[str] = None):
+        super().__init__(ping_interval=ping_interval, record_path=record_path)
+        self.api_key = api_key
+        self.secret = secret
+        self.passphrase = passphrase
+        self.inst_id = inst_id
+        self.symbol = symbol
+        self.url = url
+        self.currency = currency
+        self.login_timeout = login_timeout
+
+        self._positions: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (instId, posSide) -> 原始持仓推送
+        self._positions_ready = False
+        self._balance: Optional[BalanceData] = None
+        self._order_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._position_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._subscribe_listeners: List[Callable[[], None]] = []
+
+        self.stats.update({
+            'logins': 0,
+            'order_updates': 0,
+            'position_updates': 0,
+            'balance_updates': 0
+        })
+
+    def _connections(self) -> List[Tuple[str, List[Dict[str, str]]]]:
+        return [(self.url, [
+            {'channel': 'orders', 'instType': 'SWAP', 'instId': self.inst_id},
+            {'channel': 'positions', 'instType': 'SWAP', 'instId': self.inst_id},
+            {'channel': 'account', 'ccy': self.currency}
+        ])]
+
+    async def start(self) -> None:
+        """启动订阅（后台任务）"""
+        await super().start()
+        logger.info(f"🔐 WebSocket私有频道订阅已启动: {self.inst_id} orders + positions + account")
+
+    async def _on_connected(self, ws: aiohttp.ClientWebSocketResponse, args: List[Dict[str, str]]) -> None:
+        """先登录，登录成功后再订阅；断线期间的持仓/余额不再可信，等待新快照
+
+        orders 频道订阅后没有快照，断线期间的成交/撤单不会补推，订阅后通知回调用REST对账
+        """
+        self._positions.clear()
+        self._positions_ready = False
+        self._balance = None
+
+        timestamp = str(int(time.time()))
+        await ws.send_json({'op': 'login', 'args': [{
+            'apiKey': self.api_key,
+            'passphrase': self.passphrase,
+            'timestamp': timestamp,
+            'sign': sign_login(self.secret, timestamp)
+        }]})
+
+        deadline = time.time() + self.login_timeout
+        while True:
+            msg = await ws.receive(timeout=max(deadline - time.time(), 0.1))
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                raise ConnectionError(f"登录期间连接关闭: {msg.type}")
+            if msg.data == 'pong':
+                continue
+            message = json.loads(msg.data)
+            event = message.get('event')
+            if event == 'login' and str(message.get('code', '0')) == '0':
+                self.stats['logins'] += 1
+                break
+            if event in ('login', 'error'):
+                raise ConnectionError(f"登录失败: {message.get('code')} {message.get('msg')}")
+
+        await super()._on_connected(ws, args)
+
+        for listener in self._subscribe_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"订阅回调执行失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 消息处理
+    # ------------------------------------------------------------------
+
+    def _dispatch(self, channel: str, message: Dict[str, Any]) -> None:
+        data = message.get('data', [])
+        if channel == 'orders':
+            for item in data:
+                self._on_order(item)
+        elif channel == 'positions':
+            self._on_positions(data)
+        elif channel == 'account':
+            for item in data:
+                self._on_account(item)
+
+    def _on_order(self, item: Dict[str, Any]) -> None:
+        self.stats['order_updates'] += 1
+        for listener in self._order_listeners:
+            try:
+                listener(item)
+            except Exception as e:
+                logger.error(f"订单推送回调执行失败: {e}")
+
+    def _on_positions(self, data: List[Dict[str, Any]]) -> None:
+        for item in data:
+            key = (item.get('instId', ''), item.get('posSide', 'net'))
+            if float(item.get('pos') or 0) == 0:
+                self._positions.pop(key, None)
+            else:
+                self._positions[key] = item
+            self.stats['position_updates'] += 1
+
+            for listener in self._position_listeners:
+                try:
+                    listener(item)
+                except Exception as e:
+                    logger.error(f"持仓推送回调执行失败: {e}")
+
+        # 订阅后的首个推送为全量快照（无持仓时为空列表）
+        self._positions_ready = True
+
+    def _on_account(self, item: Dict[str, Any]) -> None:
+        for detail in item.get('details', []):
+            if detail.get('ccy') != self.currency:
+                continue
+            self._balance = BalanceData(
+                total=float(detail.get('eq') or 0),
+                free=float(detail.get('availBal') or detail.get('availEq') or 0),
+                used=float(detail.get('frozenBal') or 0),
+                currency=self.currency,
+                timestamp=datetime.fromtimestamp(int(detail.get('uTime') or item.get('uTime') or 0) / 1000)
+            )
+            self.stats['balance_updates'] += 1
+
+    # ------------------------------------------------------------------
+    # 读取（零网络调用）
+    # ------------------------------------------------------------------
+
+    def add_order_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """注册订单推送回调，参数为OKX原始订单数据（ordId/state/accFillSz/avgPx...）"""
+        self._order_listeners.append(listener)
+
+    def add_position_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """注册持仓推送回调，参数为OKX原始持仓数据（pos/posSide/avgPx/upl...）"""
+        self._position_listeners.append(listener)
+
+    def add_subscribe_listener(self, listener: Callable[[], None]) -> None:
+        """注册（重新）订阅完成回调，用于对账断线期间错过的订单变化"""
+        self._subscribe_listeners.append(listener)
+
+    def get_positions(self) -> Optional[List[PositionData]]:
+        """获取当前持仓，未连接或尚未收到快照时返回None"""
+        if not self.is_connected() or not self._positions_ready:
+            return None
+        return [self.to_position_data(item, self.symbol) for item in self._positions.values()]
+
+    def get_balance(self) -> Optional[BalanceData]:
+        """获取账户余额，未连接或尚未收到快照时返回None"""
+        if not self.is_connected():
+            return None
+        return self._balance
+
+    @staticmethod
+    def to_position_data(item: Dict[str, Any], symbol: str) -> PositionData:
+        """OKX持仓推送转换为PositionData（单向持仓模式下按pos正负判断方向）"""
+        size = float(item.get('pos') or 0)
+        pos_side = item.get('posSide', 'net')
+        if pos_side in ('long', 'short'):
+            side = pos_side
+        else:
+            side = 'long' if size > 0 else 'short'
+
+        return PositionData(
+            side=side,
+            size=abs(size),
+            entry_price=float(item.get('avgPx') or 0),
+            unrealized_pnl=float(item.get('upl') or 0),
+            leverage=float(item.get('lever') or 1),
+            symbol=symbol,
+            timestamp=datetime.fromtimestamp(int(item.get('uTime') or 0) / 1000) if item.get('uTime') else datetime.now()
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取订阅统计"""
+        return {
+            **self.stats,
+            'connected': self.is_connected(),
+            'positions_ready': self._positions_ready,
+            'positions': len(self._positions)
+        }
@@ -67,6 +67,13 @@ from .error_recovery import (
     get_recovery_stats
 )
 
+# 全局重试预算
+from .retry_budget import (
+    RetryBudget,
+    retry_budget,
+    get_retry_budget_stats
+)
+
 # 数据验证工具
 from .data_validation import (
     DataValidator,
@@ -149,6 +156,11 @@ __all__ = [
     'error_recovery',
     'handle_error',
     'get_recovery_stats',
+
+    # 重试预算
+    'RetryBudget',
+    'retry_budget',
+    'get_retry_budget_stats',
     
     # 数据验证
     'DataValidator',
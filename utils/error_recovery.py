@@ -15,6 +15,8 @@ import threading
 from enum import Enum
 import asyncio
 
+from .retry_budget import retry_budget
+
 logger = logging.getLogger(__name__)
 
 class ErrorCategory(Enum):
@@ -218,6 +220,9 @@ class ErrorRecoveryManager:
         """
         try:
             self.recovery_stats['total_errors'] += 1
+            # 首次处理该错误计为一次请求，之后的退避重试从全局重试预算中扣除
+            if not (context or {}).get('retry_count'):
+                retry_budget.record_request(self._retry_origin(context))
             
             # 1. 错误分类
             error_category = self.error_classifier.classify_error(error)
@@ -367,10 +372,25 @@ class ErrorRecoveryManager:
         logger.error(alert_message)
         # 实际应用中这里会发送邮件、短信等通知
     
+    @staticmethod
+    def _retry_origin(context: Optional[Dict[str, Any]]) -> str:
+        """重试预算中的来源标记"""
+        return f"error_recovery:{(context or {}).get('component', 'unknown')}"
+
     # 恢复策略实现
     async def _retry_with_backoff(self, error: Exception, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """指数退避重试"""
         try:
+            # 重试消耗全局重试预算，故障期间不放大负载
+            if not retry_budget.try_acquire(self._retry_origin(context)):
+                return {
+                    'success': False,
+                    'action': 'RETRY_BUDGET_EXHAUSTED',
+                    'severity': 'MEDIUM',
+                    'message': '全局重试预算不足，放弃重试',
+                    'next_action': 'TRY_NEXT_STRATEGY'
+                }
+
             retry_count = context.get('retry_count', 0) if context else 0
             base_delay = 2 ** retry_count
             
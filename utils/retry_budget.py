@@ -0,0 +1,99 @@
+"""
+全局重试预算
+所有组件（AI提供商请求、交易所只读请求、RetryHandler、错误恢复）的重试共用一个令牌桶：
+每个首次请求积累 ratio 个令牌，每次重试消耗1个，长期看重试流量不超过首次请求的 ratio 倍；
+另有每秒 min_per_second 的保底补充，低流量时仍允许少量重试。
+提供商故障或网络异常期间重试不会成倍放大负载和周期耗时。每次请求/重试按来源（origin）标记并分别统计
+"""
+
+import time
+import threading
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget:
+    """令牌桶重试预算（线程安全，可在同步代码和事件循环中调用）"""
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1 / 300, max_tokens: float = 5.0):
+        self.enabled = True
+        self.ratio = ratio  # 每个首次请求积累的令牌数（重试占首次请求的比例上限）
+        self.min_per_second = min_per_second  # 保底补充速率（令牌/秒）
+        self.max_tokens = max_tokens  # 令牌上限（允许的突发重试数）
+
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._origins: Dict[str, Dict[str, int]] = {}
+
+    def configure(self, enabled: bool = True, ratio: float = 0.2,
+                  min_per_second: float = 1 / 300, max_tokens: float = 5.0) -> None:
+        with self._lock:
+            self.enabled = enabled
+            self.ratio = ratio
+            self.min_per_second = min_per_second
+            self.max_tokens = max_tokens
+            self._tokens = min(self._tokens, max_tokens)
+
+    def _stats_for(self, origin: str) -> Dict[str, int]:
+        stats = self._origins.get(origin)
+        if stats is None:
+            stats = self._origins[origin] = {'requests': 0, 'retries_granted': 0, 'retries_denied': 0}
+        return stats
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def record_request(self, origin: str) -> None:
+        """记录一次首次请求（积累重试令牌）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+            self._stats_for(origin)['requests'] += 1
+
+    def try_acquire(self, origin: str) -> bool:
+        """申请一次重试，预算不足时返回False（调用方应放弃重试）"""
+        with self._lock:
+            stats = self._stats_for(origin)
+            if not self.enabled:
+                stats['retries_granted'] += 1
+                return True
+            self._refill(time.monotonic())
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                stats['retries_granted'] += 1
+                return True
+            stats['retries_denied'] += 1
+        logger.warning(f"🪫 重试预算不足，放弃重试: {origin}")
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取重试预算统计（总计与按来源）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            origins = {origin: dict(stats) for origin, stats in self._origins.items()}
+            tokens = self._tokens
+        requests = sum(s['requests'] for s in origins.values())
+        granted = sum(s['retries_granted'] for s in origins.values())
+        return {
+            'enabled': self.enabled,
+            'tokens': round(tokens, 3),
+            'ratio': self.ratio,
+            'requests': requests,
+            'retries_granted': granted,
+            'retries_denied': sum(s['retries_denied'] for s in origins.values()),
+            'retry_ratio': granted / requests if requests else 0.0,
+            'origins': origins
+        }
+
+
+# 全局重试预算
+retry_budget = RetryBudget()
+
+
+def get_retry_budget_stats() -> Dict[str, Any]:
+    """获取全局重试预算统计"""
+    return retry_budget.get_stats()